@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+'''
+Plays every random encounter in the encounter tables (data/maps/*_encounters.json) against a party at a range of
+levels, thousands of times each with battle_batch.BatchBattle, and prints a table of how they go, for checking the
+encounters and the soldiers-by-level curves against each other. Needs numpy.
+
+Run it from the root of the repo (like rotj.sh does), e.g.:
+
+    python benchmarks/balance.py
+    python benchmarks/balance.py --map overworld --party moroni,teancum,lehi --levels 5,10,15 --runs 5000
+
+For each encounter and level, reports the share of battles won, the average number of volleys, the average share of
+the party's soldiers lost, and the average experience and money (counting battles that weren't won as nothing). The
+party fights with its attacks only, like ALL-OUT, and the allies get the attack points and armor class of an enemy at
+the same level in place of equipment.
+'''
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from battle_batch import BatchBattle, get_ally_record, get_enemy_record
+
+ENCOUNTERS_PATTERN = os.path.join('data', 'maps', '{}_encounters.json')
+
+
+def get_encounters(map_name, party):
+    '''
+    Returns the map's encounters as lists of (name, stats) pairs, leaving out repeats (the same enemies with the same
+    stats in more than one region or more than once in a region) and the ones with an ally in the party, like
+    Map.filter_out_allies (in tiled_map.py) does.
+    '''
+    with open(ENCOUNTERS_PATTERN.format(map_name)) as f:
+        regions = json.load(f)
+    encounters = []
+    seen = set()
+    for region in regions:
+        for enemy_names in region['encounters']:
+            if any(name in party for name in enemy_names):
+                continue
+            encounter = [(name, region['stats'][name]) for name in enemy_names]
+            key = json.dumps(encounter, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                encounters.append(encounter)
+    return encounters
+
+
+def describe(encounter):
+    names = [name for name, _ in encounter]
+    counted = []
+    for name in sorted(set(names), key=names.index):
+        count = names.count(name)
+        counted.append('{}x{}'.format(count, name) if count > 1 else name)
+    return ','.join(counted)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--map', action='append', help='map to sweep (can be repeated; default: all of them)')
+    parser.add_argument('--party', default='moroni,teancum,lehi', help='comma separated names of the allies')
+    parser.add_argument('--levels', default='5,10,20,40,60,80', help='comma separated party levels')
+    parser.add_argument('--runs', type=int, default=2000, help='battles to play for each encounter and level')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    party = args.party.split(',')
+    levels = [int(level) for level in args.levels.split(',')]
+    map_names = args.map or sorted(
+        os.path.basename(filename)[:-len('_encounters.json')]
+        for filename in glob.glob(ENCOUNTERS_PATTERN.format('*'))
+    )
+
+    print('{:<20} {:<40} {:>5} {:>6} {:>7} {:>6} {:>10} {:>10}'.format(
+        'map', 'enemies', 'level', 'win', 'volleys', 'lost', 'exp', 'money',
+    ))
+    start = time.time()
+    battles = 0
+    for map_name in map_names:
+        for encounter in get_encounters(map_name, party):
+            enemies = [get_enemy_record(name, stats, index) for index, (name, stats) in enumerate(encounter)]
+            for level in levels:
+                allies = [get_ally_record(name, level, index) for index, name in enumerate(party)]
+                batch = BatchBattle(allies, enemies, runs=args.runs, seed=args.seed)
+                batch.simulate()
+                summary = batch.get_summary()
+                ally_losses = summary['ally_losses'].values()
+                print('{:<20} {:<40} {:>5} {:>6.3f} {:>7.1f} {:>6.3f} {:>10.0f} {:>10.0f}'.format(
+                    map_name, describe(encounter)[:40], level, summary['win_rate'], summary['volleys'],
+                    sum(ally_losses) / len(ally_losses), summary['experience'], summary['money'],
+                ))
+                battles += args.runs
+    print('{} battles in {:.1f} s'.format(battles, time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+'''
+Measures how long it takes each frame to scale the 256x240 virtual screen up to the window, with the fitted
+(fractional) multiplier the game uses by default and with --integer-scale, at 1080p and 4K window sizes.
+
+Run it from the root of the repo (like rotj.sh does), e.g.:
+
+    python benchmarks/scaling.py
+    SDL_VIDEODRIVER=dummy SDL_AUDIODRIVER=dummy python benchmarks/scaling.py --frames 500
+
+For each size and mode, reports the time to scale and present a frame where the whole screen changed, and one where
+only a text box's worth of rows (like while text is printing) changed.
+'''
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pygame
+
+WINDOW_SIZES = [(1920, 1080), (3840, 2160)]
+TEXT_BOX_ROWS = (176, 64) # top and height of the bottom text box on the virtual screen
+
+
+def time_frames(game, dirty_rects, frames):
+    start = time.time()
+    for _ in range(frames):
+        pygame.display.update(game.scale(dirty_rects))
+    return (time.time() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=200, help='number of frames to time for each case')
+    args = parser.parse_args()
+
+    pygame.display.init()
+    screen = pygame.display.set_mode(WINDOW_SIZES[0])
+    pygame.mixer.init(frequency=44100)
+    from game import Game
+    game = Game(screen, argparse.Namespace(devtools=False, map=None, position=None, fps=60, integer_scale=False))
+    game.draw()
+    full_screen = [game.virtual_screen.get_rect()]
+    text_box = [pygame.Rect(0, TEXT_BOX_ROWS[0], game.virtual_width, TEXT_BOX_ROWS[1])]
+
+    for size in WINDOW_SIZES:
+        for integer_scale in [False, True]:
+            game.args.integer_scale = integer_scale
+            game.resize_window(size)
+            print('{}x{} {:<10} {}x{:<5} full frame {:6.2f} ms   text box rows {:6.2f} ms'.format(
+                size[0], size[1], 'integer' if integer_scale else 'fractional',
+                game.fitted_screen.get_width(), game.fitted_screen.get_height(),
+                1000 * time_frames(game, full_screen, args.frames),
+                1000 * time_frames(game, text_box, args.frames),
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+'''
+Measures how long it takes from starting the interpreter to drawing the first frame of the title screen.
+
+Run it from the root of the repo (like rotj.sh does), e.g.:
+
+    python benchmarks/startup.py
+    SDL_VIDEODRIVER=dummy SDL_AUDIODRIVER=dummy python benchmarks/startup.py --runs 10
+
+Each run happens in a fresh process so that nothing is cached between runs. Reports the import time of text.py
+(which nearly every module imports, not counting the modules it imports itself) and the total time to the first frame.
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+RUN_ONCE = '''
+import argparse, json, os, sys, time
+start = time.time()
+sys.path.insert(0, {src!r})
+import pygame
+pygame.display.init()
+screen = pygame.display.set_mode((512, 480))
+pygame.mixer.init(frequency=44100)
+import atlas, constants, helpers
+before_text = time.time()
+import text
+text_imported = time.time()
+from game import Game
+game = Game(screen, argparse.Namespace(devtools=False, map=None, position=None, fps=60, integer_scale=False))
+game.handle_input()
+game.update(0.01)
+game.draw()
+pygame.display.flip()
+first_frame = time.time()
+print(json.dumps({{'text_import': text_imported - before_text, 'first_frame': first_frame - start}}))
+'''
+
+
+def run_once():
+    output = subprocess.check_output([sys.executable, '-c', RUN_ONCE.format(src=SRC_DIR)], stderr=subprocess.DEVNULL)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh processes to time')
+    args = parser.parse_args()
+    results = [run_once() for _ in range(args.runs)]
+    for key in ['text_import', 'first_frame']:
+        times = sorted(result[key] for result in results)
+        print('{:<12} median {:7.1f} ms   min {:7.1f} ms   max {:7.1f} ms'.format(
+            key, 1000 * times[len(times) // 2], 1000 * times[0], 1000 * times[-1],
+        ))
+
+
+if __name__ == '__main__':
+    main()
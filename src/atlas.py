@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+'''
+Texture atlases for the small images the game loads by the hundreds: font glyphs, portraits and sprite frames.
+
+Running this module packs every png under data/images/<name> for each name in ATLASES into one or more sheets,
+and writes them to data/images/atlases along with a json index of where each image landed:
+
+    python src/atlas.py
+
+The build scripts do this before packaging. At runtime, get_image returns a subsurface of the right sheet when an
+atlas has been built, and falls back to loading the single image file when it hasn't (like in a fresh checkout),
+so rebuild the atlases after changing any of those images if you have built them before.
+'''
+
+import json
+import os
+
+import pygame
+
+RESOURCES_DIR = 'data'
+IMAGES_DIR = os.path.join(RESOURCES_DIR, 'images')
+ATLAS_DIR = os.path.join(IMAGES_DIR, 'atlases')
+ATLASES = ['font', 'portraits', 'sprites'] # subdirectories of data/images that get packed into atlases
+MAX_SHEET_SIZE = 1024 # pixels
+
+# key is atlas name, value is a dict with the json index and the sheets loaded so far, or None if there's no atlas
+_LOADED_ATLASES = {}
+
+
+def get_image(filename, alpha=False):
+    '''
+    Returns the image at data/images/<filename>, taking it from an atlas if one has it. Like helpers.load_image,
+    except the result may share pixels with the rest of its sheet, so blit it or copy it but don't draw on it.
+    Pass alpha=True to get it already converted with convert_alpha().
+    '''
+    key = filename.replace(os.sep, '/')
+    atlas = _get_atlas(key.split('/')[0])
+    if atlas and key in atlas['index']['images']:
+        sheet_index, x, y, width, height = atlas['index']['images'][key]
+        sheet, converted = _get_sheet(atlas, sheet_index)
+        image = sheet.subsurface((x, y, width, height))
+        return image.convert_alpha() if alpha and not converted else image
+    image = pygame.image.load(os.path.join(IMAGES_DIR, filename))
+    return image.convert_alpha() if alpha else image
+
+
+def _get_atlas(name):
+    if name not in _LOADED_ATLASES:
+        index_filename = os.path.join(ATLAS_DIR, '{}.json'.format(name))
+        if name in ATLASES and os.path.isfile(index_filename):
+            with open(index_filename) as f:
+                index = json.loads(f.read())
+            _LOADED_ATLASES[name] = {'index': index, 'sheets': {}}
+        else:
+            _LOADED_ATLASES[name] = None
+    return _LOADED_ATLASES[name]
+
+
+def _get_sheet(atlas, sheet_index):
+    '''
+    Returns the sheet and whether it has been converted for fast alpha blits, loading it on first use. Sheets can
+    only be converted once the display is set up, so a sheet loaded before that stays unconverted.
+    '''
+    if sheet_index not in atlas['sheets']:
+        sheet = pygame.image.load(os.path.join(ATLAS_DIR, atlas['index']['sheets'][sheet_index]))
+        converted = pygame.display.get_surface() is not None
+        if converted:
+            sheet = sheet.convert_alpha()
+        atlas['sheets'][sheet_index] = (sheet, converted)
+    return atlas['sheets'][sheet_index]
+
+
+def build_atlas(name):
+    '''
+    Packs every png under data/images/<name> into sheets of at most MAX_SHEET_SIZE pixels square, using simple
+    shelf packing, and writes data/images/atlases/<name>_<n>.png and data/images/atlases/<name>.json.
+    '''
+    images = {}
+    for root, _, files in os.walk(os.path.join(IMAGES_DIR, name)):
+        for filename in files:
+            if filename.endswith('.png'):
+                path = os.path.join(root, filename)
+                images[os.path.relpath(path, IMAGES_DIR).replace(os.sep, '/')] = pygame.image.load(path)
+
+    # Tallest images first, so each shelf wastes as little height as possible.
+    keys = sorted(images, key=lambda key: (-images[key].get_height(), key))
+    placements = {}
+    sheet_sizes = []
+    x = y = shelf_height = sheet_width = 0
+    for key in keys:
+        width, height = images[key].get_size()
+        if x + width > MAX_SHEET_SIZE:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        if y + height > MAX_SHEET_SIZE or not sheet_sizes:
+            if sheet_sizes:
+                sheet_sizes[-1] = (sheet_width, y)
+            sheet_sizes.append(None)
+            x = y = shelf_height = sheet_width = 0
+        placements[key] = [len(sheet_sizes) - 1, x, y, width, height]
+        x += width
+        shelf_height = max(shelf_height, height)
+        sheet_width = max(sheet_width, x)
+    if sheet_sizes:
+        sheet_sizes[-1] = (sheet_width, y + shelf_height)
+
+    if not os.path.isdir(ATLAS_DIR):
+        os.makedirs(ATLAS_DIR)
+    sheet_names = []
+    for sheet_index, size in enumerate(sheet_sizes):
+        sheet = pygame.Surface(size, pygame.SRCALPHA, 32)
+        for key, (index, x, y, _, _) in placements.items():
+            if index == sheet_index:
+                sheet.blit(images[key], (x, y))
+        sheet_name = '{}_{}.png'.format(name, sheet_index)
+        pygame.image.save(sheet, os.path.join(ATLAS_DIR, sheet_name))
+        sheet_names.append(sheet_name)
+    with open(os.path.join(ATLAS_DIR, '{}.json'.format(name)), 'w') as f:
+        f.write(json.dumps({'sheets': sheet_names, 'images': placements}, sort_keys=True))
+    return len(placements), len(sheet_names)
+
+
+if __name__ == '__main__':
+    for name in ATLASES:
+        num_images, num_sheets = build_atlas(name)
+        print('{}: packed {} images into {} sheet(s)'.format(name, num_images, num_sheets))
@@ -1,7 +1,6 @@
 # -*- coding: UTF-8 -*-
 
 from __future__ import print_function
-import copy
 import math
 import os
 import random
@@ -10,22 +9,26 @@ import time
 import pygame
 from pygame.locals import *
 
+from atlas import get_image
+from battle_core import BattleCore, STORY_BATTLE_TYPES
 from battle_warlord_rect import Ally, Enemy
-from constants import BLACK, GAME_WIDTH, GAME_HEIGHT, ITEMS, TACTICS, START_WITH_SHIZ_MULTIPLIER
+from constants import BLACK, GAME_WIDTH, GAME_HEIGHT, ITEMS, TACTICS
+from forecast import Forecast
 from helpers import (
     can_level_up,
     get_equip_based_stat_value,
     get_intelligence,
     get_max_soldiers,
     get_max_tactical_points,
+    get_stats,
     get_tactic_for_level,
     get_tactics,
     is_quarter_second,
     load_image,
-    load_stats,
     unpretty,
 )
 from report import Report
+from sounds import get_sound
 from text import create_prompt, MenuBox, MenuGrid, TextBox
 
 COLORS = [
@@ -88,24 +91,20 @@ TAUNTS = [
 ]
 
 RETREAT_TIME_PER_PERSON = 0.2
-REMOVE_STATUS_PROB = 0.2 # Chance that a temporary status expires at the end of a volley
-REMOVE_ADVANCED_STATUS_PROB = 0.27 # Chance that an ally's temporary advanced status expires at the end of a volley
+RISK_IT_PAUSE = 1.0 # seconds to hold the screen before and after RISK-IT plays the battle out
+RISK_IT_TIME_PER_FRAME = 0.008 # seconds of simulating RISK-IT gets each frame, so that the game keeps drawing
+MAX_RISK_IT_VOLLEYS = 1000 # RISK-IT gives up after this many volleys (against endless reinforcements, say)
+FORECAST_TIME_PER_FRAME = 0.004 # seconds of forecast runs the report screen does each frame
 
 
-class Battle(object):
+class Battle(BattleCore):
     def __init__(
         self, screen, game, allies, enemies, battle_type, ally_tactical_points, ally_tactics, near_water, exit=None,
         battle_name=None, narration=None, offguard=None, enemy_retreat=False, chapter11_city=None,
         prev_experience=0, prev_money=0, prev_food=0, next_battle=None,
     ):
-        # plundered can be 0, -1, or 1.
-        # If you use plunder, it moves up 1 and you get money.
-        # If plundered is 1 and you use plunder, it fails.
-        # If the enemy uses plunder, it moves down 1 and you lose money.
-        # If plundered is -1, the enemy won't use plunder.
-        # The amount plundered is equal to the spoils if you win, but the change to your money is immediate.
-        self.plundered = 0
-        
+        self.game = game
+        self.screen = screen
         self.is_last_battle = (
             battle_name in ['battle69', 'battle80', 'battle90']
             and len([True for b in ['battle69', 'battle80', 'battle90'] if game.conditions_are_met(b)]) == 2
@@ -114,79 +113,32 @@ class Battle(object):
         self.prev_money = prev_money
         self.prev_food = prev_food
         self.next_battle = next_battle
-        self.start_with_shiz = game.conditions_are_met('start_with_shiz')
-        self.enemies = None
-        self.screen = screen
-        self.ally_tactical_points = ally_tactical_points or 0
         self.chapter11_city = chapter11_city
         self.spoils_box = None
         self.report = None
-        self.mini_moves = []
         self.confirm_box = None
-        self.battle_name = battle_name
         self.debug = False
-        self.ally_tactics = [tactic.strip('~').lower() for tactic in ally_tactics] if ally_tactics else ['']*6
         self.time_elapsed = 0.0
-        self.game = game
-        self.battle_type = battle_type
         level = self.game.game_state['level']
-        self.allies = []
+        ally_records = []
         self.corianton_runs_away = False
-        is_story_battle = self.battle_type in ['story', 'giddianhi', 'zemnarihah']
+        is_story_battle = battle_type in STORY_BATTLE_TYPES
         for i, ally in enumerate(allies):
             if is_story_battle and ally['name'] == 'corianton':
                 self.corianton_runs_away = True
                 self.game.set_game_state_condition('corianton_runs_away')
                 continue
-            json_stats = load_stats(ally['name'])
-            equips = self.game.get_equips(ally['name'])
-            self.allies.append(Ally({
-                'index': i,
-                'name': ally['name'],
-                'strength': json_stats['strength'],
-                'intelligence': json_stats['intelligence'],
-                'defense': json_stats['defense'],
-                'agility': json_stats['agility'],
-                'evasion': json_stats['evasion'],
-                'attack_points': get_equip_based_stat_value('attack_points', equips),
-                'armor_class': get_equip_based_stat_value('armor_class', equips),
-                'tactical_points': ally['tactical_points'],
-                'max_tactical_points': get_max_tactical_points(ally['name'], level),
-                'soldiers': ally['soldiers'],
-                'max_soldiers': get_max_soldiers(ally['name'], level, is_ally=True),
-                'tactics': get_tactics(json_stats, level, pretty=False),
-                'items': ally['items'],
-                'headless': ally.get('headless', False),
-            }, self))
-        if self.corianton_runs_away and len(self.allies) == 0:
+            ally_records.append(self.get_ally_record(i, ally, level))
+        if self.corianton_runs_away and len(ally_records) == 0:
             ally = {
                 'name': 'moroni',
                 'soldiers': 100,
                 'items': [],
                 'tactical_points': 0,
             }
-            json_stats = load_stats(ally['name'])
-            equips = self.game.get_equips(ally['name'])
-            self.allies.append(Ally({
-                'index': i,
-                'name': ally['name'],
-                'strength': json_stats['strength'],
-                'intelligence': json_stats['intelligence'],
-                'defense': json_stats['defense'],
-                'agility': json_stats['agility'],
-                'evasion': json_stats['evasion'],
-                'attack_points': get_equip_based_stat_value('attack_points', equips),
-                'armor_class': get_equip_based_stat_value('armor_class', equips),
-                'tactical_points': ally['tactical_points'],
-                'max_tactical_points': get_max_tactical_points(ally['name'], level),
-                'soldiers': ally['soldiers'],
-                'max_soldiers': get_max_soldiers(ally['name'], level, is_ally=True),
-                'tactics': get_tactics(json_stats, level, pretty=False),
-                'items': ally['items'],
-                'headless': ally.get('headless', False),
-            }, self))
-
-        self.enemies = []
+            ally_records.append(self.get_ally_record(i, ally, level))
+
+        enemy_records = []
         for i, enemy in enumerate(enemies):
             if isinstance(enemy['stats']['soldiers'], list):
                 soldiers = random.choice(enemy['stats']['soldiers'])
@@ -197,9 +149,11 @@ class Battle(object):
                 if enemy['stats'].get('capture') is not None
                 else False
             )
+            # The stats can come from the shared map json cache, so change a copy of the tactics.
+            tactics = unpretty(enemy['stats'].get('tactics', ['','','','','','']))
             if 'tactics' in enemy['stats'] and enemy['stats']['tactics'][4] == 'train':
-                enemy['stats']['tactics'][4] = 'disable'
-            self.enemies.append(Enemy({
+                tactics[4] = 'disable'
+            enemy_records.append({
                 'index': i,
                 'name': enemy['name'],
                 'strength': enemy['stats']['strength'],
@@ -213,11 +167,34 @@ class Battle(object):
                 'max_tactical_points': enemy['stats']['tactical_points'],
                 'soldiers': soldiers,
                 'max_soldiers': soldiers,
-                'tactics': unpretty(enemy['stats'].get('tactics', ['','','','','',''])),
+                'tactics': tactics,
                 'items': [],
                 'reinforcements': enemy.get('reinforcements', False),
                 'capture': capture,
-            }, self))
+            })
+        tactician = self.game.get_tactician()
+        if tactician:
+            max_ally_tactical_points = get_max_tactical_points(tactician['name'], level)
+        else:
+            max_ally_tactical_points = ally_tactical_points # Which I believe would be zero
+        # The module's random is the rng, so that battles draw from the same sequence as the rest of the game.
+        super(Battle, self).__init__(
+            ally_records,
+            enemy_records,
+            ally_tactical_points=ally_tactical_points,
+            ally_tactics=ally_tactics,
+            max_ally_tactical_points=max_ally_tactical_points,
+            near_water=near_water,
+            battle_type=battle_type,
+            battle_name=battle_name,
+            start_with_shiz=game.conditions_are_met('start_with_shiz'),
+            scouting=bool(game.scout_steps_remaining),
+            reserve_multiplier=game.reserve_multiplier(),
+            final_exp_multiplier=4 if game.conditions_are_met('gained_final_exp_multiplier') else 1,
+            ally_money=game.game_state['money'],
+            devtools=game.devtools,
+            rng=random,
+        )
         self.state = 'start'
             # potential states: start, menu, action, report, report_selected, retreat, all_out, battle, tactic,
             # tactic_ally, tactic_enemy, item, item_ally, item_enemy, win, lose, execute, risk_it,
@@ -226,14 +203,14 @@ class Battle(object):
         self.menu = None
         self.portraits = {}
         self.portraits.update({
-            warlord['name']: load_image(os.path.join(u'portraits', u'{}.png'.format(warlord['name'])))
+            warlord['name']: get_image(os.path.join(u'portraits', u'{}.png'.format(warlord['name'])))
             for warlord in allies
         })
         self.portraits.update({
-            warlord['name']: pygame.transform.flip(load_image(os.path.join(u'portraits', u'{}.png'.format(warlord['name']))), True, False)
+            warlord['name']: pygame.transform.flip(get_image(os.path.join(u'portraits', u'{}.png'.format(warlord['name']))), True, False)
             for warlord in enemies
         })
-        self.portrait_shiz_headless = load_image(os.path.join(u'portraits', u'shiz_headless.png'))
+        self.portrait_shiz_headless = get_image(os.path.join(u'portraits', u'shiz_headless.png'))
         self.portrait = None
         self.pointer_right = load_image('pointer.png')
         self.pointer_left = pygame.transform.flip(self.pointer_right, True, False)
@@ -249,32 +226,24 @@ class Battle(object):
         self.offguard = self.get_offguard() if offguard is None else offguard
 
         # Adjust offguard if story battle and we got back 1 and offguard wasn't specified in the input
-        if battle_type in ['story', 'giddianhi', 'zemnarihah']:
+        if is_story_battle:
             if offguard is None and self.offguard == 1:
                 self.offguard = 0
 
-        self.select_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'select.wav'))
+        self.select_sound = get_sound('select')
         self.selected_enemy_index = None
         self.selected_ally_index = None
-        self.switch_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'switch.wav'))
-        self.submitted_moves = []
-        self.enemy_moves = []
-        self.ordered_moves = []
-        self.good_enemy_statuses = {}
-        self.good_ally_statuses = {}
-        self.near_water = near_water
-        self.excellent_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'excellent.wav'))
-        self.heavy_damage_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'heavy_damage.wav'))
-        self.hit_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'hit.wav'))
-        self.damage_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'damage.wav'))
-        self.fail_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'fail.wav'))
-        self.tactic_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'tactic.wav'))
-        tactician = self.game.get_tactician()
-        if tactician:
-            self.max_ally_tactical_points = get_max_tactical_points(tactician['name'], level)
-        else:
-            self.max_ally_tactical_points = ally_tactical_points # Which I believe would be zero
+        self.switch_sound = get_sound('switch')
+        self.excellent_sound = get_sound('excellent')
+        self.heavy_damage_sound = get_sound('heavy_damage')
+        self.hit_sound = get_sound('hit')
+        self.damage_sound = get_sound('damage')
+        self.fail_sound = get_sound('fail')
+        self.tactic_sound = get_sound('tactic')
         self.cancel_all_out = False
+        self.risk_it_volleys = 0
+        self.forecast = None
+        self.pause_time = 0 # seconds left to hold the screen, with only the warlords animating
         self.exit = exit
         current_narration = None
         if narration:
@@ -302,6 +271,31 @@ class Battle(object):
             
         self.set_start_dialog()
 
+    def get_ally_record(self, index, ally, level):
+        json_stats = get_stats(ally['name'])
+        equips = self.game.get_equips(ally['name'])
+        return {
+            'index': index,
+            'name': ally['name'],
+            'strength': json_stats['strength'],
+            'intelligence': json_stats['intelligence'],
+            'defense': json_stats['defense'],
+            'agility': json_stats['agility'],
+            'evasion': json_stats['evasion'],
+            'attack_points': get_equip_based_stat_value('attack_points', equips),
+            'armor_class': get_equip_based_stat_value('armor_class', equips),
+            'tactical_points': ally['tactical_points'],
+            'max_tactical_points': get_max_tactical_points(ally['name'], level),
+            'soldiers': ally['soldiers'],
+            'max_soldiers': get_max_soldiers(ally['name'], level, is_ally=True),
+            'tactics': get_tactics(json_stats, level, pretty=False),
+            'items': ally['items'],
+            'headless': ally.get('headless', False),
+        }
+
+    def create_warlord(self, warlord, is_enemy):
+        return Enemy(warlord, self) if is_enemy else Ally(warlord, self)
+
     # There is a 1/4 chance that offguard is non-zero. If the player has a lower base_num (a score based on
     # soldiers and attack points) than the enemy and the offguard is non-zero, there's a 50/50 chance of it
     # being in favor of the player or in favor of the enemy. If the player's base_num is greater than 10x
@@ -382,16 +376,71 @@ class Battle(object):
                     self.end_battle(self.get_company(), self.ally_tactical_points)
 
     def update_risk_it(self, dt):
-        if self.get_leader().state == 'wait':
-            self.simulate_battle()
+        '''
+        Plays the battle out a few volleys at a time, for up to RISK_IT_TIME_PER_FRAME each frame, showing how many
+        volleys have gone by if it takes more than a frame.
+        '''
+        if self.risk_it_volleys == 0 and self.get_leader().state != 'wait':
+            return
+        self.right_dialog = None # the volley count from the last frame
+        deadline = time.perf_counter() + RISK_IT_TIME_PER_FRAME
+        while True:
+            over = self.simulate_battle(max_volleys=1)
+            self.risk_it_volleys += 1
+            if over or self.risk_it_volleys >= MAX_RISK_IT_VOLLEYS or time.perf_counter() >= deadline:
+                break
+        if over:
             if self.state == 'win':
                 self.excellent_sound.play()
             else:
                 self.heavy_damage_sound.play()
-            time.sleep(1)
+            self.pause_time = RISK_IT_PAUSE
+        elif self.risk_it_volleys >= MAX_RISK_IT_VOLLEYS:
+            self.fail_sound.play()
+            # Nothing gets animated on the way back to the menu, so show the soldiers as they are now.
+            for warlord in self.allies + self.enemies:
+                while warlord.soldiers_change_queue:
+                    warlord.dequeue_soldiers_change()
+            self.warlord = None
+            self.init_menu_state()
+        else:
+            self.right_dialog = TextBox(u"RISK-IT\nVOLLEY {}".format(self.risk_it_volleys), border=True)
+            for warlord in self.get_live_allies() + self.get_live_enemies():
+                if warlord.state == 'wait':
+                    warlord.animate_all_out()
+
+    def update_report(self, dt):
+        '''
+        Works on the forecast for a few milliseconds each frame, and shows how it's looking so far for the warlord
+        that's selected.
+        '''
+        if not self.forecast.is_done():
+            self.forecast.run(max_time=FORECAST_TIME_PER_FRAME)
+        text = self.get_forecast_text()
+        if not self.right_dialog or self.right_dialog.text != text:
+            self.right_dialog = TextBox(text, width=160, height=80, border=True, title='FORECAST')
+
+    def get_forecast_text(self):
+        experience, money, food = self.forecast.get_expected_spoils()
+        ally_losses, enemy_losses = self.forecast.get_expected_losses()
+        if self.selected_enemy_index is not None:
+            warlord = self.enemies[self.selected_enemy_index]
+            losses = enemy_losses[self.selected_enemy_index]
+        else:
+            warlord = self.allies[self.selected_ally_index]
+            losses = ally_losses[self.selected_ally_index]
+        lines = [
+            u"{:~<10}{:~>8}".format('WIN', '{}/100'.format(int(round(self.forecast.get_win_probability() * 100)))),
+            u"{:~<10}{:~>8}".format('EXP.', int(round(experience))),
+            u"{:~<10}{:~>8}".format('MONEY', int(round(money))),
+            u"{:~<10}{:~>8}".format(warlord.name.title()[:10], -int(round(losses))),
+        ]
+        if not self.forecast.is_done():
+            lines.append(u"{:~<10}{:~>8}".format('RUNS', '{}/{}'.format(self.forecast.runs_done, self.forecast.runs)))
+        return u"\n".join(lines)
 
     def get_captured_enemies(self):
-        story_battle = self.battle_type in ['story', 'giddianhi', 'zemnarihah']
+        story_battle = self.battle_type in STORY_BATTLE_TYPES
         if story_battle:
             return list(self.captured_enemies)
         captured_enemies = []
@@ -513,6 +562,9 @@ class Battle(object):
             ally.update(dt)
         for enemy in self.enemies:
             enemy.update(dt)
+        if self.pause_time > 0:
+            self.pause_time -= dt
+            return
         if self.state == 'start':
             self.left_dialog.update(dt)
         elif self.state == 'menu':
@@ -521,6 +573,8 @@ class Battle(object):
             self.update_retreat(dt)
         elif self.state == 'risk_it':
             self.update_risk_it(dt)
+        elif self.state == 'report':
+            self.update_report(dt)
         elif self.state == 'win':
             self.update_win(dt)
         elif self.state == 'lose':
@@ -552,14 +606,6 @@ class Battle(object):
             if self.no_one_here_time > 0:
                 self.end_battle(self.get_company(), self.ally_tactical_points, battle_name=self.battle_name)
 
-    def status_expired(self, status, duration, is_ally):
-        if duration != 'temporary':
-            return False
-        if is_ally and status in ['deflect', 'repel']:
-            return random.random() < REMOVE_ADVANCED_STATUS_PROB
-        else:
-            return random.random() < REMOVE_STATUS_PROB
-
     def update_execute(self, dt):
         if self.execute_state == 'move_back':
             if self.warlord is None or self.warlord.state == 'wait':
@@ -573,25 +619,8 @@ class Battle(object):
                     self.warlord = None
                     self.submitted_moves = []
                     self.enemy_moves = []
-                    ally_status_updates = []
-                    enemy_status_updates = []
-                    for (status, duration) in list(self.good_ally_statuses.items()):
-                        if self.status_expired(status, duration, True):
-                            del self.good_ally_statuses[status]
-                            ally_status_updates.append(status)
-                    for (status, duration) in list(self.good_enemy_statuses.items()):
-                        if self.status_expired(status, duration, False):
-                            del self.good_enemy_statuses[status]
-                            enemy_status_updates.append(status)
-                    got_reinforcements = False
-                    for enemy in self.enemies:
-                        if enemy.reinforcements and enemy.get_future_soldiers() == 0:
-                            enemy.get_healed(enemy.max_soldiers)
-                            enemy.dequeue_soldiers_change()
-                            enemy.state = 'wait'
-                            enemy.rel_pos = 0
-                            enemy.rel_target_pos = None
-                            got_reinforcements = True
+                    ally_status_updates, enemy_status_updates = self.expire_statuses()
+                    got_reinforcements = self.call_reinforcements(dequeue=True)
                     self.execute_state = 'dialog'
                     self.right_dialog = self.finish_volley_dialog(
                         ally_status_updates, enemy_status_updates, got_reinforcements,
@@ -651,46 +680,6 @@ class Battle(object):
         else:
             return create_prompt(prompt_text, silent=True)
 
-    def get_mini_moves(self, move, results):
-        mini_moves = []
-        mini_results = []
-        if move['action'] in [self.execute_move_battle, self.execute_move_confuse, self.execute_move_provoke]:
-            mini_moves.append(move)
-            mini_result = copy.copy(results)
-            if 'double~tap' in mini_result:
-                del mini_result['double~tap']
-                if 'killed' in mini_result:
-                    del mini_result['killed']
-                mini_results.append(mini_result)
-                mini_moves.append(move)
-                mini_result = copy.copy(results)
-                mini_result['damage'] = mini_result['double~tap']
-                del mini_result['double~tap']
-                mini_results.append(mini_result)
-            else:
-                mini_results.append(results)
-        elif move['action'] == self.execute_move_tactic:
-            if 'targets' in results:
-                for result in results['targets']:
-                    mini_move = copy.copy(move)
-                    mini_move.update({'target': result['target']})
-                    mini_moves.append(mini_move)
-                    mini_results.append(result)
-                mini_results[0].update({'first': True})
-            else:
-                results.update({'first': True})
-                mini_moves.append(move)
-                mini_results.append(results)
-        else:
-            # elif move['action'] in [self.execute_move_defend, self.execute_move_item, self.execute_move_disable]
-            # or anything else we might have missed
-            mini_moves.append(move)
-            mini_results.append(results)
-        if self.battle_name == 'battle89' and move['agent'].name in ['zedekiah', 'gadiomnah']:
-            mini_moves.insert(0, {'action': self.execute_move_taunt, 'agent': move['agent']})
-            mini_results.insert(0, {})
-        return mini_moves, mini_results
-
     def get_damage_dialog(self, mini_move, mini_result):
         is_ally_move = mini_move['agent'] in self.allies
         if is_ally_move:
@@ -879,43 +868,11 @@ class Battle(object):
     def get_random_taunt(self):
         return random.choice(TAUNTS)
 
-    def pop_and_handle_mini_move(self, silent=False):
-        if len(self.mini_moves) > 0:
-            self.mini_move = self.mini_moves.pop(0)
-            self.mini_result = self.mini_results.pop(0)
-            if not silent:
-                sound = self.get_move_sound(self.mini_move, self.mini_result)
-                if sound:
-                    sound.play()
-                self.animate_move_hit(self.mini_move, self.mini_result)
-            if self.mini_move.get('target'): # if target is in there and is not None
-                self.mini_move['target'].dequeue_soldiers_change()
-            if self.mini_result.get('killed'):
-                if self.mini_move.get('target') and self.mini_move['target'].name == 'ammoron':
-                    teancum = None
-                    for ally in self.get_live_allies():
-                        if ally.name == 'teancum':
-                            teancum = ally
-                            break
-                    self.ordered_moves.insert(0, {
-                        'agent': self.mini_move['target'], # ammoron
-                        'target': teancum,
-                        'action': self.execute_move_kill_teancum,
-                    })
-                    self.ordered_moves.insert(0, {
-                        'agent': self.mini_move['target'], # ammoron
-                        'action': self.execute_move_ammoron_dies,
-                    })
-                    # Also, don't end the game on the move where Ammoron dies.
-                elif self.mini_move['action'] == self.execute_move_kill_teancum:
-                    pass # Also don't end battle on this move. If the battle is over, the end will get triggered after dialog.
-                elif all(ally.get_future_soldiers() == 0 for ally in self.allies):
-                    self.handle_lose()
-                elif all(enemy.get_future_soldiers() == 0 for enemy in self.enemies):
-                    self.handle_win()
-        else:
-            self.mini_move = None
-            self.mini_result = None
+    def show_mini_move(self, mini_move, mini_result):
+        sound = self.get_move_sound(mini_move, mini_result)
+        if sound:
+            sound.play()
+        self.animate_move_hit(mini_move, mini_result)
 
     def update_all_out(self, dt):
         if self.all_out_state == 'move_back_leader':
@@ -935,19 +892,8 @@ class Battle(object):
                     if len(self.ordered_moves) == 0:
                         self.submitted_moves = []
                         self.enemy_moves = []
-                        for (status, duration) in list(self.good_ally_statuses.items()):
-                            if self.status_expired(status, duration, True):
-                                del self.good_ally_statuses[status]
-                        for (status, duration) in list(self.good_enemy_statuses.items()):
-                            if self.status_expired(status, duration, False):
-                                del self.good_enemy_statuses[status]
-                        for enemy in self.enemies:
-                            if enemy.reinforcements and enemy.get_future_soldiers() == 0:
-                                enemy.get_healed(enemy.max_soldiers)
-                                enemy.dequeue_soldiers_change()
-                                enemy.state = 'wait'
-                                enemy.rel_pos = 0
-                                enemy.rel_target_pos = None
+                        self.expire_statuses()
+                        self.call_reinforcements(dequeue=True)
                         if self.cancel_all_out == True:
                             for warlord in self.get_live_allies() + self.get_live_enemies():
                                 warlord.move_to_back()
@@ -999,120 +945,23 @@ class Battle(object):
             for ally in self.allies
         }
 
-    def simulate_battle(self):
-        while self.state == 'risk_it':
-            self.simulate_volley()
-            self.submitted_moves = []
-            self.enemy_moves = []
-            self.ordered_moves = []
-
-    def submit_ai_moves(self, include_allies=True):
-        if include_allies:
-            enemies = self.get_live_enemies()
-            for ally in self.get_live_allies():
-                if (
-                    self.game.scout_steps_remaining
-                    and 'train' not in self.good_ally_statuses
-                    and ally.tactics
-                    and ally.tactics[4] == 'train'
-                    and ally.tactical_points >= TACTICS['train']['tactical_points']
-                ):
-                    move = {'agent': ally, 'action': self.execute_move_tactic, 'tactic': 'train'}
-                    ally.consume_tactical_points(TACTICS['train']['tactical_points'])
-                    # Do this early and redundantly so that we don't have all the allies choose this as their move
-                    self.good_ally_statuses['train'] = TACTICS['train']['duration']
-                else:
-                    move = {'agent': ally, 'action': self.execute_move_battle, 'target': random.choice(enemies)}
-                self.submit_move(move)
-        self.generate_enemy_moves()
-        self.ordered_moves = self.get_moves_in_order_of_agility()
-
-    def simulate_volley(self):
-        self.submit_ai_moves()
-        self.execute_moves()
-        for (status, duration) in list(self.good_ally_statuses.items()):
-            if self.status_expired(status, duration, True):
-                del self.good_ally_statuses[status]
-        for (status, duration) in list(self.good_enemy_statuses.items()):
-            if self.status_expired(status, duration, False):
-                del self.good_enemy_statuses[status]
-        for enemy in self.enemies:
-            if enemy.reinforcements and enemy.get_future_soldiers() == 0:
-                enemy.get_healed(enemy.max_soldiers)
-                enemy.state = 'wait'
-                enemy.rel_pos = 0
-                enemy.rel_target_pos = None
-
-    def execute_moves(self):
-        for move in self.ordered_moves:
-            self.move = move
-            result = self.execute_move(fast=True)
-            if not self.move:
-                continue
-            self.mini_moves, self.mini_results = self.get_mini_moves(self.move, self.results)
-            if result != 'continue':
-                break
-            # This needs to be after the break so that we don't call handle_win twice.
-            while self.mini_moves:
-                self.pop_and_handle_mini_move(silent=True)
-
-    def execute_move(self, fast=False):
-        self.change_move_if_dead_or_cursed()
-        if self.move is not None:
-            if 'defend' in self.move['agent'].good_statuses:
-                del self.move['agent'].good_statuses['defend']
-            action_handler = self.move['action']
-            self.move, self.results = action_handler(self.move)
-            if fast and self.results.get('killed'): # fast means this is using risk it for a fast simulation
-                if all(enemy.get_future_soldiers() == 0 for enemy in self.enemies):
-                    self.handle_win()
-                    return 'win'
-                elif all(ally.get_future_soldiers() == 0 for ally in self.allies):
-                    self.handle_lose()
-                    return 'lose'
-        else:
-            self.results = None
-        return 'continue'
-
     def handle_win(self):
-        for enemy in self.enemies:
-            enemy.dequeue_soldiers_change()
-        self.state = 'win'
         self.menu = None
         self.portrait = None
-        self.collect_spoils()
+        super(Battle, self).handle_win()
         self.win_state = 'start'
         if (
-            self.battle_type in ['story', 'giddianhi', 'zemnarihah']
+            self.battle_type in STORY_BATTLE_TYPES
             and self.game.conditions_are_met('gave_iron_ore_and_diamond')
         ):
             self.game.set_game_state_condition('swordsmith_finished')
 
+    def get_ally_money(self):
+        return self.game.game_state['money']
+
     def collect_spoils(self, plunder=0):
-        story_battle = self.battle_type in ['story', 'giddianhi', 'zemnarihah']
-        story_battle_gain = 2 if story_battle else 1
-        new_base = 0.006 * sum([e.max_soldiers for e in self.enemies])
-        trained = 3 if 'train' in self.good_ally_statuses else 1
-        final_exp_multiplier = 4 if self.game.conditions_are_met('gained_final_exp_multiplier') else 1
-        experience = int(
-            new_base
-            * story_battle_gain
-            * trained
-            * self.game.reserve_multiplier()
-            * final_exp_multiplier
-        )
-        money = int((4.5 + (.5 if plunder else random.random())) * new_base) * story_battle_gain
-        food = int((9.0 + 2.0 * random.random()) * new_base) if story_battle else 0
-        if plunder:
-            experience = 0
-            money = 2 * money # plunder is twice as much as regular spoils
-            if plunder == -1:
-                # enemy can't plunder more money than you actually have
-                money = min(money, self.game.game_state['money'])
-            # make plunder money positive or negative, depending who plunders
-            money = money * plunder
-            food = 0
-        else:
+        experience, money, food = self.get_spoils(plunder=plunder)
+        if not plunder:
             experience += self.prev_experience
             money += self.prev_money
             food += self.prev_food
@@ -1134,17 +983,13 @@ class Battle(object):
         return abs(money)
 
     def handle_lose(self):
-        for ally in self.allies:
-            ally.dequeue_soldiers_change()
-        self.state = 'lose'
+        super(Battle, self).handle_lose()
         self.menu = None
         self.portrait = None
         self.lose_state = 'start'
 
-    def get_moves_in_order_of_agility(self):
-        the_moves = self.submitted_moves + self.enemy_moves
-        the_moves.sort(key=lambda move: move['agent'].get_effective_agility(), reverse=True)
-        return the_moves
+    def surrender(self):
+        self.handle_retreat(surrender=True)
 
     def get_move_sound(self, move, results):
         move = move or {}
@@ -1174,607 +1019,6 @@ class Battle(object):
             else:
                 return None
 
-    def execute_move_battle(self, move, confused=False, power_pill=False):
-        is_ally_move = move['agent'] in self.allies
-        is_ally_target = ((not is_ally_move and not confused) or (is_ally_move and confused))
-        if move['target'].get_future_soldiers() == 0:
-            targets = self.get_live_allies() if is_ally_target else self.get_live_enemies()
-            return self.execute_move_battle(
-                {
-                    'agent': move['agent'],
-                    'target': random.choice(targets),
-                    'action': self.execute_move_battle,
-                },
-                confused = confused,
-                power_pill = power_pill,
-            )
-        good_target_team_statuses = self.good_ally_statuses if is_ally_target else self.good_enemy_statuses
-        if 'repel' in good_target_team_statuses:
-            return move, {'repel': True}
-        evade_prob = ((move['target'].evasion - move['agent'].agility) / 255.0 + 1) / 8.0
-        if not power_pill and random.random() < evade_prob:
-            return move, {'evade': True}
-        excellent = True if power_pill else random.random() < 1.0/16
-        inflicted_damage = int(
-            move['target'].attack_exposure * move['agent'].get_damage(excellent=excellent) + 1
-        )
-        if not power_pill and move['agent'].good_statuses.get('double~tap') and random.random() < 0.75:
-            double_tap = int( move['target'].attack_exposure * move['agent'].get_damage() + 1 )
-        else:
-            double_tap = None
-        if not power_pill and 'shield' in good_target_team_statuses:
-            inflicted_damage = max(inflicted_damage//2, 1)
-            if double_tap:
-                double_tap = max(double_tap//2, 1)
-        if not power_pill and move['target'].good_statuses.get('defend'):
-            inflicted_damage = max(inflicted_damage//2, 1)
-            if double_tap:
-                double_tap = max(double_tap//2, 1)
-        if move['target'].get_future_soldiers() <= inflicted_damage:
-            inflicted_damage = move['target'].get_future_soldiers()
-            move['target'].get_damaged(inflicted_damage)
-            killed = move['target'].get_future_soldiers() == 0
-            return move, {'damage': inflicted_damage, 'killed': killed, 'excellent': excellent}
-        move['target'].get_damaged(inflicted_damage)
-        if double_tap:
-            if move['target'].get_future_soldiers() <= double_tap:
-                double_tap = move['target'].get_future_soldiers()
-                move['target'].get_damaged(double_tap)
-                killed = move['target'].get_future_soldiers() == 0
-                return move, {'damage': inflicted_damage, 'double~tap': double_tap, 'killed': killed, 'excellent': excellent}
-            move['target'].get_damaged(double_tap)
-            return move, {'damage': inflicted_damage, 'double~tap': double_tap, 'excellent': excellent}
-        return move, {'damage': inflicted_damage, 'excellent': excellent}
-
-    def execute_move_confuse(self, move):
-        move, result = self.execute_move_battle(move, confused=True)
-        result.update({'status': 'confuse'})
-        return move, result
-
-    def execute_move_ammoron_dies(self, move):
-        return move, {}
-
-    def execute_move_kill_teancum(self, move):
-        if move['target']:
-            inflicted_damage = move['target'].get_future_soldiers()
-            move['target'].get_damaged(inflicted_damage)
-        return move, {'killed': True}
-
-    def execute_move_disable(self, move):
-        return move, {'status': 'disable'}
-
-    def execute_move_provoke(self, move):
-        move, result = self.execute_move_battle(move)
-        result.update({'status': 'provoke'})
-        return move, result
-
-    def execute_move_item(self, move):
-        for item in self.warlord.items:
-            if item['name'] == move['item']:
-                self.warlord.items.remove(item)
-                break
-        if 'target' in move and move['target'].get_future_soldiers() == 0 and move['item'] != 'power~pill':
-            return move, {'wasted': True}
-        move_type = ITEMS[move['item']]['battle_usage']
-        # go through items by type
-        if move_type == 'ally':
-            return self.execute_item_type_ally(move)
-        elif move_type == 'allies':
-            return self.execute_item_type_allies(move)
-        elif move_type == 'enemy':
-            return self.execute_item_type_enemy(move)
-        elif move_type == 'enemies':
-            return self.execute_item_type_enemies(move)
-        else:
-            return move, {}
-
-    def execute_item_type_enemy(self, move):
-        if move['item'] == 'power~pill':
-            return self.execute_move_battle(move, power_pill=True)
-        if move['item'] == 'javelin':
-            if move['agent'].name == 'teancum':
-                move['target'].get_damaged(move['target'].get_future_soldiers())
-                return move, {'killed': True}
-            else:
-                return move, {'fail': True}
-        else:
-            return move, {}
-
-    def execute_item_type_enemies(self, move):
-        info = ITEMS[move['item']]
-        if info['effect'] == 'cancel_reinforcements': # this is the title of liberty
-            is_ally_move = move['agent'] in self.allies
-            target_warlords = self.enemies if is_ally_move else self.allies
-            for warlord in target_warlords:
-                warlord.reinforcements = False
-        elif info['effect'] == 'dispel': # nightshade
-            is_ally_move = move['agent'] in self.allies
-            acting_team = self.allies if is_ally_move else self.enemies
-            for warlord in acting_team:
-                warlord.bad_status = None
-            target_team = self.enemies if is_ally_move else self.allies
-            for warlord in target_team:
-                warlord.good_statuses = {}
-            good_target_team_statuses = self.good_enemy_statuses if is_ally_move else self.good_ally_statuses
-            good_target_team_statuses.clear() # set dictionary to empty
-            return move, {}
-        return move, {}
-
-    def execute_item_type_allies(self, move):
-        into = ITEMS[move['item']]
-        if info['effect'] == 'ether':
-            is_ally_move = move['agent'] in self.allies
-            target_warlords = self.allies if is_ally_move else self.enemies
-            for warlord in target_warlords:
-                warlord.tactical_points = warlord.max_tactical_points
-            if is_ally_move:
-                self.ally_tactical_points = self.max_ally_tactical_points
-        return move, {}
-
-    def execute_item_type_ally(self, move):
-        info = ITEMS[move['item']]
-        if 'healing_points' in info:
-            healing = info['healing_points']
-            if healing + move['target'].get_future_soldiers() > move['target'].max_soldiers:
-                healing = move['target'].max_soldiers - move['target'].get_future_soldiers()
-            move['target'].get_healed(healing)
-            return move, {'healing': healing}
-        elif info.get('effect') == 'remedy':
-            move['target'].bad_status = None
-            return move, {}
-
-    def execute_move_tactic(self, move):
-        if 'target' in move and move['target'].get_future_soldiers() == 0:
-            return move, {'wasted': True}
-        is_ally_move = move['agent'] in self.allies
-        good_target_team_statuses = self.good_enemy_statuses if is_ally_move else self.good_ally_statuses
-        good_acting_team_statuses = self.good_ally_statuses if is_ally_move else self.good_enemy_statuses
-        tactic_type = TACTICS[move['tactic']]['type']
-        # go through tactics by type
-        if tactic_type == 'enemy':
-            if 'deflect' in good_target_team_statuses:
-                return move, {'deflect': True}
-            return self.execute_tactic_type_enemy(move, good_target_team_statuses, is_ally_move)
-        elif tactic_type == 'ally':
-            return self.execute_tactic_type_ally(move)
-        elif tactic_type == 'defense':
-            return self.execute_tactic_type_defense(move, good_acting_team_statuses)
-        elif tactic_type == 'enemies':
-            if 'deflect' in good_target_team_statuses:
-                return move, {'deflect': True}
-            return self.execute_tactic_type_enemies(move, good_target_team_statuses, is_ally_move)
-        elif tactic_type == 'allies':
-            return self.execute_tactic_type_allies(move, good_target_team_statuses, is_ally_move)
-        elif tactic_type == 'single':
-            return self.execute_tactic_type_single(move, good_target_team_statuses, is_ally_move)
-        else:
-            return move, {}
-
-    def execute_tactic_type_defense(self, move, good_acting_team_statuses):
-        info = TACTICS[move['tactic']]
-        success = self.get_tactic_success(move)
-        if not success:
-            return move, {'fail': True}
-        good_acting_team_statuses[move['tactic']] = info['duration']
-        return move, {}
-
-    def execute_tactic_type_ally(self, move):
-        info = TACTICS[move['tactic']]
-        success = self.get_tactic_success(move)
-        if not success:
-            return move, {'fail': True}
-        if 'min_damage' in info:
-            norm_intel = move['agent'].intelligence / 255.0
-            norm_cutoff = random.uniform(0.0, norm_intel)
-            prelim_healing_range = info['max_damage'] - info['min_damage']
-            cutoff = int(norm_cutoff * prelim_healing_range)
-            mod_min_healing = info['min_damage'] + cutoff
-            healing = random.randrange(mod_min_healing, info['max_damage'])
-            if move['target'].get_future_soldiers() + healing > move['target'].max_soldiers:
-                healing = move['target'].max_soldiers - move['target'].get_future_soldiers()
-            move['target'].get_healed(healing)
-            return move, {'healing': healing}
-        elif move['tactic'] == 'ninja':
-            move['target'].good_statuses['ninja'] = True
-            return move, {}
-        elif move['tactic'] == 'double~tap':
-            move['target'].good_statuses['double~tap'] = True
-            return move, {}
-        elif move['tactic'] == 'hulk~out':
-            if 'hulk~out' in move['target'].good_statuses:
-                if move['target'].good_statuses['hulk~out'] < 2:
-                    move['target'].good_statuses['hulk~out'] += 0.5
-            else:
-                move['target'].good_statuses['hulk~out'] = 1.5
-            return move, {}
-
-    def execute_tactic_type_allies(self, move, good_target_team_statuses, is_ally_move):
-        info = TACTICS[move['tactic']]
-        norm_intel = move['agent'].intelligence / 255.0
-        prelim_healing_range = info['max_damage'] - info['min_damage']
-        targets = self.allies if is_ally_move else self.enemies
-        results = {'targets': []}
-        for target in targets:
-            if target.get_future_soldiers() == 0:
-                continue
-            norm_cutoff = random.uniform(0.0, norm_intel)
-            cutoff = int(norm_cutoff * prelim_healing_range)
-            mod_min_healing = info['min_damage'] + cutoff
-            healing = random.randrange(mod_min_healing, info['max_damage'])
-            if target.get_future_soldiers() + healing > target.max_soldiers:
-                healing = target.max_soldiers - target.get_future_soldiers()
-            target.get_healed(healing)
-            results['targets'].append({'target': target, 'healing': healing})
-        return move, results
-
-    def execute_tactic_type_enemy(self, move, good_target_team_statuses, is_ally_move):
-        info = TACTICS[move['tactic']]
-        success = self.get_tactic_success(move)
-        if not success:
-            return move, {'fail': True}
-        if 'min_damage' in info:
-            norm_intel = move['agent'].intelligence / 255.0
-            norm_cutoff = random.uniform(0.0, norm_intel)
-            prelim_damage_range = info['max_damage'] - info['min_damage']
-            cutoff = int(norm_cutoff * prelim_damage_range)
-            mod_min_damage = info['min_damage'] + cutoff
-            damage = random.randrange(mod_min_damage, info['max_damage'])
-            if self.start_with_shiz and not is_ally_move:
-                damage = int(damage * START_WITH_SHIZ_MULTIPLIER)
-            if info['slot'] == 1:
-                if 'firewall' in good_target_team_statuses:
-                    damage = int(damage//2)
-                elif 'extinguish' in good_target_team_statuses:
-                    damage = 1
-            if move['target'].get_future_soldiers() <= damage:
-                damage = move['target'].get_future_soldiers()
-                move['target'].get_damaged(damage)
-                killed = move['target'].get_future_soldiers() == 0
-                return move, {'damage': damage, 'killed': killed}
-            move['target'].get_damaged(damage)
-            return move, {'damage': damage}
-        elif info.get('duration') == 'permanent':
-            move['target'].bad_status = {'name': move['tactic'], 'agent': move['agent']}
-            if is_ally_move:
-                move['target'].bad_status['count'] = 5
-            return move, {}
-
-    def execute_tactic_type_enemies(self, move, good_target_team_statuses, is_ally_move):
-        info = TACTICS[move['tactic']]
-        norm_intel = move['agent'].intelligence / 255.0
-        prelim_damage_range = info['max_damage'] - info['min_damage']
-        targets = self.enemies if is_ally_move else self.allies
-        results = {'targets': []}
-        for target in targets:
-            if target.get_future_soldiers() == 0:
-                continue
-            success = self.get_tactic_success(move, target=target)
-            if not success:
-                results['targets'].append({'target': target, 'fail': True})
-            else:
-                norm_cutoff = random.uniform(0.0, norm_intel)
-                cutoff = int(norm_cutoff * prelim_damage_range)
-                mod_min_damage = info['min_damage'] + cutoff
-                damage = random.randrange(mod_min_damage, info['max_damage'])
-                if self.start_with_shiz and not is_ally_move:
-                    damage = int(damage * START_WITH_SHIZ_MULTIPLIER)
-                if info['slot'] == 1:
-                    if 'firewall' in good_target_team_statuses:
-                        damage = int(damage//2)
-                    elif 'extinguish' in good_target_team_statuses:
-                        damage = 1
-                if target.get_future_soldiers() <= damage:
-                    damage = target.get_future_soldiers()
-                    target.get_damaged(damage)
-                    killed = target.get_future_soldiers() == 0
-                    results['targets'].append({'target': target, 'damage': damage, 'killed': killed})
-                    if killed:
-                        results['killed'] = True # This is needed in case everyone is killed, to trigger win/lose
-                else:
-                    target.get_damaged(damage)
-                    results['targets'].append({'target': target, 'damage': damage})
-        return move, results
-
-    def execute_tactic_type_single(self, move, good_target_team_statuses, is_ally_move):
-        info = TACTICS[move['tactic']]
-        success = self.get_tactic_success(move)
-        if not success:
-            return move, {'fail': True}
-        elif move['tactic'] == 'dispel':
-            acting_team = self.allies if is_ally_move else self.enemies
-            for warlord in acting_team:
-                warlord.bad_status = None
-            target_team = self.enemies if is_ally_move else self.allies
-            for warlord in target_team:
-                warlord.good_statuses = {}
-            good_target_team_statuses.clear() # set dictionary to empty
-            return move, {}
-        elif move['tactic'] == 'plunder':
-            direction = 1 if is_ally_move else -1
-            if self.plundered == direction:
-                return move, {'fail': True}
-            else:
-                self.plundered += direction
-                amount = self.collect_spoils(plunder=direction)
-                return move, {'amount': amount}
-        elif move['tactic'] == 'surrender':
-            self.handle_retreat(surrender=True)
-            return move, {}
-        return move, {'fail': True} # This is a placeholder til we get all single tactics
-
-    def execute_move_taunt(self, move):
-        return move, {}
-
-    def get_tactic_success(self, move, target=None):
-        if self.game.devtools['Infinity gauntlet']:
-            if move['agent'] in self.allies:
-                return True
-            else:
-                return False
-        prob_type = TACTICS[move['tactic']]['success_probability_type']
-        target = target or move.get('target')
-        if not target and prob_type in ['enemy_prob', 'enemy_prob2']:
-            print(u"We shouldn't be having a move without a target if the prob_type is enemy_prob or enemy_prob2.")
-            print(u"move: {}".format(move))
-            raise Exception
-        if prob_type == 'enemy_prob':
-            intel = move['agent'].intelligence
-            enemy_intel = target.intelligence
-            enemy_prob = ((intel-enemy_intel)/255.0+1.0)/2.0
-            random_draw = random.random()
-            return random_draw < enemy_prob
-        elif prob_type == 'enemy_prob2':
-            intel = move['agent'].intelligence
-            enemy_intel = target.intelligence
-            enemy_prob = ((intel-enemy_intel)/255.0+1.0)/2.0
-            enemy_prob2 = min(1.0, enemy_prob*2)
-            return random.random() < enemy_prob2
-        elif prob_type == 'one':
-            return True
-        elif prob_type == 'intel_prob':
-            intel = move['agent'].intelligence
-            intel_prob = intel/255.0
-            return random.random() < intel_prob
-        elif prob_type == 'assassin':
-            intel = move['agent'].intelligence
-            enemy_intel = target.intelligence
-            enemy_prob = ((intel-enemy_intel)/255.0+1.0)/2.0
-            assassin = enemy_prob / 3.0
-            return random.random() < assassin
-
-    def execute_move_defend(self, move):
-        move['agent'].good_statuses['defend'] = True
-        return move, {'defend': True}
-
-    def change_move_if_dead_or_cursed(self):
-        if self.move['action'] in [self.execute_move_kill_teancum, self.execute_move_ammoron_dies]:
-            return
-        if self.move['agent'].get_future_soldiers() == 0:
-            self.move = None
-            return
-        if self.move['agent'].bad_status:
-            if self.move['agent'].bad_status['agent'].get_future_soldiers() == 0 or self.move['agent'].bad_status.get('count') == 0:
-                self.move['agent'].bad_status = None
-                return
-            if self.move['agent'].bad_status['name'] == 'disable':
-                self.move = {'agent': self.move['agent'], 'action': self.execute_move_disable}
-            elif self.move['agent'].bad_status['name'] == 'confuse':
-                if self.move['agent'] in self.allies:
-                    random_target = random.choice(self.get_live_allies())
-                else:
-                    random_target = random.choice(self.get_live_enemies())
-                self.move = {'agent': self.move['agent'], 'action': self.execute_move_confuse, 'target': random_target}
-            else: # provoke
-                self.move = {
-                    'agent': self.move['agent'],
-                    'action': self.execute_move_provoke,
-                    'target': self.move['agent'].bad_status['agent'],
-                }
-            if 'count' in self.move['agent'].bad_status:
-                self.move['agent'].bad_status['count'] -= 1
-
-    def generate_enemy_moves(self):
-        if self.offguard == 1:
-            self.offguard = 0
-        else:
-            ally_dangers = {ally.index: ally.get_danger() for ally in self.allies if ally.get_future_soldiers() > 0}
-            sum_dangers = sum(ally_dangers.values())
-            ally_target_probabilities = {index: danger*1.0 / sum_dangers for index, danger in ally_dangers.items()}
-            for enemy in self.get_live_enemies():
-                ally_target_index = self.choose_random_target(ally_target_probabilities)
-                self.enemy_moves.append(self.generate_enemy_move(enemy, ally_target_index, sum_dangers))
-
-    def choose_random_target(self, target_probabilities):
-        sample = random.random()
-        for target in sorted(target_probabilities, key=target_probabilities.get):
-            prob = target_probabilities[target]
-            if sample < prob:
-                return target
-            sample -= prob
-
-    def generate_enemy_move(self, enemy, ally_target_index, sum_dangers):
-        if (
-            self.battle_name == 'battle55'
-            and enemy.name == 'ammoron'
-            and self.offguard == -1
-        ):
-            teancum = None
-            for ally in self.get_live_allies():
-                if ally.name == 'teancum':
-                    teancum = ally
-                    break
-            if teancum:
-                # ammoron uses disable on teancum the first time
-                action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[4], 'target': teancum}
-                enemy.consume_tactical_points(TACTICS[enemy.tactics[4]]['tactical_points'])
-                return action
-        ally_target = self.allies[ally_target_index]
-        random_enemy = random.choice(self.get_live_enemies())
-
-        # heal
-        heal_tactic = enemy.tactics[2] if enemy.tactics else None
-        tactical_points = enemy.tactical_points
-        heal_cost = TACTICS.get(heal_tactic, {}).get('tactical_points', 0)
-        if (
-            heal_tactic and heal_cost <= tactical_points and enemy.get_future_soldiers()*1.0/enemy.max_soldiers < .5
-            and sum_dangers > enemy.get_future_soldiers() and random.random() < .7
-        ):
-            action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': heal_tactic}
-            enemy.consume_tactical_points(heal_cost)
-            if TACTICS[heal_tactic]['type'] == 'ally':
-                action.update({'target': enemy})
-            return action
-
-        # dispel
-        if (
-            (enemy.tactics[4] if enemy.tactics else None) == 'dispel'
-            and (
-                len(self.good_ally_statuses) > 0
-                or any([an_enemy.bad_status for an_enemy in self.enemies if an_enemy.get_future_soldiers() > 0])
-            )
-            and TACTICS['dispel']['tactical_points'] + heal_cost <= tactical_points
-            and random.random() < .2
-        ):
-            enemy.consume_tactical_points(TACTICS['dispel']['tactical_points'])
-            return {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': 'dispel'}
-
-        # defense
-        defense_tactic = enemy.tactics[3] if enemy.tactics else None
-        defense_cost = TACTICS.get(defense_tactic, {}).get('tactical_points', 0)
-        if (
-            defense_tactic
-            and defense_tactic != 'train'
-            and heal_cost + defense_cost <= tactical_points
-            and defense_tactic not in self.good_enemy_statuses
-            and (
-                defense_tactic not in ['firewall', 'extinguish']
-                or ('firewall' not in self.good_enemy_statuses and 'extinguish' not in self.good_enemy_statuses)
-            )
-            and random.random() < .2
-        ):
-            enemy.consume_tactical_points(defense_cost)
-            return {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': defense_tactic}
-
-        # provoke, disable
-        enemy_prob = self.get_enemy_prob(enemy, ally_target)
-        if (
-            (enemy.tactics[4] if enemy.tactics else None) in ['provoke', 'disable']
-            and heal_cost + TACTICS[enemy.tactics[4]]['tactical_points'] <= tactical_points
-            and ally_target.bad_status is None
-            and random.random() < enemy_prob
-            and random.random() < .3 # we don't want to be using these all the time
-        ):
-            enemy.consume_tactical_points(TACTICS[enemy.tactics[4]]['tactical_points'])
-            return {
-                'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[4], 'target': ally_target,
-            }
-
-        # confuse
-        if (
-            (enemy.tactics[5] if enemy.tactics else None) == 'confuse'
-            and heal_cost + TACTICS[enemy.tactics[5]]['tactical_points'] <= tactical_points
-            and ally_target.bad_status is None
-            and random.random() < enemy_prob
-            and random.random() < .3 # we don't want to be using these all the time
-        ):
-            enemy.consume_tactical_points(TACTICS[enemy.tactics[5]]['tactical_points'])
-            return {
-                'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[5], 'target': ally_target,
-            }
-
-        # assassin
-        if (
-            (enemy.tactics[5] if enemy.tactics else None) == 'assassin'
-            and heal_cost + TACTICS[enemy.tactics[5]]['tactical_points'] <= tactical_points
-            and random.random() < enemy_prob
-            and random.random() < .5 # we don't want to be using these all the time
-        ):
-            enemy.consume_tactical_points(TACTICS[enemy.tactics[5]]['tactical_points'])
-            return {
-                'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[5], 'target': ally_target,
-            }
-
-        # boost_tactic: ninja, double tap, hulk out
-        boost_tactic = enemy.tactics[5] if enemy.tactics else None
-        if boost_tactic in ['ninja', 'double~tap', 'hulk~out']:
-            if (
-                (boost_tactic == 'hulk~out' or boost_tactic not in random_enemy.good_statuses)
-                and heal_cost + TACTICS[boost_tactic]['tactical_points'] <= tactical_points
-                and random.random() < .2
-            ):
-                enemy.consume_tactical_points(TACTICS[enemy.tactics[5]]['tactical_points'])
-                return {
-                    'agent': enemy, 'action': self.execute_move_tactic, 'tactic': boost_tactic, 'target': random_enemy,
-                }
-
-        # plunder
-        if (
-            (enemy.tactics[4] if enemy.tactics else None) == 'plunder'
-            and heal_cost + TACTICS['plunder']['tactical_points'] <= tactical_points
-            and self.plundered != -1
-            and random.random() < .2
-        ):
-            enemy.consume_tactical_points(TACTICS['plunder']['tactical_points'])
-            return {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': 'plunder'}
-
-        # water
-        maybe_do_water_tactic_damage = (
-            enemy.tactic_danger > enemy.get_preliminary_damage()
-            or random.random() < 0.1
-        )
-        enemy_prob2 = min(1.0, enemy_prob*2)
-        if (
-            maybe_do_water_tactic_damage
-            and enemy.tactics
-            and enemy.tactics[1]
-            and self.near_water
-            and heal_cost + TACTICS[enemy.tactics[1]]['tactical_points'] <= tactical_points
-            and random.random() < enemy_prob2
-        ):
-            enemy.consume_tactical_points(TACTICS[enemy.tactics[1]]['tactical_points'])
-            action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[1]}
-            if TACTICS[enemy.tactics[1]]['type'] == 'enemy':
-                action.update({'target': ally_target})
-            return action
-
-        # fire
-        effective_fire_tactic_danger = (
-            1 if 'extinguish' in self.good_ally_statuses
-            else enemy.tactic_danger / 2 if 'firewall' in self.good_ally_statuses
-            else enemy.tactic_danger
-        )
-        maybe_do_fire_tactic_damage = (
-            effective_fire_tactic_danger > enemy.get_preliminary_damage()
-            or random.random() < 0.1
-        )
-        if (
-            maybe_do_fire_tactic_damage
-            and enemy.tactics
-            and enemy.tactics[0]
-            and heal_cost + TACTICS[enemy.tactics[0]]['tactical_points'] <= tactical_points
-            and random.random() < enemy_prob2
-        ):
-            enemy.consume_tactical_points(TACTICS[enemy.tactics[0]]['tactical_points'])
-            action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[0]}
-            if TACTICS[enemy.tactics[0]]['type'] == 'enemy':
-                action.update({'target': ally_target})
-            return action
-
-        # battle
-        return {'agent': enemy, 'action': self.execute_move_battle, 'target': ally_target}
-
-    def get_enemy_prob(self, attacker, target):
-        return ((attacker.intelligence - target.intelligence)/255.0+1)/2
-
-    def get_live_allies(self):
-        return [ally for ally in self.allies if ally.get_future_soldiers() > 0]
-
-    def submit_move(self, move):
-        self.submitted_moves.append(move)
-
-    def get_live_enemies(self):
-        return [enemy for enemy in self.enemies if enemy.get_future_soldiers() > 0]
-
     def handle_input_start(self, pressed):
         self.left_dialog.handle_input(pressed)
         if (pressed[K_x] or pressed[K_z]) and not self.left_dialog.has_more_stuff_to_show():
@@ -1793,6 +1037,7 @@ class Battle(object):
 
     def init_menu_state(self):
         self.state = 'menu'
+        self.forecast = None # the battle has moved on since the last one
         self.left_dialog = None
         self.right_dialog = None
         self.warlord = self.warlord or self.get_leader()
@@ -2144,7 +1389,8 @@ class Battle(object):
             self.warlord.move_back()
             self.state = 'risk_it'
             self.menu.unfocus()
-            time.sleep(1)
+            self.risk_it_volleys = 0
+            self.pause_time = RISK_IT_PAUSE
         else: # battle55
             self.state = 'error'
             self.menu.unfocus()
@@ -2178,8 +1424,10 @@ class Battle(object):
             self.menu.focus()
             self.selected_enemy_index = None
             self.selected_ally_index = None
+            self.right_dialog = None
         elif pressed[K_x]:
             self.state = 'report_selected'
+            self.right_dialog = None
             if self.selected_enemy_index is not None:
                 self.report = Report(stats=self.enemies[self.selected_enemy_index].stats)
             else: # self.selected_ally_index exists instead
@@ -2191,6 +1439,8 @@ class Battle(object):
             self.selected_ally_index = None
 
     def handle_input(self, pressed):
+        if self.pause_time > 0:
+            return
         if pressed[K_d]:
             self.debug = not self.debug
         elif pressed[K_RETURN]:
@@ -2559,6 +1809,8 @@ class Battle(object):
         self.state = 'report'
         self.menu.unfocus()
         self.selected_enemy_index = self.get_first_live_enemy_index()
+        if self.forecast is None:
+            self.forecast = Forecast(self)
 
     def get_first_live_enemy_index(self):
         for i, enemy in enumerate(self.enemies):
@@ -2587,7 +1839,7 @@ class Battle(object):
             enemy_agility = enemy_agility * enemy_agility # hacky way of making retreat somewhat easier
             agility_score = (1 + ally_agility - enemy_agility) / 2.0
             is_warlord_battle = self.battle_type=='warlord'
-            is_story_battle = self.battle_type in ['story', 'giddianhi', 'zemnarihah']
+            is_story_battle = self.battle_type in STORY_BATTLE_TYPES
             # always allow retreat from samuel or when enemy is unaware of approach
             if self.enemies[0].name == 'samuel' or self.offguard > 0:
                 successful = True
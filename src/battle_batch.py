@@ -0,0 +1,298 @@
+# -*- coding: UTF-8 -*-
+
+'''
+Plays thousands of independent battles between the same armies at once, as numpy arrays with one row per battle,
+for balance passes over the encounter tables and the soldiers-by-level curves (see benchmarks/balance.py). Nothing
+here needs a display, and numpy is only needed for this module, not the game.
+
+A batch battle plays the battle moves (what every ally does during ALL-OUT and RISK-IT, and what enemies do when
+they don't use a tactic) with the same rules as BattleCore.execute_move_battle and Warlord.get_damage: evasion, 1 in
+16 excellent hits, damage potential, weapon power, soldier gain, attack exposure, and the shield and repel team
+statuses. Enemies pick targets by danger like BattleCore.generate_enemy_moves, enemies with reinforcements come back
+at the end of every volley they're beaten in, and temporary statuses wear off as usual. Tactics and items aren't
+played, so for a battle where they matter, BattleCore.simulate_battle gives the exact odds, a battle at a time.
+'''
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from battle_core import BattleCore, REMOVE_STATUS_PROB, REMOVE_ADVANCED_STATUS_PROB, STORY_BATTLE_TYPES
+from helpers import (
+    get_armor_class_by_level,
+    get_attack_points_by_level,
+    get_enemy_stats,
+    get_max_soldiers,
+    get_max_tactical_points,
+    get_stats,
+    get_tactics,
+    unpretty,
+)
+
+MAX_BATCH_VOLLEYS = 200 # battles still going after this many volleys count as neither won nor lost
+DAMAGE_POTENTIALS = [25, 25, 25, 25, 25, 25, 25, 25, 23, 23, 23, 23, 23, 23, 20, 20] # see Warlord.get_damage_potential
+BATCH_STATUSES = ['shield', 'repel']
+POWERS_OF_TEN = [10**digits for digits in range(1, 19)]
+
+
+def get_ally_record(name, level, index=0):
+    '''
+    Returns a warlord record for an ally at level, like Battle.get_ally_record, but with the attack points and armor
+    class an enemy at that level has instead of the ones from the ally's equipment.
+    '''
+    json_stats = get_stats(name)
+    tactical_points = get_max_tactical_points(name, level)
+    soldiers = get_max_soldiers(name, level, is_ally=True)
+    return {
+        'index': index,
+        'name': name,
+        'strength': json_stats['strength'],
+        'intelligence': json_stats['intelligence'],
+        'defense': json_stats['defense'],
+        'agility': json_stats['agility'],
+        'evasion': json_stats['evasion'],
+        'attack_points': get_attack_points_by_level(level),
+        'armor_class': get_armor_class_by_level(level),
+        'tactical_points': tactical_points,
+        'max_tactical_points': tactical_points,
+        'soldiers': soldiers,
+        'max_soldiers': soldiers,
+        'tactics': get_tactics(json_stats, level, pretty=False),
+        'items': [],
+    }
+
+
+def get_enemy_record(name, stats, index=0):
+    '''
+    Returns a warlord record for an enemy from an encounter region's stats for it (either a 'level' or the stats
+    themselves), like Battle builds. The soldiers can be a list to choose from, like in the encounter tables.
+    '''
+    if 'level' in stats:
+        stats = get_enemy_stats(name, stats['level'])
+    return {
+        'index': index,
+        'name': name,
+        'strength': stats['strength'],
+        'intelligence': stats['intelligence'],
+        'defense': stats['defense'],
+        'agility': stats['agility'],
+        'evasion': stats['evasion'],
+        'attack_points': stats['attack_points'],
+        'armor_class': stats['armor_class'],
+        'tactical_points': stats['tactical_points'],
+        'max_tactical_points': stats['tactical_points'],
+        'soldiers': stats['soldiers'],
+        'max_soldiers': stats['soldiers'],
+        'tactics': unpretty(stats.get('tactics', ['','','','','',''])),
+        'items': [],
+        'reinforcements': stats.get('reinforcements', False),
+    }
+
+
+class BatchBattle(object):
+    '''
+    runs battles between the allies and the enemies (warlord records, as for BattleCore) played out side by side.
+    An enemy record's soldiers can be a list, and then each battle chooses from it. Call simulate, then look at
+    get_summary (or the arrays: won, lost, volleys and soldiers, with a row per battle and a column per warlord,
+    allies first).
+    '''
+
+    def __init__(
+        self, allies, enemies, runs=1000, seed=None, ally_tactics=None, battle_type=None, start_with_shiz=False,
+        reserve_multiplier=1.0, final_exp_multiplier=1, good_ally_statuses=None, good_enemy_statuses=None,
+    ):
+        if numpy is None:
+            raise ImportError('BatchBattle needs numpy (pip install numpy)')
+        self.rng = numpy.random.default_rng(seed)
+        self.runs = runs
+        self.num_allies = len(allies)
+        self.num_enemies = len(enemies)
+        self.battle_type = battle_type
+        self.reserve_multiplier = reserve_multiplier
+        self.final_exp_multiplier = final_exp_multiplier
+
+        # A BattleCore with the first choice of soldiers works out everything about the warlords that doesn't
+        # change during a battle, so that the formulas stay in one place.
+        first_choice = lambda record: dict(record, **{
+            key: record[key][0] for key in ['soldiers', 'max_soldiers'] if isinstance(record[key], list)
+        })
+        core = BattleCore(
+            [first_choice(ally) for ally in allies],
+            [first_choice(enemy) for enemy in enemies],
+            ally_tactics=ally_tactics,
+            start_with_shiz=start_with_shiz,
+        )
+        warlords = core.allies + core.enemies
+        self.names = [warlord.name for warlord in warlords]
+        self.compounded_strength = numpy.array([warlord.compounded_strength for warlord in warlords])
+        self.attack_exposure = numpy.array([warlord.attack_exposure for warlord in warlords])
+        self.agility = numpy.array([warlord.agility for warlord in warlords], dtype=float)
+        self.evasion = numpy.array([warlord.evasion for warlord in warlords], dtype=float)
+        self.tactic_danger = numpy.array([warlord.tactic_danger for warlord in warlords])
+        self.start_with_shiz_multiplier = numpy.array([warlord.start_with_shiz_multiplier for warlord in warlords])
+        self.reinforcements = numpy.array([bool(warlord.reinforcements) for warlord in warlords])
+
+        self.max_soldiers = numpy.empty((runs, len(warlords)), dtype=numpy.int64)
+        for i, record in enumerate(allies + enemies):
+            if isinstance(record['soldiers'], list):
+                self.max_soldiers[:, i] = self.rng.choice(record['soldiers'], size=runs)
+            else:
+                self.max_soldiers[:, i] = record['max_soldiers']
+        self.soldiers = self.max_soldiers.copy()
+        for i, record in enumerate(allies + enemies):
+            if not isinstance(record['soldiers'], list):
+                self.soldiers[:, i] = record['soldiers']
+
+        # Moves go in order of agility, and sorting is stable, so allies go before enemies that are as fast.
+        self.move_order = sorted(range(len(warlords)), key=lambda i: warlords[i].get_effective_agility(), reverse=True)
+
+        # statuses[side][status] is a bool per battle, and durations[side][status] is 'temporary' or 'permanent'
+        self.statuses = []
+        self.durations = []
+        for team_statuses in [good_ally_statuses or {}, good_enemy_statuses or {}]:
+            self.statuses.append({
+                status: numpy.full(runs, status in team_statuses) for status in BATCH_STATUSES
+            })
+            self.durations.append({status: team_statuses.get(status) for status in BATCH_STATUSES})
+
+        self.won = numpy.zeros(runs, dtype=bool)
+        self.lost = numpy.zeros(runs, dtype=bool)
+        self.volleys = numpy.zeros(runs, dtype=numpy.int64)
+        self.experience = numpy.zeros(runs, dtype=numpy.int64)
+        self.money = numpy.zeros(runs, dtype=numpy.int64)
+        self.food = numpy.zeros(runs, dtype=numpy.int64)
+
+    def get_side(self, warlord_index):
+        '''
+        Returns the column slice for the allies (for an ally's index) or the enemies (for an enemy's).
+        '''
+        if warlord_index < self.num_allies:
+            return slice(0, self.num_allies)
+        return slice(self.num_allies, self.num_allies + self.num_enemies)
+
+    def get_soldier_gain(self, soldiers):
+        # Warlord.get_soldier_gain doubles for every digit after the first
+        return numpy.ldexp(1.0, numpy.searchsorted(POWERS_OF_TEN, soldiers, side='right'))
+
+    def get_preliminary_damage(self, columns):
+        soldiers = self.soldiers[:, columns]
+        return self.compounded_strength[columns] * self.get_soldier_gain(soldiers) * 25 * 1.0
+
+    def choose(self, weights):
+        '''
+        Returns a column index for each row, chosen with the given weights (a row of all zeros gets column 0).
+        '''
+        cumulative = numpy.cumsum(weights, axis=1)
+        samples = self.rng.random(len(weights)) * cumulative[:, -1]
+        return numpy.minimum((cumulative <= samples[:, None]).sum(axis=1), weights.shape[1] - 1)
+
+    def simulate(self, max_volleys=MAX_BATCH_VOLLEYS):
+        '''
+        Plays out volleys in every battle that's still going until they're all over, or until max_volleys.
+        '''
+        rows = numpy.arange(self.runs)
+        allies = slice(0, self.num_allies)
+        enemies = self.get_side(self.num_allies)
+        for _ in range(max_volleys):
+            going = ~(self.won | self.lost)
+            if not going.any():
+                break
+            self.volleys += going
+
+            # Submit moves: allies attack a random live enemy, and enemies choose allies by how dangerous they are.
+            alive = self.soldiers > 0
+            targets = numpy.zeros((self.runs, self.num_allies + self.num_enemies), dtype=numpy.int64)
+            for i in range(self.num_allies):
+                targets[:, i] = self.num_allies + self.choose(alive[:, enemies].astype(float))
+            dangers = numpy.maximum(self.tactic_danger[allies], self.get_preliminary_damage(allies)) * alive[:, allies]
+            for i in range(self.num_allies, self.num_allies + self.num_enemies):
+                targets[:, i] = self.choose(dangers)
+            submitted = alive & going[:, None]
+
+            for agent in self.move_order:
+                active = submitted[:, agent] & (self.soldiers[:, agent] > 0) & ~(self.won | self.lost)
+                if not active.any():
+                    continue
+                target_side = self.get_side(0 if agent >= self.num_allies else self.num_allies)
+                team = 0 if agent >= self.num_allies else 1 # whose statuses protect the targets
+                target = targets[:, agent]
+                dead_target = self.soldiers[rows, target] == 0
+                if dead_target.any():
+                    retarget = target_side.start + self.choose((self.soldiers[:, target_side] > 0).astype(float))
+                    target = numpy.where(dead_target, retarget, target)
+
+                evade_prob = ((self.evasion[target] - self.agility[agent]) / 255.0 + 1) / 8.0
+                evaded = self.rng.random(self.runs) < evade_prob
+                excellent = self.rng.random(self.runs) < 1.0 / 16
+                potential = numpy.where(
+                    excellent, 51 / 25.0, self.rng.choice(DAMAGE_POTENTIALS, size=self.runs) / 25.0,
+                )
+                damage = numpy.floor(
+                    self.get_preliminary_damage(agent) * potential * self.start_with_shiz_multiplier[agent]
+                )
+                inflicted = numpy.floor(self.attack_exposure[target] * damage + 1).astype(numpy.int64)
+                inflicted = numpy.where(
+                    self.statuses[team]['shield'], numpy.maximum(inflicted // 2, 1), inflicted,
+                )
+                hit = active & ~self.statuses[team]['repel'] & ~evaded
+                inflicted = numpy.minimum(inflicted, self.soldiers[rows, target])
+                self.soldiers[rows[hit], target[hit]] -= inflicted[hit]
+
+                killed = hit & (self.soldiers[rows, target] == 0)
+                if killed.any():
+                    self.won |= killed & (self.soldiers[:, enemies] == 0).all(axis=1)
+                    self.lost |= killed & ~self.won & (self.soldiers[:, allies] == 0).all(axis=1)
+
+            going = ~(self.won | self.lost)
+            self.expire_statuses(going)
+            beaten = (self.soldiers == 0) & self.reinforcements & going[:, None]
+            self.soldiers[beaten] = self.max_soldiers[beaten]
+        self.collect_spoils()
+
+    def expire_statuses(self, going):
+        for team, is_ally in [(0, True), (1, False)]:
+            for status in BATCH_STATUSES:
+                if self.durations[team][status] != 'temporary':
+                    continue
+                prob = REMOVE_ADVANCED_STATUS_PROB if is_ally and status == 'repel' else REMOVE_STATUS_PROB
+                expired = going & self.statuses[team][status] & (self.rng.random(self.runs) < prob)
+                self.statuses[team][status] &= ~expired
+
+    def collect_spoils(self):
+        # same as BattleCore.get_spoils, without train (a tactic) or plunder
+        story_battle = self.battle_type in STORY_BATTLE_TYPES
+        story_battle_gain = 2 if story_battle else 1
+        new_base = 0.006 * self.max_soldiers[:, self.num_allies:].sum(axis=1)
+        experience = (
+            new_base * story_battle_gain * self.reserve_multiplier * self.final_exp_multiplier
+        ).astype(numpy.int64)
+        money = (
+            (4.5 + self.rng.random(self.runs)) * new_base
+        ).astype(numpy.int64) * story_battle_gain
+        food = (
+            (9.0 + 2.0 * self.rng.random(self.runs)) * new_base
+        ).astype(numpy.int64) if story_battle else numpy.zeros(self.runs, dtype=numpy.int64)
+        self.experience = numpy.where(self.won, experience, 0)
+        self.money = numpy.where(self.won, money, 0)
+        self.food = numpy.where(self.won, food, 0)
+
+    def get_summary(self):
+        '''
+        Returns a dict with the share of battles won and lost, the average number of volleys, the average share of
+        each ally's soldiers lost, and the average spoils (counting battles that weren't won as getting nothing).
+        '''
+        ally_soldiers = self.max_soldiers[:, :self.num_allies]
+        losses = 1.0 - self.soldiers[:, :self.num_allies] / numpy.maximum(ally_soldiers, 1)
+        return {
+            'runs': self.runs,
+            'win_rate': float(self.won.mean()),
+            'lose_rate': float(self.lost.mean()),
+            'volleys': float(self.volleys.mean()),
+            'ally_losses': {
+                self.names[i]: float(losses[:, i].mean()) for i in range(self.num_allies)
+            },
+            'experience': float(self.experience.mean()),
+            'money': float(self.money.mean()),
+            'food': float(self.food.mean()),
+        }
@@ -0,0 +1,1189 @@
+# -*- coding: UTF-8 -*-
+
+'''
+The rules of combat, without any of the presentation: no surfaces, sounds, text boxes or game object. A BattleCore
+is built from plain warlord records (the dicts battle.Battle builds from the company and the enemy stats) and draws
+every random number from its own rng, so a battle can be played out headless and reproducibly:
+
+    core = BattleCore(ally_records, enemy_records, rng=random.Random(seed))
+    core.simulate_battle()
+    core.state # 'win' or 'lose'
+
+battle.Battle is a subclass that adds the menus, dialog, animation and sounds, and the hooks here that touch the
+rest of the game (collect_spoils, handle_win, surrender...) get overridden there to do so.
+'''
+
+import collections
+import copy
+import random
+
+from constants import ITEMS, TACTICS, WEAPON_POWER, START_WITH_SHIZ_MULTIPLIER
+
+REMOVE_STATUS_PROB = 0.2 # Chance that a temporary status expires at the end of a volley
+REMOVE_ADVANCED_STATUS_PROB = 0.27 # Chance that an ally's temporary advanced status expires at the end of a volley
+STORY_BATTLE_TYPES = ['story', 'giddianhi', 'zemnarihah']
+END_STATES = ['win', 'lose', 'retreat']
+MAX_QUEUED_SOLDIERS_CHANGES = 16 # past this, the oldest changes in a warlord's queue get merged into one
+
+
+class Warlord(object):
+    '''
+    The state of one warlord in a battle, and the rules for how much damage it does and takes.
+    '''
+
+    def __init__(self, warlord, battle, is_enemy=False):
+        self.soldiers_change_queue = collections.deque()
+        self.queued_soldiers_change = 0 # the sum of soldiers_change_queue
+        self.is_enemy = is_enemy
+        self.items = warlord['items']
+        self.battle = battle
+        self.stats = warlord
+        self.name = warlord['name']
+        self.soldiers = warlord['soldiers']
+        self.max_soldiers = warlord['max_soldiers']
+        self.headless = warlord.get('headless', False)
+        self.queue_headless = self.headless
+        self.strength = warlord['strength']
+        self.attack_points = warlord['attack_points']
+        wp_index = self.attack_points - self.attack_points % 5
+        self.weapon_power = WEAPON_POWER[wp_index]
+            # subtracting modulo 5 ensures that whatever the attack_points are, we can still look up
+            # a weapon power in the table which only has multiples of 5
+        self.compounded_strength = self.strength * self.weapon_power / 256.0 / 256.0
+        self._tactics = warlord['tactics']
+        self.intelligence = warlord['intelligence']
+        self.tactic_danger = self.compute_tactic_danger()
+        self.max_tactical_points = warlord['max_tactical_points']
+        self.tactical_points = warlord['tactical_points']
+        self.bad_status = None
+        self.good_statuses = {}
+        self.index = warlord['index']
+        self.attack_exposure = 1.0 - warlord['defense'] / 341.0 # defense of 255 cuts damage by 75%
+        self.agility = warlord['agility']
+        self.evasion = warlord['evasion']
+        self.reinforcements = warlord.get('reinforcements', False)
+        self.capture = warlord.get('capture', False)
+        self.start_with_shiz_multiplier = START_WITH_SHIZ_MULTIPLIER if is_enemy and battle.start_with_shiz else 1.0
+
+    def get_record(self):
+        '''
+        Returns a warlord record like the one this warlord was built from, but with its soldiers (counting the
+        changes that haven't been shown yet), tactical points and items as they are now.
+        '''
+        record = dict(self.stats)
+        record.update({
+            'soldiers': self.get_future_soldiers(),
+            'tactical_points': self.tactical_points,
+            'items': list(self.items),
+            'headless': self.headless,
+            'reinforcements': self.reinforcements,
+            'capture': self.capture,
+        })
+        return record
+
+    def consume_tactical_points(self, points):
+        if self.is_enemy or 'liahona' in [item['name'] for item in self.items]:
+            self.tactical_points -= points
+        else:
+            self.battle.ally_tactical_points -= points
+
+    def get_effective_agility(self):
+        if self.good_statuses.get('ninja'):
+            return 255
+        else:
+            return self.agility
+
+    def restore_tactical_points(self, points):
+        if 'liahona' in [item['name'] for item in self.items]:
+            self.tactical_points += points
+        else:
+            self.battle.ally_tactical_points += points
+
+    @property
+    def tactics(self):
+        if 'liahona' in [item['name'] for item in self.items] or self.is_enemy:
+            return self._tactics
+        else:
+            return self.battle.ally_tactics
+
+    def get_tactical_points(self):
+        if 'liahona' in [item['name'] for item in self.items]:
+            return self.tactical_points
+        else:
+            return self.battle.ally_tactical_points
+
+    def get_danger(self):
+        return max(self.tactic_danger, self.get_preliminary_damage())
+
+    def compute_tactic_danger(self):
+        assassin = (
+            self.intelligence / 255.0 / 3.0 * self.max_soldiers
+            if self.tactics and 'assassin' in self.tactics
+            else 0.0
+        )
+        fire = self.intelligence / 255.0 * self.get_max_tactic_damage(slot=1)
+        water = self.intelligence / 255.0 * self.get_max_tactic_damage(slot=2)
+        heal = self.intelligence / 255.0 * self.get_max_tactic_damage(slot=3)
+        return max(assassin, fire, water, heal)
+
+    def get_max_tactic_damage(self, slot=None):
+        if slot is None or self.tactics is None:
+            return 0
+        tactic = self.tactics[slot-1]
+        tactic = tactic.strip('~').lower()
+        if tactic == '':
+            return 0
+        return TACTICS[tactic].get('max_damage', 0)
+
+    def get_preliminary_damage(self):
+        # including *25 for accurate get_danger() results, simulating a good damage potential
+        hulk_boost = self.good_statuses.get('hulk~out', 1.0)
+        return self.compounded_strength * self.get_soldier_gain() * 25 * hulk_boost
+
+    def get_damage(self, excellent=False):
+        if self.battle.devtools.get('Infinity gauntlet'):
+            if self.is_enemy:
+                return 0 # With infinity gauntlet on, bad guys hit with zero (battly.py corrects this to 1 though)
+            else:
+                return 1e8 # With infinity gauntlet on, good guys always hit with 100,000,000 damage (before target's attack exposure)
+        return int(
+            self.get_preliminary_damage()
+            * self.get_damage_potential(excellent=excellent)
+            * self.start_with_shiz_multiplier
+        )
+
+    def get_damage_potential(self, excellent=False):
+        # including /25.0 to make up for the *25 in get_preliminary_damage()
+        if excellent:
+            return 51 / 25.0
+        return self.battle.random.choice([25, 25, 25, 25, 25, 25, 25, 25, 23, 23, 23, 23, 23, 23, 20, 20]) / 25.0
+
+    def get_soldier_gain(self):
+        soldier_gain = 1.0
+        for num in range(len(str(self.soldiers))-1):
+            soldier_gain *= 2
+        return soldier_gain
+
+    def get_healed(self, soldiers):
+        self.queue_soldiers_change(soldiers)
+
+    def get_damaged(self, soldiers):
+        if (
+            self.name == 'shiz' and not self.is_enemy and not self.queue_headless
+            and self.get_future_soldiers() == soldiers
+        ):
+            self.queue_headless = True
+            self.queue_soldiers_change(self.max_soldiers - soldiers)
+        else:
+            self.queue_soldiers_change(-soldiers)
+
+    def queue_soldiers_change(self, delta):
+        '''
+        Queues a change to the soldiers for the UI to show when its move gets animated. Each animated move shows one
+        change, but nothing drains the queue while a battle gets simulated (like enemy reinforcements during
+        RISK-IT), so once it's full the two oldest changes get merged and show up together.
+        '''
+        if len(self.soldiers_change_queue) >= MAX_QUEUED_SOLDIERS_CHANGES:
+            oldest = self.soldiers_change_queue.popleft()
+            self.soldiers_change_queue[0] += oldest
+        self.soldiers_change_queue.append(delta)
+        self.queued_soldiers_change += delta
+
+    def reinforce(self, dequeue=False):
+        self.get_healed(self.max_soldiers)
+        if dequeue:
+            self.dequeue_soldiers_change()
+
+    def dequeue_soldiers_change(self):
+        if len(self.soldiers_change_queue) > 0:
+            soldiers = self.soldiers_change_queue.popleft()
+            self.queued_soldiers_change -= soldiers
+            self.update_soldiers_change(soldiers)
+
+    def update_soldiers_change(self, delta):
+        self.soldiers += delta
+        if self.name == 'shiz' and not self.is_enemy and self.queue_headless:
+            self.headless = self.queue_headless
+
+    def get_future_soldiers(self):
+        '''
+        This gives the actual number of soldiers in the simulation, but not the advertised number of soldiers.
+        We store the advertised number in self.soldiers so that that is what the UI displays, but any simulated moves
+        that haven't been animated yet can result in soldier increases or decreases, which are queued in
+        self.soldiers_change_queue (and summed up as they go in and out in self.queued_soldiers_change).
+        '''
+        return self.soldiers + self.queued_soldiers_change
+
+
+class BattleCore(object):
+    '''
+    Moves, targets, damage, statuses and spoils for a battle between allies and enemies. A move is a dict with the
+    'agent' making it, the 'action' (one of the execute_move_* methods) and, depending on the action, a 'target',
+    'tactic' or 'item'. Executing a move returns the move (it can change, like when the agent is confused) and a
+    dict of results, which get_mini_moves splits into the steps that get shown (or, headless, just applied) one at
+    a time.
+    '''
+
+    def __init__(
+        self, allies, enemies, ally_tactical_points=0, ally_tactics=None, max_ally_tactical_points=None,
+        near_water=False, battle_type=None, battle_name=None, offguard=0, start_with_shiz=False, scouting=False,
+        reserve_multiplier=1.0, final_exp_multiplier=1, ally_money=0, devtools=None, rng=None,
+    ):
+        # plundered can be 0, -1, or 1.
+        # If you use plunder, it moves up 1 and you get money.
+        # If plundered is 1 and you use plunder, it fails.
+        # If the enemy uses plunder, it moves down 1 and you lose money.
+        # If plundered is -1, the enemy won't use plunder.
+        # The amount plundered is equal to the spoils if you win, but the change to your money is immediate.
+        self.plundered = 0
+
+        self.random = rng or random.Random()
+        self.devtools = devtools or {}
+        self.ally_tactical_points = ally_tactical_points or 0
+        self.max_ally_tactical_points = (
+            max_ally_tactical_points if max_ally_tactical_points is not None else self.ally_tactical_points
+        )
+        self.ally_tactics = [tactic.strip('~').lower() for tactic in ally_tactics] if ally_tactics else ['']*6
+        self.near_water = near_water
+        self.battle_type = battle_type
+        self.battle_name = battle_name
+        self.offguard = offguard
+        self.start_with_shiz = start_with_shiz
+        self.scouting = scouting # when the scout is out, allies with the train tactic use it automatically
+        self.reserve_multiplier = reserve_multiplier
+        self.final_exp_multiplier = final_exp_multiplier
+        self.ally_money = ally_money # how much money the enemy can plunder
+        self.state = 'start'
+        self.submitted_moves = []
+        self.enemy_moves = []
+        self.ordered_moves = []
+        self.good_enemy_statuses = {}
+        self.good_ally_statuses = {}
+        self.move = None
+        self.results = None
+        self.mini_moves = []
+        self.mini_results = []
+        self.mini_move = None
+        self.mini_result = None
+        self.experience = 0
+        self.money = 0
+        self.food = 0
+        self.allies = [self.create_warlord(ally, is_enemy=False) for ally in allies]
+        self.enemies = [self.create_warlord(enemy, is_enemy=True) for enemy in enemies]
+
+    def create_warlord(self, warlord, is_enemy):
+        return Warlord(warlord, self, is_enemy=is_enemy)
+
+    def get_snapshot(self, rng=None):
+        '''
+        Returns a plain BattleCore in the same state as this battle, drawing from rng, for trying things out (like
+        simulating the rest of the battle) without touching this one or anything in the game.
+        '''
+        snapshot = BattleCore(
+            [ally.get_record() for ally in self.allies],
+            [enemy.get_record() for enemy in self.enemies],
+            ally_tactical_points=self.ally_tactical_points,
+            ally_tactics=self.ally_tactics,
+            max_ally_tactical_points=self.max_ally_tactical_points,
+            near_water=self.near_water,
+            battle_type=self.battle_type,
+            battle_name=self.battle_name,
+            offguard=self.offguard,
+            start_with_shiz=self.start_with_shiz,
+            scouting=self.scouting,
+            reserve_multiplier=self.reserve_multiplier,
+            final_exp_multiplier=self.final_exp_multiplier,
+            ally_money=self.get_ally_money(),
+            devtools=self.devtools,
+            rng=rng,
+        )
+        snapshot.state = self.state if self.is_over() else 'start'
+        snapshot.plundered = self.plundered
+        snapshot.good_ally_statuses = dict(self.good_ally_statuses)
+        snapshot.good_enemy_statuses = dict(self.good_enemy_statuses)
+        copies = dict(zip(self.allies + self.enemies, snapshot.allies + snapshot.enemies))
+        for warlord, copy_of_warlord in copies.items():
+            copy_of_warlord.good_statuses = dict(warlord.good_statuses)
+            copy_of_warlord.queue_headless = warlord.queue_headless
+            if warlord.bad_status:
+                copy_of_warlord.bad_status = dict(warlord.bad_status, agent=copies[warlord.bad_status['agent']])
+        return snapshot
+
+    def is_over(self):
+        return self.state in END_STATES
+
+    def get_live_allies(self):
+        return [ally for ally in self.allies if ally.get_future_soldiers() > 0]
+
+    def get_live_enemies(self):
+        return [enemy for enemy in self.enemies if enemy.get_future_soldiers() > 0]
+
+    def submit_move(self, move):
+        self.submitted_moves.append(move)
+
+    def get_moves_in_order_of_agility(self):
+        the_moves = self.submitted_moves + self.enemy_moves
+        the_moves.sort(key=lambda move: move['agent'].get_effective_agility(), reverse=True)
+        return the_moves
+
+    ###########################################################
+    # Volleys                                                 #
+    ###########################################################
+
+    def simulate_battle(self, max_volleys=None):
+        '''
+        Plays out volleys of AI moves for both sides (what RISK-IT does) until the battle is over, or until
+        max_volleys have gone by. Returns whether the battle is over.
+        '''
+        volleys = 0
+        while not self.is_over() and (max_volleys is None or volleys < max_volleys):
+            self.simulate_volley()
+            self.submitted_moves = []
+            self.enemy_moves = []
+            self.ordered_moves = []
+            volleys += 1
+        return self.is_over()
+
+    def simulate_volley(self):
+        self.submit_ai_moves()
+        self.execute_moves()
+        self.expire_statuses()
+        self.call_reinforcements()
+
+    def submit_ai_moves(self, include_allies=True):
+        if include_allies:
+            enemies = self.get_live_enemies()
+            for ally in self.get_live_allies():
+                if (
+                    self.scouting
+                    and 'train' not in self.good_ally_statuses
+                    and ally.tactics
+                    and ally.tactics[4] == 'train'
+                    and ally.tactical_points >= TACTICS['train']['tactical_points']
+                ):
+                    move = {'agent': ally, 'action': self.execute_move_tactic, 'tactic': 'train'}
+                    ally.consume_tactical_points(TACTICS['train']['tactical_points'])
+                    # Do this early and redundantly so that we don't have all the allies choose this as their move
+                    self.good_ally_statuses['train'] = TACTICS['train']['duration']
+                else:
+                    move = {'agent': ally, 'action': self.execute_move_battle, 'target': self.random.choice(enemies)}
+                self.submit_move(move)
+        self.generate_enemy_moves()
+        self.ordered_moves = self.get_moves_in_order_of_agility()
+
+    def execute_moves(self):
+        for move in self.ordered_moves:
+            self.move = move
+            result = self.execute_move(fast=True)
+            if not self.move:
+                continue
+            self.mini_moves, self.mini_results = self.get_mini_moves(self.move, self.results)
+            if result != 'continue':
+                break
+            # This needs to be after the break so that we don't call handle_win twice.
+            while self.mini_moves:
+                self.pop_and_handle_mini_move(silent=True)
+
+    def execute_move(self, fast=False):
+        self.change_move_if_dead_or_cursed()
+        if self.move is not None:
+            if 'defend' in self.move['agent'].good_statuses:
+                del self.move['agent'].good_statuses['defend']
+            action_handler = self.move['action']
+            self.move, self.results = action_handler(self.move)
+            if fast and self.results.get('killed'): # fast means this is using risk it for a fast simulation
+                if all(enemy.get_future_soldiers() == 0 for enemy in self.enemies):
+                    self.handle_win()
+                    return 'win'
+                elif all(ally.get_future_soldiers() == 0 for ally in self.allies):
+                    self.handle_lose()
+                    return 'lose'
+        else:
+            self.results = None
+        return 'continue'
+
+    def status_expired(self, status, duration, is_ally):
+        if duration != 'temporary':
+            return False
+        if is_ally and status in ['deflect', 'repel']:
+            return self.random.random() < REMOVE_ADVANCED_STATUS_PROB
+        else:
+            return self.random.random() < REMOVE_STATUS_PROB
+
+    def expire_statuses(self):
+        '''
+        Ends the volley for the team statuses, each temporary one having a chance to wear off. Returns the lists of
+        ally and enemy statuses that did.
+        '''
+        ally_status_updates = []
+        enemy_status_updates = []
+        for (status, duration) in list(self.good_ally_statuses.items()):
+            if self.status_expired(status, duration, True):
+                del self.good_ally_statuses[status]
+                ally_status_updates.append(status)
+        for (status, duration) in list(self.good_enemy_statuses.items()):
+            if self.status_expired(status, duration, False):
+                del self.good_enemy_statuses[status]
+                enemy_status_updates.append(status)
+        return ally_status_updates, enemy_status_updates
+
+    def call_reinforcements(self, dequeue=False):
+        '''
+        Brings every beaten enemy that has reinforcements back to full strength. Returns whether any did.
+        '''
+        got_reinforcements = False
+        for enemy in self.enemies:
+            if enemy.reinforcements and enemy.get_future_soldiers() == 0:
+                enemy.reinforce(dequeue=dequeue)
+                got_reinforcements = True
+        return got_reinforcements
+
+    def get_mini_moves(self, move, results):
+        mini_moves = []
+        mini_results = []
+        if move['action'] in [self.execute_move_battle, self.execute_move_confuse, self.execute_move_provoke]:
+            mini_moves.append(move)
+            mini_result = copy.copy(results)
+            if 'double~tap' in mini_result:
+                del mini_result['double~tap']
+                if 'killed' in mini_result:
+                    del mini_result['killed']
+                mini_results.append(mini_result)
+                mini_moves.append(move)
+                mini_result = copy.copy(results)
+                mini_result['damage'] = mini_result['double~tap']
+                del mini_result['double~tap']
+                mini_results.append(mini_result)
+            else:
+                mini_results.append(results)
+        elif move['action'] == self.execute_move_tactic:
+            if 'targets' in results:
+                for result in results['targets']:
+                    mini_move = copy.copy(move)
+                    mini_move.update({'target': result['target']})
+                    mini_moves.append(mini_move)
+                    mini_results.append(result)
+                mini_results[0].update({'first': True})
+            else:
+                results.update({'first': True})
+                mini_moves.append(move)
+                mini_results.append(results)
+        else:
+            # elif move['action'] in [self.execute_move_defend, self.execute_move_item, self.execute_move_disable]
+            # or anything else we might have missed
+            mini_moves.append(move)
+            mini_results.append(results)
+        if self.battle_name == 'battle89' and move['agent'].name in ['zedekiah', 'gadiomnah']:
+            mini_moves.insert(0, {'action': self.execute_move_taunt, 'agent': move['agent']})
+            mini_results.insert(0, {})
+        return mini_moves, mini_results
+
+    def pop_and_handle_mini_move(self, silent=False):
+        if len(self.mini_moves) > 0:
+            self.mini_move = self.mini_moves.pop(0)
+            self.mini_result = self.mini_results.pop(0)
+            if not silent:
+                self.show_mini_move(self.mini_move, self.mini_result)
+            self.handle_mini_move(self.mini_move, self.mini_result)
+        else:
+            self.mini_move = None
+            self.mini_result = None
+
+    def show_mini_move(self, mini_move, mini_result):
+        '''
+        Called with each mini move before it gets applied, unless it's being played silently. Headless, there's
+        nothing to show.
+        '''
+        pass
+
+    def handle_mini_move(self, mini_move, mini_result):
+        '''
+        Applies a mini move: its target's soldiers change, and a kill can end the battle.
+        '''
+        if mini_move.get('target'): # if target is in there and is not None
+            mini_move['target'].dequeue_soldiers_change()
+        if mini_result.get('killed'):
+            if mini_move.get('target') and mini_move['target'].name == 'ammoron':
+                teancum = None
+                for ally in self.get_live_allies():
+                    if ally.name == 'teancum':
+                        teancum = ally
+                        break
+                self.ordered_moves.insert(0, {
+                    'agent': mini_move['target'], # ammoron
+                    'target': teancum,
+                    'action': self.execute_move_kill_teancum,
+                })
+                self.ordered_moves.insert(0, {
+                    'agent': mini_move['target'], # ammoron
+                    'action': self.execute_move_ammoron_dies,
+                })
+                # Also, don't end the game on the move where Ammoron dies.
+            elif mini_move['action'] == self.execute_move_kill_teancum:
+                pass # Also don't end battle on this move. If the battle is over, the end will get triggered after dialog.
+            elif all(ally.get_future_soldiers() == 0 for ally in self.allies):
+                self.handle_lose()
+            elif all(enemy.get_future_soldiers() == 0 for enemy in self.enemies):
+                self.handle_win()
+
+    ###########################################################
+    # Endings and spoils                                      #
+    ###########################################################
+
+    def handle_win(self):
+        for enemy in self.enemies:
+            enemy.dequeue_soldiers_change()
+        self.state = 'win'
+        self.collect_spoils()
+
+    def handle_lose(self):
+        for ally in self.allies:
+            ally.dequeue_soldiers_change()
+        self.state = 'lose'
+
+    def surrender(self):
+        for warlord in self.allies:
+            warlord.soldiers = max(1, int(warlord.soldiers / 2.0))
+        self.state = 'retreat'
+
+    def get_spoils(self, plunder=0):
+        '''
+        Returns the experience, money and food for winning the battle, or with plunder (1 for the allies, -1 for
+        the enemy), the money plundered, which is negative when the enemy plunders.
+        '''
+        story_battle = self.battle_type in STORY_BATTLE_TYPES
+        story_battle_gain = 2 if story_battle else 1
+        new_base = 0.006 * sum([e.max_soldiers for e in self.enemies])
+        trained = 3 if 'train' in self.good_ally_statuses else 1
+        experience = int(
+            new_base
+            * story_battle_gain
+            * trained
+            * self.reserve_multiplier
+            * self.final_exp_multiplier
+        )
+        money = int((4.5 + (.5 if plunder else self.random.random())) * new_base) * story_battle_gain
+        food = int((9.0 + 2.0 * self.random.random()) * new_base) if story_battle else 0
+        if plunder:
+            experience = 0
+            money = 2 * money # plunder is twice as much as regular spoils
+            if plunder == -1:
+                # enemy can't plunder more money than you actually have
+                money = min(money, self.get_ally_money())
+            # make plunder money positive or negative, depending who plunders
+            money = money * plunder
+            food = 0
+        return experience, money, food
+
+    def get_ally_money(self):
+        return self.ally_money
+
+    def collect_spoils(self, plunder=0):
+        experience, money, food = self.get_spoils(plunder=plunder)
+        if plunder:
+            self.ally_money += money
+        else:
+            self.experience = experience
+            self.money = money
+            self.food = food
+        return abs(money)
+
+    ###########################################################
+    # Moves                                                   #
+    ###########################################################
+
+    def execute_move_battle(self, move, confused=False, power_pill=False):
+        is_ally_move = move['agent'] in self.allies
+        is_ally_target = ((not is_ally_move and not confused) or (is_ally_move and confused))
+        if move['target'].get_future_soldiers() == 0:
+            targets = self.get_live_allies() if is_ally_target else self.get_live_enemies()
+            return self.execute_move_battle(
+                {
+                    'agent': move['agent'],
+                    'target': self.random.choice(targets),
+                    'action': self.execute_move_battle,
+                },
+                confused = confused,
+                power_pill = power_pill,
+            )
+        good_target_team_statuses = self.good_ally_statuses if is_ally_target else self.good_enemy_statuses
+        if 'repel' in good_target_team_statuses:
+            return move, {'repel': True}
+        evade_prob = ((move['target'].evasion - move['agent'].agility) / 255.0 + 1) / 8.0
+        if not power_pill and self.random.random() < evade_prob:
+            return move, {'evade': True}
+        excellent = True if power_pill else self.random.random() < 1.0/16
+        inflicted_damage = int(
+            move['target'].attack_exposure * move['agent'].get_damage(excellent=excellent) + 1
+        )
+        if not power_pill and move['agent'].good_statuses.get('double~tap') and self.random.random() < 0.75:
+            double_tap = int( move['target'].attack_exposure * move['agent'].get_damage() + 1 )
+        else:
+            double_tap = None
+        if not power_pill and 'shield' in good_target_team_statuses:
+            inflicted_damage = max(inflicted_damage//2, 1)
+            if double_tap:
+                double_tap = max(double_tap//2, 1)
+        if not power_pill and move['target'].good_statuses.get('defend'):
+            inflicted_damage = max(inflicted_damage//2, 1)
+            if double_tap:
+                double_tap = max(double_tap//2, 1)
+        if move['target'].get_future_soldiers() <= inflicted_damage:
+            inflicted_damage = move['target'].get_future_soldiers()
+            move['target'].get_damaged(inflicted_damage)
+            killed = move['target'].get_future_soldiers() == 0
+            return move, {'damage': inflicted_damage, 'killed': killed, 'excellent': excellent}
+        move['target'].get_damaged(inflicted_damage)
+        if double_tap:
+            if move['target'].get_future_soldiers() <= double_tap:
+                double_tap = move['target'].get_future_soldiers()
+                move['target'].get_damaged(double_tap)
+                killed = move['target'].get_future_soldiers() == 0
+                return move, {'damage': inflicted_damage, 'double~tap': double_tap, 'killed': killed, 'excellent': excellent}
+            move['target'].get_damaged(double_tap)
+            return move, {'damage': inflicted_damage, 'double~tap': double_tap, 'excellent': excellent}
+        return move, {'damage': inflicted_damage, 'excellent': excellent}
+
+    def execute_move_confuse(self, move):
+        move, result = self.execute_move_battle(move, confused=True)
+        result.update({'status': 'confuse'})
+        return move, result
+
+    def execute_move_ammoron_dies(self, move):
+        return move, {}
+
+    def execute_move_kill_teancum(self, move):
+        if move['target']:
+            inflicted_damage = move['target'].get_future_soldiers()
+            move['target'].get_damaged(inflicted_damage)
+        return move, {'killed': True}
+
+    def execute_move_disable(self, move):
+        return move, {'status': 'disable'}
+
+    def execute_move_provoke(self, move):
+        move, result = self.execute_move_battle(move)
+        result.update({'status': 'provoke'})
+        return move, result
+
+    def execute_move_item(self, move):
+        for item in move['agent'].items:
+            if item['name'] == move['item']:
+                move['agent'].items.remove(item)
+                break
+        if 'target' in move and move['target'].get_future_soldiers() == 0 and move['item'] != 'power~pill':
+            return move, {'wasted': True}
+        move_type = ITEMS[move['item']]['battle_usage']
+        # go through items by type
+        if move_type == 'ally':
+            return self.execute_item_type_ally(move)
+        elif move_type == 'allies':
+            return self.execute_item_type_allies(move)
+        elif move_type == 'enemy':
+            return self.execute_item_type_enemy(move)
+        elif move_type == 'enemies':
+            return self.execute_item_type_enemies(move)
+        else:
+            return move, {}
+
+    def execute_item_type_enemy(self, move):
+        if move['item'] == 'power~pill':
+            return self.execute_move_battle(move, power_pill=True)
+        if move['item'] == 'javelin':
+            if move['agent'].name == 'teancum':
+                move['target'].get_damaged(move['target'].get_future_soldiers())
+                return move, {'killed': True}
+            else:
+                return move, {'fail': True}
+        else:
+            return move, {}
+
+    def execute_item_type_enemies(self, move):
+        info = ITEMS[move['item']]
+        if info['effect'] == 'cancel_reinforcements': # this is the title of liberty
+            is_ally_move = move['agent'] in self.allies
+            target_warlords = self.enemies if is_ally_move else self.allies
+            for warlord in target_warlords:
+                warlord.reinforcements = False
+        elif info['effect'] == 'dispel': # nightshade
+            is_ally_move = move['agent'] in self.allies
+            acting_team = self.allies if is_ally_move else self.enemies
+            for warlord in acting_team:
+                warlord.bad_status = None
+            target_team = self.enemies if is_ally_move else self.allies
+            for warlord in target_team:
+                warlord.good_statuses = {}
+            good_target_team_statuses = self.good_enemy_statuses if is_ally_move else self.good_ally_statuses
+            good_target_team_statuses.clear() # set dictionary to empty
+            return move, {}
+        return move, {}
+
+    def execute_item_type_allies(self, move):
+        info = ITEMS[move['item']]
+        if info['effect'] == 'ether':
+            is_ally_move = move['agent'] in self.allies
+            target_warlords = self.allies if is_ally_move else self.enemies
+            for warlord in target_warlords:
+                warlord.tactical_points = warlord.max_tactical_points
+            if is_ally_move:
+                self.ally_tactical_points = self.max_ally_tactical_points
+        return move, {}
+
+    def execute_item_type_ally(self, move):
+        info = ITEMS[move['item']]
+        if 'healing_points' in info:
+            healing = info['healing_points']
+            if healing + move['target'].get_future_soldiers() > move['target'].max_soldiers:
+                healing = move['target'].max_soldiers - move['target'].get_future_soldiers()
+            move['target'].get_healed(healing)
+            return move, {'healing': healing}
+        elif info.get('effect') == 'remedy':
+            move['target'].bad_status = None
+            return move, {}
+
+    def execute_move_tactic(self, move):
+        if 'target' in move and move['target'].get_future_soldiers() == 0:
+            return move, {'wasted': True}
+        is_ally_move = move['agent'] in self.allies
+        good_target_team_statuses = self.good_enemy_statuses if is_ally_move else self.good_ally_statuses
+        good_acting_team_statuses = self.good_ally_statuses if is_ally_move else self.good_enemy_statuses
+        tactic_type = TACTICS[move['tactic']]['type']
+        # go through tactics by type
+        if tactic_type == 'enemy':
+            if 'deflect' in good_target_team_statuses:
+                return move, {'deflect': True}
+            return self.execute_tactic_type_enemy(move, good_target_team_statuses, is_ally_move)
+        elif tactic_type == 'ally':
+            return self.execute_tactic_type_ally(move)
+        elif tactic_type == 'defense':
+            return self.execute_tactic_type_defense(move, good_acting_team_statuses)
+        elif tactic_type == 'enemies':
+            if 'deflect' in good_target_team_statuses:
+                return move, {'deflect': True}
+            return self.execute_tactic_type_enemies(move, good_target_team_statuses, is_ally_move)
+        elif tactic_type == 'allies':
+            return self.execute_tactic_type_allies(move, good_target_team_statuses, is_ally_move)
+        elif tactic_type == 'single':
+            return self.execute_tactic_type_single(move, good_target_team_statuses, is_ally_move)
+        else:
+            return move, {}
+
+    def execute_tactic_type_defense(self, move, good_acting_team_statuses):
+        info = TACTICS[move['tactic']]
+        success = self.get_tactic_success(move)
+        if not success:
+            return move, {'fail': True}
+        good_acting_team_statuses[move['tactic']] = info['duration']
+        return move, {}
+
+    def execute_tactic_type_ally(self, move):
+        info = TACTICS[move['tactic']]
+        success = self.get_tactic_success(move)
+        if not success:
+            return move, {'fail': True}
+        if 'min_damage' in info:
+            norm_intel = move['agent'].intelligence / 255.0
+            norm_cutoff = self.random.uniform(0.0, norm_intel)
+            prelim_healing_range = info['max_damage'] - info['min_damage']
+            cutoff = int(norm_cutoff * prelim_healing_range)
+            mod_min_healing = info['min_damage'] + cutoff
+            healing = self.random.randrange(mod_min_healing, info['max_damage'])
+            if move['target'].get_future_soldiers() + healing > move['target'].max_soldiers:
+                healing = move['target'].max_soldiers - move['target'].get_future_soldiers()
+            move['target'].get_healed(healing)
+            return move, {'healing': healing}
+        elif move['tactic'] == 'ninja':
+            move['target'].good_statuses['ninja'] = True
+            return move, {}
+        elif move['tactic'] == 'double~tap':
+            move['target'].good_statuses['double~tap'] = True
+            return move, {}
+        elif move['tactic'] == 'hulk~out':
+            if 'hulk~out' in move['target'].good_statuses:
+                if move['target'].good_statuses['hulk~out'] < 2:
+                    move['target'].good_statuses['hulk~out'] += 0.5
+            else:
+                move['target'].good_statuses['hulk~out'] = 1.5
+            return move, {}
+
+    def execute_tactic_type_allies(self, move, good_target_team_statuses, is_ally_move):
+        info = TACTICS[move['tactic']]
+        norm_intel = move['agent'].intelligence / 255.0
+        prelim_healing_range = info['max_damage'] - info['min_damage']
+        targets = self.allies if is_ally_move else self.enemies
+        results = {'targets': []}
+        for target in targets:
+            if target.get_future_soldiers() == 0:
+                continue
+            norm_cutoff = self.random.uniform(0.0, norm_intel)
+            cutoff = int(norm_cutoff * prelim_healing_range)
+            mod_min_healing = info['min_damage'] + cutoff
+            healing = self.random.randrange(mod_min_healing, info['max_damage'])
+            if target.get_future_soldiers() + healing > target.max_soldiers:
+                healing = target.max_soldiers - target.get_future_soldiers()
+            target.get_healed(healing)
+            results['targets'].append({'target': target, 'healing': healing})
+        return move, results
+
+    def execute_tactic_type_enemy(self, move, good_target_team_statuses, is_ally_move):
+        info = TACTICS[move['tactic']]
+        success = self.get_tactic_success(move)
+        if not success:
+            return move, {'fail': True}
+        if 'min_damage' in info:
+            norm_intel = move['agent'].intelligence / 255.0
+            norm_cutoff = self.random.uniform(0.0, norm_intel)
+            prelim_damage_range = info['max_damage'] - info['min_damage']
+            cutoff = int(norm_cutoff * prelim_damage_range)
+            mod_min_damage = info['min_damage'] + cutoff
+            damage = self.random.randrange(mod_min_damage, info['max_damage'])
+            if self.start_with_shiz and not is_ally_move:
+                damage = int(damage * START_WITH_SHIZ_MULTIPLIER)
+            if info['slot'] == 1:
+                if 'firewall' in good_target_team_statuses:
+                    damage = int(damage//2)
+                elif 'extinguish' in good_target_team_statuses:
+                    damage = 1
+            if move['target'].get_future_soldiers() <= damage:
+                damage = move['target'].get_future_soldiers()
+                move['target'].get_damaged(damage)
+                killed = move['target'].get_future_soldiers() == 0
+                return move, {'damage': damage, 'killed': killed}
+            move['target'].get_damaged(damage)
+            return move, {'damage': damage}
+        elif info.get('duration') == 'permanent':
+            move['target'].bad_status = {'name': move['tactic'], 'agent': move['agent']}
+            if is_ally_move:
+                move['target'].bad_status['count'] = 5
+            return move, {}
+
+    def execute_tactic_type_enemies(self, move, good_target_team_statuses, is_ally_move):
+        info = TACTICS[move['tactic']]
+        norm_intel = move['agent'].intelligence / 255.0
+        prelim_damage_range = info['max_damage'] - info['min_damage']
+        targets = self.enemies if is_ally_move else self.allies
+        results = {'targets': []}
+        for target in targets:
+            if target.get_future_soldiers() == 0:
+                continue
+            success = self.get_tactic_success(move, target=target)
+            if not success:
+                results['targets'].append({'target': target, 'fail': True})
+            else:
+                norm_cutoff = self.random.uniform(0.0, norm_intel)
+                cutoff = int(norm_cutoff * prelim_damage_range)
+                mod_min_damage = info['min_damage'] + cutoff
+                damage = self.random.randrange(mod_min_damage, info['max_damage'])
+                if self.start_with_shiz and not is_ally_move:
+                    damage = int(damage * START_WITH_SHIZ_MULTIPLIER)
+                if info['slot'] == 1:
+                    if 'firewall' in good_target_team_statuses:
+                        damage = int(damage//2)
+                    elif 'extinguish' in good_target_team_statuses:
+                        damage = 1
+                if target.get_future_soldiers() <= damage:
+                    damage = target.get_future_soldiers()
+                    target.get_damaged(damage)
+                    killed = target.get_future_soldiers() == 0
+                    results['targets'].append({'target': target, 'damage': damage, 'killed': killed})
+                    if killed:
+                        results['killed'] = True # This is needed in case everyone is killed, to trigger win/lose
+                else:
+                    target.get_damaged(damage)
+                    results['targets'].append({'target': target, 'damage': damage})
+        return move, results
+
+    def execute_tactic_type_single(self, move, good_target_team_statuses, is_ally_move):
+        info = TACTICS[move['tactic']]
+        success = self.get_tactic_success(move)
+        if not success:
+            return move, {'fail': True}
+        elif move['tactic'] == 'dispel':
+            acting_team = self.allies if is_ally_move else self.enemies
+            for warlord in acting_team:
+                warlord.bad_status = None
+            target_team = self.enemies if is_ally_move else self.allies
+            for warlord in target_team:
+                warlord.good_statuses = {}
+            good_target_team_statuses.clear() # set dictionary to empty
+            return move, {}
+        elif move['tactic'] == 'plunder':
+            direction = 1 if is_ally_move else -1
+            if self.plundered == direction:
+                return move, {'fail': True}
+            else:
+                self.plundered += direction
+                amount = self.collect_spoils(plunder=direction)
+                return move, {'amount': amount}
+        elif move['tactic'] == 'surrender':
+            self.surrender()
+            return move, {}
+        return move, {'fail': True} # This is a placeholder til we get all single tactics
+
+    def execute_move_taunt(self, move):
+        return move, {}
+
+    def get_tactic_success(self, move, target=None):
+        if self.devtools.get('Infinity gauntlet'):
+            if move['agent'] in self.allies:
+                return True
+            else:
+                return False
+        prob_type = TACTICS[move['tactic']]['success_probability_type']
+        target = target or move.get('target')
+        if not target and prob_type in ['enemy_prob', 'enemy_prob2']:
+            print(u"We shouldn't be having a move without a target if the prob_type is enemy_prob or enemy_prob2.")
+            print(u"move: {}".format(move))
+            raise Exception
+        if prob_type == 'enemy_prob':
+            intel = move['agent'].intelligence
+            enemy_intel = target.intelligence
+            enemy_prob = ((intel-enemy_intel)/255.0+1.0)/2.0
+            random_draw = self.random.random()
+            return random_draw < enemy_prob
+        elif prob_type == 'enemy_prob2':
+            intel = move['agent'].intelligence
+            enemy_intel = target.intelligence
+            enemy_prob = ((intel-enemy_intel)/255.0+1.0)/2.0
+            enemy_prob2 = min(1.0, enemy_prob*2)
+            return self.random.random() < enemy_prob2
+        elif prob_type == 'one':
+            return True
+        elif prob_type == 'intel_prob':
+            intel = move['agent'].intelligence
+            intel_prob = intel/255.0
+            return self.random.random() < intel_prob
+        elif prob_type == 'assassin':
+            intel = move['agent'].intelligence
+            enemy_intel = target.intelligence
+            enemy_prob = ((intel-enemy_intel)/255.0+1.0)/2.0
+            assassin = enemy_prob / 3.0
+            return self.random.random() < assassin
+
+    def execute_move_defend(self, move):
+        move['agent'].good_statuses['defend'] = True
+        return move, {'defend': True}
+
+    def change_move_if_dead_or_cursed(self):
+        if self.move['action'] in [self.execute_move_kill_teancum, self.execute_move_ammoron_dies]:
+            return
+        if self.move['agent'].get_future_soldiers() == 0:
+            self.move = None
+            return
+        if self.move['agent'].bad_status:
+            if self.move['agent'].bad_status['agent'].get_future_soldiers() == 0 or self.move['agent'].bad_status.get('count') == 0:
+                self.move['agent'].bad_status = None
+                return
+            if self.move['agent'].bad_status['name'] == 'disable':
+                self.move = {'agent': self.move['agent'], 'action': self.execute_move_disable}
+            elif self.move['agent'].bad_status['name'] == 'confuse':
+                if self.move['agent'] in self.allies:
+                    random_target = self.random.choice(self.get_live_allies())
+                else:
+                    random_target = self.random.choice(self.get_live_enemies())
+                self.move = {'agent': self.move['agent'], 'action': self.execute_move_confuse, 'target': random_target}
+            else: # provoke
+                self.move = {
+                    'agent': self.move['agent'],
+                    'action': self.execute_move_provoke,
+                    'target': self.move['agent'].bad_status['agent'],
+                }
+            if 'count' in self.move['agent'].bad_status:
+                self.move['agent'].bad_status['count'] -= 1
+
+    ###########################################################
+    # Enemy AI                                                #
+    ###########################################################
+
+    def generate_enemy_moves(self):
+        if self.offguard == 1:
+            self.offguard = 0
+        else:
+            ally_dangers = {ally.index: ally.get_danger() for ally in self.allies if ally.get_future_soldiers() > 0}
+            sum_dangers = sum(ally_dangers.values())
+            ally_target_probabilities = {index: danger*1.0 / sum_dangers for index, danger in ally_dangers.items()}
+            for enemy in self.get_live_enemies():
+                ally_target_index = self.choose_random_target(ally_target_probabilities)
+                self.enemy_moves.append(self.generate_enemy_move(enemy, ally_target_index, sum_dangers))
+
+    def choose_random_target(self, target_probabilities):
+        sample = self.random.random()
+        for target in sorted(target_probabilities, key=target_probabilities.get):
+            prob = target_probabilities[target]
+            if sample < prob:
+                return target
+            sample -= prob
+
+    def generate_enemy_move(self, enemy, ally_target_index, sum_dangers):
+        if (
+            self.battle_name == 'battle55'
+            and enemy.name == 'ammoron'
+            and self.offguard == -1
+        ):
+            teancum = None
+            for ally in self.get_live_allies():
+                if ally.name == 'teancum':
+                    teancum = ally
+                    break
+            if teancum:
+                # ammoron uses disable on teancum the first time
+                action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[4], 'target': teancum}
+                enemy.consume_tactical_points(TACTICS[enemy.tactics[4]]['tactical_points'])
+                return action
+        ally_target = self.allies[ally_target_index]
+        random_enemy = self.random.choice(self.get_live_enemies())
+
+        # heal
+        heal_tactic = enemy.tactics[2] if enemy.tactics else None
+        tactical_points = enemy.tactical_points
+        heal_cost = TACTICS.get(heal_tactic, {}).get('tactical_points', 0)
+        if (
+            heal_tactic and heal_cost <= tactical_points and enemy.get_future_soldiers()*1.0/enemy.max_soldiers < .5
+            and sum_dangers > enemy.get_future_soldiers() and self.random.random() < .7
+        ):
+            action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': heal_tactic}
+            enemy.consume_tactical_points(heal_cost)
+            if TACTICS[heal_tactic]['type'] == 'ally':
+                action.update({'target': enemy})
+            return action
+
+        # dispel
+        if (
+            (enemy.tactics[4] if enemy.tactics else None) == 'dispel'
+            and (
+                len(self.good_ally_statuses) > 0
+                or any([an_enemy.bad_status for an_enemy in self.enemies if an_enemy.get_future_soldiers() > 0])
+            )
+            and TACTICS['dispel']['tactical_points'] + heal_cost <= tactical_points
+            and self.random.random() < .2
+        ):
+            enemy.consume_tactical_points(TACTICS['dispel']['tactical_points'])
+            return {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': 'dispel'}
+
+        # defense
+        defense_tactic = enemy.tactics[3] if enemy.tactics else None
+        defense_cost = TACTICS.get(defense_tactic, {}).get('tactical_points', 0)
+        if (
+            defense_tactic
+            and defense_tactic != 'train'
+            and heal_cost + defense_cost <= tactical_points
+            and defense_tactic not in self.good_enemy_statuses
+            and (
+                defense_tactic not in ['firewall', 'extinguish']
+                or ('firewall' not in self.good_enemy_statuses and 'extinguish' not in self.good_enemy_statuses)
+            )
+            and self.random.random() < .2
+        ):
+            enemy.consume_tactical_points(defense_cost)
+            return {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': defense_tactic}
+
+        # provoke, disable
+        enemy_prob = self.get_enemy_prob(enemy, ally_target)
+        if (
+            (enemy.tactics[4] if enemy.tactics else None) in ['provoke', 'disable']
+            and heal_cost + TACTICS[enemy.tactics[4]]['tactical_points'] <= tactical_points
+            and ally_target.bad_status is None
+            and self.random.random() < enemy_prob
+            and self.random.random() < .3 # we don't want to be using these all the time
+        ):
+            enemy.consume_tactical_points(TACTICS[enemy.tactics[4]]['tactical_points'])
+            return {
+                'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[4], 'target': ally_target,
+            }
+
+        # confuse
+        if (
+            (enemy.tactics[5] if enemy.tactics else None) == 'confuse'
+            and heal_cost + TACTICS[enemy.tactics[5]]['tactical_points'] <= tactical_points
+            and ally_target.bad_status is None
+            and self.random.random() < enemy_prob
+            and self.random.random() < .3 # we don't want to be using these all the time
+        ):
+            enemy.consume_tactical_points(TACTICS[enemy.tactics[5]]['tactical_points'])
+            return {
+                'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[5], 'target': ally_target,
+            }
+
+        # assassin
+        if (
+            (enemy.tactics[5] if enemy.tactics else None) == 'assassin'
+            and heal_cost + TACTICS[enemy.tactics[5]]['tactical_points'] <= tactical_points
+            and self.random.random() < enemy_prob
+            and self.random.random() < .5 # we don't want to be using these all the time
+        ):
+            enemy.consume_tactical_points(TACTICS[enemy.tactics[5]]['tactical_points'])
+            return {
+                'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[5], 'target': ally_target,
+            }
+
+        # boost_tactic: ninja, double tap, hulk out
+        boost_tactic = enemy.tactics[5] if enemy.tactics else None
+        if boost_tactic in ['ninja', 'double~tap', 'hulk~out']:
+            if (
+                (boost_tactic == 'hulk~out' or boost_tactic not in random_enemy.good_statuses)
+                and heal_cost + TACTICS[boost_tactic]['tactical_points'] <= tactical_points
+                and self.random.random() < .2
+            ):
+                enemy.consume_tactical_points(TACTICS[enemy.tactics[5]]['tactical_points'])
+                return {
+                    'agent': enemy, 'action': self.execute_move_tactic, 'tactic': boost_tactic, 'target': random_enemy,
+                }
+
+        # plunder
+        if (
+            (enemy.tactics[4] if enemy.tactics else None) == 'plunder'
+            and heal_cost + TACTICS['plunder']['tactical_points'] <= tactical_points
+            and self.plundered != -1
+            and self.random.random() < .2
+        ):
+            enemy.consume_tactical_points(TACTICS['plunder']['tactical_points'])
+            return {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': 'plunder'}
+
+        # water
+        maybe_do_water_tactic_damage = (
+            enemy.tactic_danger > enemy.get_preliminary_damage()
+            or self.random.random() < 0.1
+        )
+        enemy_prob2 = min(1.0, enemy_prob*2)
+        if (
+            maybe_do_water_tactic_damage
+            and enemy.tactics
+            and enemy.tactics[1]
+            and self.near_water
+            and heal_cost + TACTICS[enemy.tactics[1]]['tactical_points'] <= tactical_points
+            and self.random.random() < enemy_prob2
+        ):
+            enemy.consume_tactical_points(TACTICS[enemy.tactics[1]]['tactical_points'])
+            action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[1]}
+            if TACTICS[enemy.tactics[1]]['type'] == 'enemy':
+                action.update({'target': ally_target})
+            return action
+
+        # fire
+        effective_fire_tactic_danger = (
+            1 if 'extinguish' in self.good_ally_statuses
+            else enemy.tactic_danger / 2 if 'firewall' in self.good_ally_statuses
+            else enemy.tactic_danger
+        )
+        maybe_do_fire_tactic_damage = (
+            effective_fire_tactic_danger > enemy.get_preliminary_damage()
+            or self.random.random() < 0.1
+        )
+        if (
+            maybe_do_fire_tactic_damage
+            and enemy.tactics
+            and enemy.tactics[0]
+            and heal_cost + TACTICS[enemy.tactics[0]]['tactical_points'] <= tactical_points
+            and self.random.random() < enemy_prob2
+        ):
+            enemy.consume_tactical_points(TACTICS[enemy.tactics[0]]['tactical_points'])
+            action = {'agent': enemy, 'action': self.execute_move_tactic, 'tactic': enemy.tactics[0]}
+            if TACTICS[enemy.tactics[0]]['type'] == 'enemy':
+                action.update({'target': ally_target})
+            return action
+
+        # battle
+        return {'agent': enemy, 'action': self.execute_move_battle, 'target': ally_target}
+
+    def get_enemy_prob(self, attacker, target):
+        return ((attacker.intelligence - target.intelligence)/255.0+1)/2
@@ -6,7 +6,8 @@ import pygame
 from pygame.locals import *
 
 from constants import GAME_HEIGHT, GAME_WIDTH, WHITE
-from helpers import load_image
+from atlas import get_image
+from sounds import get_sound
 from text import create_prompt
 
 COUNTER_SEQUENCE = [K_UP, K_UP, K_DOWN, K_DOWN, K_LEFT, K_RIGHT, K_UP, K_DOWN]
@@ -16,7 +17,7 @@ class BattleIntro(object):
     def __init__(self, screen, game, warlord, text, intro_type='regular'):
         self.screen = screen
         self.game = game
-        self.portrait = pygame.transform.flip(load_image(os.path.join('portraits', '{}.png'.format(warlord))), True, False)
+        self.portrait = pygame.transform.flip(get_image(os.path.join('portraits', '{}.png'.format(warlord))), True, False)
         self.dialog = create_prompt(text)
         self.intro_type = intro_type
         self.timer = (
@@ -32,7 +33,7 @@ class BattleIntro(object):
         self.second_dialog = False
         self._is_finished = False
         self.number_right = 0
-        self.tactic_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'tactic.wav'))
+        self.tactic_sound = get_sound('tactic')
 
     def draw(self):
         self.screen.blit(self.dialog.surface, (0, 144))
@@ -2,12 +2,13 @@
 
 import math
 import os
-import random
 
 import pygame
 
-from constants import BLACK, GAME_WIDTH, TACTICS, WEAPON_POWER, START_WITH_SHIZ_MULTIPLIER
+from battle_core import Warlord
+from constants import BLACK, GAME_WIDTH
 from helpers import hyphenate, load_image
+from sprite import load_character_images
 from text import MenuGrid, TextBox
 
 WIDTH = GAME_WIDTH/2
@@ -19,95 +20,49 @@ MAX_TIME_TO_SWITCH_SPRITE = 0.05 # seconds between switching to stand then walk
 ALL_OUT_SPEED = 125 # how fast they walk (pixels/second) forward or backward during all-out
 TURN_SPEED = 100 # how fast they walk (pixels/second) forward or backward when they take their turn
 
-class BattleWarlordRectBase(object):
+class BattleWarlordRectBase(Warlord):
+    '''
+    A warlord as it gets drawn in a battle: its row with the name, soldiers and bar, and its sprite walking out to
+    fight. The rules all come from battle_core.Warlord.
+    '''
+
     def __init__(self, warlord, battle, is_enemy=False):
+        super(BattleWarlordRectBase, self).__init__(warlord, battle, is_enemy=is_enemy)
         self.soldiers_bar = pygame.Surface((1, 8))
         self.soldiers_bar_position = (0,0)
-        self.soldiers_change_queue = []
-        self.is_enemy = is_enemy
-        self.items = warlord['items']
-        self.battle = battle
         self.game = self.battle.game
-        self.stats = warlord
-        self.name = warlord['name']
         self.surface = pygame.Surface((WIDTH, HEIGHT))
         name_in_box = hyphenate(self.name.title(), TEXT_AREA_CHAR_LEN)
         self.name_box = TextBox(name_in_box)
-        self.soldiers = warlord['soldiers']
-        self.max_soldiers = warlord['max_soldiers']
         self.color = None
         self.soldiers_per_pixel = None
         self.build_soldiers_box()
-        self.stand = load_image(os.path.join('sprites', self.name, 'e', 'stand.png'))
-        self.walk = load_image(os.path.join('sprites', self.name, 'e', 'walk.png'))
-        self.stand_s = load_image(os.path.join('sprites', self.name, 's', 'stand.png'))
-        self.walk_s = load_image(os.path.join('sprites', self.name, 's', 'walk.png'))
+        self.set_sprites(self.name)
         self.sprite = self.stand
-        self.headless = warlord.get('headless', False)
-        self.queue_headless = self.headless
         if self.name == 'shiz' and self.headless:
             self.set_headless_sprites()
         self.state = 'wait'
         self.rel_pos = 0
         self.rel_target_pos = None
             # relative target position when advancing or retreating the sprite (0 to MAX_BAR_WIDTH-16)
-        self.strength = warlord['strength']
-        self.attack_points = warlord['attack_points']
-        wp_index = self.attack_points - self.attack_points % 5
-        self.weapon_power = WEAPON_POWER[wp_index]
-            # subtracting modulo 5 ensures that whatever the attack_points are, we can still look up
-            # a weapon power in the table which only has multiples of 5
-        self.compounded_strength = self.strength * self.weapon_power / 256.0 / 256.0
-        self._tactics = warlord['tactics']
-        self.intelligence = warlord['intelligence']
-        self.tactic_danger = self.compute_tactic_danger()
-        self.max_tactical_points = warlord['max_tactical_points']
-        self.tactical_points = warlord['tactical_points']
-        self.bad_status = None
-        self.good_statuses = {}
-        self.index = warlord['index']
-        self.attack_exposure = 1.0 - warlord['defense'] / 341.0 # defense of 255 cuts damage by 75%
-        self.agility = warlord['agility']
-        self.evasion = warlord['evasion']
-        self.reinforcements = warlord.get('reinforcements', False)
-        self.capture = warlord.get('capture', False)
         self.hit_type = None
         self.hit_image_a = True
         self.hit_time = 0
         self.switch_sprite_time = 0
         self.all_out_speed = False
-        self.start_with_shiz_multiplier = 1.0
+
+    def set_sprites(self, character):
+        images = load_character_images(character)
+        self.stand = images['e']['stand']
+        self.walk = images['e']['walk']
+        self.stand_s = images['s']['stand']
+        self.walk_s = images['s']['walk']
 
     def set_headless_sprites(self):
         standing = self.sprite == self.stand
-        self.stand = load_image(os.path.join('sprites', 'shiz_headless', 'e', 'stand.png'))
-        self.walk = load_image(os.path.join('sprites', 'shiz_headless', 'e', 'walk.png'))
-        self.stand_s = load_image(os.path.join('sprites', 'shiz_headless', 's', 'stand.png'))
-        self.walk_s = load_image(os.path.join('sprites', 'shiz_headless', 's', 'walk.png'))
+        self.set_sprites('shiz_headless')
         self.sprite = self.stand if standing else self.walk
 
-    def consume_tactical_points(self, points):
-        raise NotImplementedError
-
-    def get_effective_agility(self):
-        if self.good_statuses.get('ninja'):
-            return 255
-        else:
-            return self.agility
-
-    def restore_tactical_points(self, points):
-        if 'liahona' in [item['name'] for item in self.items]:
-            self.tactical_points += points
-        else:
-            self.battle.ally_tactical_points += points
-
-    @property
-    def tactics(self):
-        if 'liahona' in [item['name'] for item in self.items] or self.is_enemy:
-            return self._tactics
-        else:
-            return self.battle.ally_tactics
-
     def get_tactic_menu(self):
         if self.tactics is None or self.tactics[0] == "":
             return None
@@ -148,64 +103,6 @@ class BattleWarlordRectBase(object):
         self.hit_image_a = True
         self.hit_time = 0
 
-    def get_tactical_points(self):
-        if 'liahona' in [item['name'] for item in self.items]:
-            return self.tactical_points
-        else:
-            return self.battle.ally_tactical_points
-
-    def get_danger(self):
-        return max(self.tactic_danger, self.get_preliminary_damage())
-
-    def compute_tactic_danger(self):
-        assassin = (
-            self.intelligence / 255.0 / 3.0 * self.max_soldiers
-            if self.tactics and 'assassin' in self.tactics
-            else 0.0
-        )
-        fire = self.intelligence / 255.0 * self.get_max_tactic_damage(slot=1)
-        water = self.intelligence / 255.0 * self.get_max_tactic_damage(slot=2)
-        heal = self.intelligence / 255.0 * self.get_max_tactic_damage(slot=3)
-        return max(assassin, fire, water, heal)
-
-    def get_max_tactic_damage(self, slot=None):
-        if slot is None or self.tactics is None:
-            return 0
-        tactic = self.tactics[slot-1]
-        tactic = tactic.strip('~').lower()
-        if tactic == '':
-            return 0
-        return TACTICS[tactic].get('max_damage', 0)
-
-    def get_preliminary_damage(self):
-        # including *25 for accurate get_danger() results, simulating a good damage potential
-        hulk_boost = self.good_statuses.get('hulk~out', 1.0)
-        return self.compounded_strength * self.get_soldier_gain() * 25 * hulk_boost
-
-    def get_damage(self, excellent=False):
-        if self.battle.game.devtools['Infinity gauntlet']:
-            if self.is_enemy:
-                return 0 # With infinity gauntlet on, bad guys hit with zero (battly.py corrects this to 1 though)
-            else:
-                return 1e8 # With infinity gauntlet on, good guys always hit with 100,000,000 damage (before target's attack exposure)
-        return int(
-            self.get_preliminary_damage()
-            * self.get_damage_potential(excellent=excellent)
-            * self.start_with_shiz_multiplier
-        )
-
-    def get_damage_potential(self, excellent=False):
-        # including /25.0 to make up for the *25 in get_preliminary_damage()
-        if excellent:
-            return 51 / 25.0
-        return random.choice([25, 25, 25, 25, 25, 25, 25, 25, 23, 23, 23, 23, 23, 23, 20, 20]) / 25.0
-
-    def get_soldier_gain(self):
-        soldier_gain = 1.0
-        for num in range(len(str(self.soldiers))-1):
-            soldier_gain *= 2
-        return soldier_gain
-
     def move_forward(self):
         self.state = 'forward'
         self.rel_target_pos = 16
@@ -226,31 +123,23 @@ class BattleWarlordRectBase(object):
         self.rel_target_pos = 0
         self.all_out_speed = True
 
-    def get_healed(self, soldiers):
-        self.soldiers_change_queue.append(soldiers)
-
     def flip_sprite(self):
         self.sprite = pygame.transform.flip(self.sprite, True, False)
 
-    def get_damaged(self, soldiers):
-        self.soldiers_change_queue.append(-soldiers)
-        if self.name == 'shiz' and not self.is_enemy and not self.queue_headless and self.get_future_soldiers() == 0:
-            self.soldiers_change_queue[-1] = self.max_soldiers - soldiers
-            self.queue_headless = True
-
-    def dequeue_soldiers_change(self):
-        if len(self.soldiers_change_queue) > 0:
-            soldiers = self.soldiers_change_queue.pop(0)
-            self.update_soldiers_change(soldiers)
-
     def update_soldiers_change(self, delta):
-        self.soldiers += delta
-        if self.name == 'shiz' and not self.is_enemy and self.queue_headless:
-            self.headless = self.queue_headless
+        was_headless = self.headless
+        super(BattleWarlordRectBase, self).update_soldiers_change(delta)
+        if self.headless and not was_headless:
             self.set_headless_sprites()
         self.build_soldiers_bar()
         self.build_soldiers_box()
 
+    def reinforce(self, dequeue=False):
+        super(BattleWarlordRectBase, self).reinforce(dequeue=dequeue)
+        self.state = 'wait'
+        self.rel_pos = 0
+        self.rel_target_pos = None
+
     def build_soldiers_bar(self):
         if self.soldiers == 0:
             width = 0
@@ -315,15 +204,6 @@ class BattleWarlordRectBase(object):
             else:
                 self.sprite = self.walk
 
-    def get_future_soldiers(self):
-        '''
-        This gives the actual number of soldiers in the simulation, but not the advertised number of soldiers.
-        We store the advertised number in self.soldiers so that that is what the UI displays, but any simulated moves
-        that haven't been animated yet can result in soldier increases or decreases, which are queued in
-        self.soldiers_change_queue.
-        '''
-        return self.soldiers + sum(self.soldiers_change_queue)
-
 
 class Ally(BattleWarlordRectBase):
     def __init__(self, name, battle):
@@ -352,18 +232,10 @@ class Ally(BattleWarlordRectBase):
         super(Ally, self).build_soldiers_bar()
         self.soldiers_bar_position = (TEXT_AREA_WIDTH, 16)
 
-    def consume_tactical_points(self, points):
-        if 'liahona' in [item['name'] for item in self.items]:
-            self.tactical_points -= points
-        else:
-            self.battle.ally_tactical_points -= points
-
 
 class Enemy(BattleWarlordRectBase):
     def __init__(self, name, battle):
         super(Enemy, self).__init__(name, battle, is_enemy=True)
-        if self.game.conditions_are_met('start_with_shiz'):
-            self.start_with_shiz_multiplier = START_WITH_SHIZ_MULTIPLIER
         self.name_box_position = (WIDTH - TEXT_AREA_WIDTH, 0)
         self.soldiers_box_position = (WIDTH - TEXT_AREA_WIDTH, 16)
         self.stand = pygame.transform.flip(self.stand, True, False)
@@ -390,6 +262,3 @@ class Enemy(BattleWarlordRectBase):
     def build_soldiers_bar(self):
         super(Enemy, self).build_soldiers_bar()
         self.soldiers_bar_position = (WIDTH - TEXT_AREA_WIDTH - self.soldiers_bar.get_width(), 16)
-
-    def consume_tactical_points(self, points):
-        self.tactical_points -= points
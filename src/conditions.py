@@ -0,0 +1,96 @@
+# -*- coding: UTF-8 -*-
+
+# Like helpers.py, this module should not import any other rotj modules (except constants), so that anything can
+# import it without causing circular imports.
+
+
+class ConditionStore(object):
+    '''
+    Tracks which game state conditions have been set, for constant-time membership checks.
+
+    The store wraps the list found in game_state['conditions'] and appends to it in place, so the game state keeps
+    serializing to the same JSON list it always has. The set alongside it is what answers `condition in store`.
+    '''
+
+    def __init__(self, conditions=None):
+        self._list = conditions if conditions is not None else []
+        self._set = set(self._list)
+
+    def __contains__(self, condition):
+        return condition in self._set
+
+    def __iter__(self):
+        return iter(self._list)
+
+    def __len__(self):
+        return len(self._set)
+
+    def add(self, condition):
+        '''
+        Sets the condition. Returns True if it was not already set.
+        '''
+        if condition in self._set:
+            return False
+        self._set.add(condition)
+        self._list.append(condition)
+        return True
+
+    def to_list(self):
+        return self._list
+
+
+class Predicate(object):
+    '''
+    A compiled condition spec. Specs show up in the map json, MAP_MUSIC and battle data as a single condition name,
+    a list of names that must all be set, or a dict of names to whether they must be set or not. A predicate holds
+    the spec as a tuple of (name, expected) terms and knows which condition names it depends on.
+    '''
+
+    def __init__(self, terms):
+        self.terms = terms
+        self.names = frozenset(name for name, _ in terms)
+        # "state:" conditions are computed from the rest of the game state, so they could change at any time.
+        self.uses_state = any(name.startswith('state:') for name in self.names)
+
+    def is_met(self, condition_is_true):
+        for name, expected in self.terms:
+            if bool(condition_is_true(name)) != expected:
+                return False
+        return True
+
+    def depends_on(self, condition):
+        return self.uses_state or condition in self.names
+
+
+_PREDICATES = {} # key is a normalized tuple of terms, value is the Predicate
+_NAME_PREDICATES = {} # key is a single condition name, value is the Predicate
+
+
+def compile_conditions(conditions):
+    '''
+    Returns the Predicate for a condition spec. Predicates are cached, so equal specs share one object. A single
+    condition name is looked up as it is, but lists and dicts get normalized on every call, so code that checks one
+    of those repeatedly should compile it once and keep the Predicate.
+    '''
+    if isinstance(conditions, Predicate):
+        return conditions
+    if isinstance(conditions, str):
+        predicate = _NAME_PREDICATES.get(conditions)
+        if predicate is None:
+            predicate = _NAME_PREDICATES[conditions] = _compile_terms(((conditions, True),) if conditions else ())
+        return predicate
+    if conditions is None or len(conditions) == 0:
+        terms = ()
+    elif isinstance(conditions, dict):
+        terms = tuple((condition, bool(expected)) for condition, expected in conditions.items())
+    else:
+        terms = tuple((condition, True) for condition in conditions)
+    return _compile_terms(terms)
+
+
+def _compile_terms(terms):
+    predicate = _PREDICATES.get(terms)
+    if predicate is None:
+        predicate = Predicate(terms)
+        _PREDICATES[terms] = predicate
+    return predicate
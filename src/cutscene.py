@@ -3,13 +3,13 @@
 import pygame
 from pygame.locals import *
 import pyscroll
-from pytmx.util_pygame import load_pygame
 
 from helpers import (
     get_map_filename
 )
 from sprite import Sprite
 from text import create_prompt
+from tiled_map import get_renderer, load_tmx
 
 class Cutscene(object):
     def __init__(self, game, screen, scene):
@@ -19,10 +19,8 @@ class Cutscene(object):
         map_filename = get_map_filename(
             '_palace.tmx' if scene == 0 else 'house_of_moroni.tmx' if scene == 1 else '_palace.tmx'
         )
-        self.tmx_data = load_pygame(map_filename)
-        map_data = pyscroll.data.TiledMapData(self.tmx_data)
-        self.map_layer = pyscroll.BufferedRenderer(map_data, self.screen.get_size())
-        self.map_layer.zoom = 1
+        self.tmx_data = load_tmx(map_filename)
+        self.map_layer = get_renderer(map_filename, self.tmx_data, self.screen.get_size())
         self.group = pyscroll.group.PyscrollGroup(map_layer=self.map_layer)
         if scene == 1:
             self.sprite = Sprite(self.tmx_data, self.game, 'moroni', [19, 13], direction='w')
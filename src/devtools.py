@@ -5,6 +5,7 @@ import os
 import pygame
 from pygame.locals import *
 
+from sounds import get_sound
 from text import MenuBox
 
 
@@ -32,7 +33,7 @@ class Devtools(object):
     def __init__(self, game):
         self.game = game
         self.make_menu(0)
-        self.select_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'select.wav'))
+        self.select_sound = get_sound('select')
         
     def make_menu(self, current_choice):
         items = ['{} {}'.format(_get_switch_string(on), name) for name, on in self.game.devtools.items()]
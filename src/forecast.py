@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+
+import random
+import time
+
+FORECAST_RUNS = 100 # how many times a forecast plays the battle out
+FORECAST_SEED = 0 # forecasts are seeded, so the same battle state always gets the same forecast
+MAX_FORECAST_VOLLEYS = 200 # a run that goes on longer than this (against endless reinforcements, say) counts as no win
+
+
+class Forecast(object):
+    '''
+    The odds of a battle, from playing the rest of it out runs times the way ALL-OUT and RISK-IT would (every ally
+    attacking a random enemy, and the enemies choosing moves as usual), each run on a snapshot of the battle with its
+    own seeded rng, so that nothing in the battle or the game changes and the game's random sequence isn't touched.
+
+    A run takes a few milliseconds, so the runs can be done a batch at a time with run(max_time) to fit into frames:
+
+        forecast = Forecast(battle)
+        forecast.run() # or forecast.run(max_time=0.004) each frame until forecast.is_done()
+        forecast.get_win_probability()
+    '''
+
+    def __init__(self, battle, runs=FORECAST_RUNS, seed=FORECAST_SEED):
+        self.battle = battle
+        self.runs = runs
+        self.rng = random.Random(seed)
+        self.runs_done = 0
+        self.wins = 0
+        self.total_losses = [0] * (len(battle.allies) + len(battle.enemies))
+        self.total_experience = 0
+        self.total_money = 0
+        self.total_food = 0
+
+    def is_done(self):
+        return self.runs_done >= self.runs
+
+    def run(self, max_time=None):
+        '''
+        Does runs until all of them are done, or for about max_time seconds (always at least one run). Returns whether
+        the forecast is done.
+        '''
+        deadline = time.perf_counter() + max_time if max_time is not None else None
+        while not self.is_done():
+            self.run_once()
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return self.is_done()
+
+    def run_once(self):
+        snapshot = self.battle.get_snapshot(rng=self.rng)
+        warlords = snapshot.allies + snapshot.enemies
+        soldiers_before = [warlord.get_future_soldiers() for warlord in warlords]
+        snapshot.simulate_battle(max_volleys=MAX_FORECAST_VOLLEYS)
+        for i, warlord in enumerate(warlords):
+            self.total_losses[i] += soldiers_before[i] - warlord.get_future_soldiers()
+        if snapshot.state == 'win':
+            self.wins += 1
+            self.total_experience += snapshot.experience
+            self.total_money += snapshot.money
+            self.total_food += snapshot.food
+        self.runs_done += 1
+
+    def get_win_probability(self):
+        return self.wins * 1.0 / self.runs_done if self.runs_done else None
+
+    def get_expected_losses(self):
+        '''
+        Returns two lists with how many soldiers each of the allies and each of the enemies can expect to lose (in
+        the order of battle.allies and battle.enemies).
+        '''
+        runs_done = self.runs_done or 1
+        losses = [total * 1.0 / runs_done for total in self.total_losses]
+        return losses[:len(self.battle.allies)], losses[len(self.battle.allies):]
+
+    def get_expected_spoils(self):
+        '''
+        Returns the experience, money and food to expect, counting the runs that aren't won as getting nothing.
+        '''
+        runs_done = self.runs_done or 1
+        return (
+            self.total_experience * 1.0 / runs_done,
+            self.total_money * 1.0 / runs_done,
+            self.total_food * 1.0 / runs_done,
+        )
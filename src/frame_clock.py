@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+
+import pygame
+
+FPS = 60 # frames drawn per second, and fixed updates simulated per second
+MAX_FRAME_TIME = 0.5 # seconds; after a longer hitch (like a time.sleep or a map load) the game skips ahead
+IDLE_AFTER_FRAMES = 10 # frames in a row that have to come out the same before the game goes idle
+IDLE_WAKE_INTERVAL = 250 # milliseconds; blinking and walking animations (is_quarter_second) flip on these boundaries
+MUSIC_END = pygame.USEREVENT # posted when a song ends, so an idle game still wakes up to start the next one
+
+
+class FrameClock(object):
+    '''
+    Paces the main loop at fps frames a second and tells it how many fixed steps of 1/fps seconds to simulate each
+    frame, so updates always get the same dt no matter how late a frame comes.
+
+    When the drawn frames have stopped changing (a text box waiting for input, the title screen between blinks), the
+    clock goes idle: instead of drawing the same frame 60 times a second, it blocks in pygame.event.wait until a key
+    gets pressed or until the next quarter second boundary, when something may blink. A frame that changes right
+    after a key press wakes it up fully, while one that changes on a quarter second boundary only keeps it awake for
+    as long as things keep changing.
+    '''
+
+    def __init__(self, fps=FPS):
+        self.fps = fps
+        self.step = 1.0 / fps
+        self.clock = pygame.time.Clock()
+        self.lag = 0.0 # seconds of game time that still need to be simulated
+        self.still_frames = 0 # how many frames in a row have come out the same as the one before
+        self.woke_on_timer = False
+
+    def is_idle(self):
+        return self.still_frames >= IDLE_AFTER_FRAMES
+
+    def tick(self):
+        '''
+        Waits until it's time for the next frame and returns how many fixed steps to update before drawing it.
+        '''
+        self.woke_on_timer = False
+        if self.is_idle():
+            self.wait_for_event()
+        elapsed = self.clock.tick(self.fps) / 1000.0
+        self.lag += min(elapsed, MAX_FRAME_TIME)
+        steps = int(self.lag / self.step)
+        self.lag -= steps * self.step
+        return steps
+
+    def wait_for_event(self):
+        timeout = IDLE_WAKE_INTERVAL - pygame.time.get_ticks() % IDLE_WAKE_INTERVAL + 1
+        event = pygame.event.wait(timeout)
+        if event.type == pygame.NOEVENT:
+            self.woke_on_timer = True
+        else:
+            pygame.event.post(event) # leave it for Game.handle_input
+            self.still_frames = 0
+
+    def frame_drawn(self, changed):
+        '''
+        Call after each frame is drawn with whether it came out any different from the last one, to track whether
+        anything is still animating.
+        '''
+        if not changed:
+            self.still_frames += 1
+        elif self.woke_on_timer:
+            # Something blinked on schedule; go right back to idling if the next frame is the same.
+            self.still_frames = IDLE_AFTER_FRAMES - 1
+        else:
+            self.still_frames = 0
@@ -0,0 +1,53 @@
+# -*- coding: UTF-8 -*-
+
+import pygame
+
+BAND_GAP = 8 # rows; changed bands closer together than this get merged into one
+MAX_DIRTY_BANDS = 4 # past this many bands, one band from the first changed row to the last one gets used
+
+
+class FrameDiff(object):
+    '''
+    Finds what changed on a surface since the last frame by comparing it a row at a time with a copy of the last
+    frame, so that only those rows need to be scaled up and pushed to the window. Comparing rows is a lot cheaper
+    than scaling and presenting the whole screen, and it works the same no matter which screen did the drawing.
+    '''
+
+    def __init__(self):
+        self.last_frame = None
+        self.last_rows = None
+
+    def reset(self):
+        '''
+        Makes the next frame count as entirely changed, like after the window gets set up again.
+        '''
+        self.last_frame = None
+        self.last_rows = None
+
+    def get_dirty_rects(self, surface):
+        '''
+        Returns a list of full-width Rects covering the rows of surface that changed since the last call, or an
+        empty list if nothing did.
+        '''
+        width, height = surface.get_size()
+        frame = surface.get_buffer().raw
+        if frame == self.last_frame:
+            return []
+        pitch = surface.get_pitch()
+        rows = [frame[y*pitch:(y+1)*pitch] for y in range(height)]
+        last_rows = self.last_rows
+        self.last_frame = frame
+        self.last_rows = rows
+        if last_rows is None or len(last_rows) != height:
+            return [pygame.Rect(0, 0, width, height)]
+
+        bands = [] # [top, bottom] pairs of changed rows
+        for y in range(height):
+            if rows[y] != last_rows[y]:
+                if bands and y - bands[-1][1] < BAND_GAP:
+                    bands[-1][1] = y + 1
+                else:
+                    bands.append([y, y + 1])
+        if len(bands) > MAX_DIRTY_BANDS:
+            bands = [[bands[0][0], bands[-1][1]]]
+        return [pygame.Rect(0, top, width, bottom - top) for top, bottom in bands]
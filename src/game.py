@@ -15,12 +15,15 @@ from pygame.locals import *
 from battle import Battle
 from battle_intro import BattleIntro
 from beginning import Beginning
+from conditions import compile_conditions, ConditionStore
 from constants import (
     BATTLE_MUSIC, BLACK, EXP_REQUIRED_BY_LEVEL, GAME_HEIGHT, GAME_WIDTH, HQ, ITEMS, MAP_MUSIC, MAX_COMPANY_SIZE,
     MAX_ITEMS_PER_PERSON, MAX_NUM, SHOP_MUSIC, TACTICS, CAMP_MUSIC, MAP_WIDTH, MAP_HEIGHT, VILLAGE_MUSIC,
     CREDITS_MUSIC, SELLING_DISCOUNT
 )
 from cutscene import Cutscene
+from frame_clock import FrameClock, MUSIC_END
+from frame_diff import FrameDiff
 from helpers import (
     can_level_up,
     get_armor_class_by_level,
@@ -28,8 +31,10 @@ from helpers import (
     get_intelligence,
     get_max_soldiers,   
     get_max_tactical_points,
+    get_stats,
     get_tactic_for_level,
     get_tactics,
+    invalidate_stats,
     load_json_file_if_exists,
     load_stats,
     save_game_state,
@@ -39,7 +44,9 @@ from menu_screen import MenuScreen
 from narration import Narration
 from pause_map import PauseMap
 from pause_menu import PauseMenu
-from tiled_map import Map
+from sounds import get_sound
+from tile_bitmap import TileBitmap
+from tiled_map import clear_map_caches, Map
 from title_page import TitlePage
 from game_credits import Credits
 
@@ -50,6 +57,14 @@ REPEAT_CONDITIONS = [
     'got_lost_and_found_item',
 ]
 
+# The music options for the maps in MAP_MUSIC with more than one, with their conditions compiled. Key is the map
+# name, value is a list of (predicate, music).
+MAP_MUSIC_OPTIONS = {
+    map_name: [(compile_conditions(item.get('conditions')), item) for item in music]
+    for map_name, music in MAP_MUSIC.items()
+    if type(music) in (list, tuple)
+}
+
 
 class Game(object):
     def __init__(self, screen, args):
@@ -72,8 +87,7 @@ class Game(object):
         self.virtual_width = GAME_WIDTH
         self.virtual_height = GAME_HEIGHT
         self.virtual_screen = pygame.Surface((self.virtual_width, self.virtual_height)).convert_alpha()
-        self.clock = pygame.time.Clock()
-        self.fps = 1000
+        self.frame_clock = FrameClock(args.fps)
         self.current_map = None
         self.title_page = TitlePage(self.virtual_screen, self)
         self.set_screen_state('title')
@@ -81,15 +95,19 @@ class Game(object):
         pygame.event.set_blocked(ACTIVEEVENT)
         pygame.event.set_blocked(VIDEORESIZE)
         pygame.event.set_blocked(KEYUP)
+        if pygame.mixer.get_init():
+            pygame.mixer.music.set_endevent(MUSIC_END)
         self.menu_screen = MenuScreen(self.virtual_screen, self)
         self.beginning_screen = Beginning(self, self.virtual_screen)
         self.game_state = {} # This will get initialized by menu_screen when a save slot is loaded
         self.fitted_screen = None # gets initialized in resize_window()
+        self.integer_scale = None # gets initialized in resize_window()
+        self.frame_diff = FrameDiff()
         self.window_size = screen.get_size()
         self.resize_window(self.window_size)
         self.change_map_time_elapsed = None
-        self.walk_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'walk.wav'))
-        self.encounter_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'encounter.wav'))
+        self.walk_sound = get_sound('walk')
+        self.encounter_sound = get_sound('encounter')
         self.fade_out = False
         self.continue_current_music = False
         self.next_map = None
@@ -100,7 +118,6 @@ class Game(object):
         self.pause_map = None
         self._screen_state_after_pause = None
         self.last_overworld_position = [169, 190] # default to melek
-        self.unprocessed_beaten_path = [] # This will get initialized by menu_screen when game_state is loaded
         self.play_walk_sound = True
         self.two_yuppies_state = False
 
@@ -176,25 +193,18 @@ class Game(object):
         }
 
     def conditions_are_met(self, conditions):
-        if conditions is None or len(conditions) == 0:
-            return True
-        if isinstance(conditions, str):
-            conditions = {conditions: True}
-        elif type(conditions) in (tuple, list):
-            conditions = {condition: True for condition in conditions}
-        for condition, expected in conditions.items():
-            if expected and not self._condition_is_true(condition):
-                return False
-            if not expected and self._condition_is_true(condition):
-                return False
-        return True
+        '''
+        Takes a condition spec (a name, a list of names, or a dict of names to expected values) or a Predicate
+        already compiled from one.
+        '''
+        return compile_conditions(conditions).is_met(self._condition_is_true)
 
     def _condition_is_true(self, condition_str):
         if condition_str.startswith("state:"):
             condition_state_checker_str = condition_str.split(":")[1]
             return getattr(self, condition_state_checker_str)()
         else:
-            return condition_str in self.game_state.get('conditions', [])
+            return condition_str in self.conditions
 
     def get_dialog_for_condition(self, dialog):
         """
@@ -236,30 +246,25 @@ class Game(object):
     def set_game_state_condition(self, condition):
         action_dialog = None
         side_effect = self.condition_side_effects.get(condition)
-        condition_not_found = condition not in self.game_state['conditions']
+        condition_not_found = condition not in self.conditions
         if side_effect and (condition_not_found or condition in REPEAT_CONDITIONS):
             action_dialog = side_effect()
         if not condition.startswith('state:'):
-            conditions = list(self.game_state['conditions'])
-            if condition_not_found:
-                conditions.append(condition)
-            self.update_game_state({
-                'conditions': conditions,
-            })
+            # This appends to game_state['conditions'] in place.
+            self.conditions.add(condition)
         the_map = self.current_map or self.next_map
         if the_map:
             the_map.handle_game_state_condition(condition)
         return action_dialog
 
     def get_music(self, map_name):
-        music = MAP_MUSIC.get(map_name, SHOP_MUSIC)
-        if type(music) in (list, tuple):
-            for item in music:
-                if self.conditions_are_met(item.get('conditions')):
+        if map_name in MAP_MUSIC_OPTIONS:
+            for predicate, item in MAP_MUSIC_OPTIONS[map_name]:
+                if self.conditions_are_met(predicate):
                     return item
             return SHOP_MUSIC
         else:
-            return music
+            return MAP_MUSIC.get(map_name, SHOP_MUSIC)
 
     def reserve_multiplier(self):
         # Get a bonus to your exp when you have guys in the reserve.
@@ -518,6 +523,9 @@ class Game(object):
         self.sleep_music = sleep_music
 
     def save(self):
+        # Saves only keep the visible tiles, so mark them for the whole beaten path first.
+        while self.unprocessed_beaten_path:
+            self.process_next_beaten_path_entry()
         save_game_state(self.slot, self.game_state)
 
     def set_screen_state(self, state):
@@ -546,6 +554,9 @@ class Game(object):
                 pygame.mixer.music.play()
             self.continue_current_music = True
         elif state == 'title':
+            if self.args.devtools:
+                invalidate_stats() # pick up any edits to data/stats made while the game was running
+                clear_map_caches() # and to data/maps
             self.battle = None
             self.current_map = None
             self.title_page.reset()
@@ -592,7 +603,7 @@ class Game(object):
         tactician = self.get_tactician()
         if tactician:
             tactical_points = tactician['tactical_points']
-            tactics = get_tactics(load_stats(tactician['name']), self.game_state['level'], pretty=False)
+            tactics = get_tactics(get_stats(tactician['name']), self.game_state['level'], pretty=False)
             allies.remove(tactician)
             allies.append(tactician)
         else:
@@ -710,8 +721,36 @@ class Game(object):
         if next_battle:
             self.current_map.start_battle(next_battle, prev_experience=prev_experience, prev_money=prev_money, prev_food=prev_food)
 
+    @property
+    def game_state(self):
+        return self._game_state
+
+    @game_state.setter
+    def game_state(self, game_state):
+        self._game_state = game_state
+        self.conditions = ConditionStore(game_state.get('conditions'))
+        self.unprocessed_beaten_path = [] # (x, y) tuples of beaten_path entries whose visible tiles aren't marked yet
+        if 'beaten_path' in game_state:
+            self.load_beaten_path()
+
+    def load_beaten_path(self):
+        '''
+        Turns the beaten_path and visible_tiles of a freshly loaded game state into TileBitmaps. Saves from before
+        they were bitmaps have them as dicts keyed by 'x y', with the beaten_path entries whose visible tiles weren't
+        marked yet set to False; those go back in the queue.
+        '''
+        beaten_path = self.game_state['beaten_path']
+        if isinstance(beaten_path, dict):
+            self.unprocessed_beaten_path = [
+                tuple(int(i) for i in entry.split()) for entry, processed in beaten_path.items() if not processed
+            ]
+        self.game_state['beaten_path'] = TileBitmap.from_json(beaten_path)
+        self.game_state['visible_tiles'] = TileBitmap.from_json(self.game_state.get('visible_tiles'))
+
     def update_game_state(self, updates):
         self.game_state.update(updates)
+        if 'conditions' in updates:
+            self.conditions = ConditionStore(self.game_state['conditions'])
 
     def add_to_company(self, names):
         company = copy.deepcopy(self.game_state['company'])
@@ -850,19 +889,13 @@ class Game(object):
         if map_name == 'overworld':
             self.mark_beaten_path(position)
             
-    def _position_to_string(self, pos):
-        pos = [int(x) for x in pos]
-        return '{} {}'.format(*pos)
-
     # This should only be called for marking the latest position the player has walked in the overworld.
     # Loading the game in a palace counts, and menu_screen.py makes sure to call this for the HQ's location
     # on the overworld map when the game starts.
     def mark_beaten_path(self, position):
         self.last_overworld_position = position
-        path_entry = self._position_to_string(position)
-        if path_entry not in self.game_state['beaten_path']:
-            self.game_state['beaten_path'][path_entry] = False
-            self.unprocessed_beaten_path.append(path_entry)
+        if self.game_state['beaten_path'].add(position):
+            self.unprocessed_beaten_path.append(tuple(int(i) for i in position))
 
     # This can be called by various screens whenever the game is fairly idle, to take advantage of the time
     # to pre-calculate the visible tiles for the pause map. Doing this during idle times minimizes how much
@@ -873,17 +906,8 @@ class Game(object):
         more_to_process = False
         if len(self.unprocessed_beaten_path) == 0:
             return more_to_process
-        entry = self.unprocessed_beaten_path.pop()
-        X, Y = [int(i) for i in entry.split()]
-        for x in range(X-8, X+9):
-            if x <= 0 or x >= MAP_WIDTH:
-                continue
-            for y in range(Y-7, Y+8):
-                if y <= 0 or y >= MAP_HEIGHT:
-                    continue
-                visible_tile = self._position_to_string((x, y))
-                self.game_state['visible_tiles'][visible_tile] = True
-        self.game_state['beaten_path'][entry] = True
+        X, Y = self.unprocessed_beaten_path.pop()
+        self.game_state['visible_tiles'].add_rect(max(X-8, 1), max(Y-7, 1), min(X+9, MAP_WIDTH), min(Y+8, MAP_HEIGHT))
         more_to_process = len(self.unprocessed_beaten_path) > 0
         return more_to_process
 
@@ -893,6 +917,8 @@ class Game(object):
         width_multiplier = width*1.0 / self.virtual_width
         height_multiplier = height*1.0 / self.virtual_height
         multiplier = min(width_multiplier, height_multiplier)
+        if self.args.integer_scale and multiplier >= 1:
+            multiplier = int(multiplier) # whole pixels; the rest of the window gets letterboxed
         fitted_width = int(self.virtual_width*multiplier)
         fitted_height = int(self.virtual_height*multiplier)
         fitted_x_pos = (width - fitted_width) // 2
@@ -900,10 +926,43 @@ class Game(object):
         self.fitted_screen = self.real_screen.subsurface(
             (fitted_x_pos, fitted_y_pos, fitted_width, fitted_height)
         )
-
-    def scale(self):
+        # Scaling part of the screen only lands on exactly the same pixels as scaling all of it when the
+        # multiplier is a whole number.
+        if (fitted_width, fitted_height) == (self.virtual_width*int(multiplier), self.virtual_height*int(multiplier)):
+            self.integer_scale = int(multiplier)
+        else:
+            self.integer_scale = None
         self.real_screen.fill(BLACK)
-        pygame.transform.scale(self.virtual_screen, self.fitted_screen.get_size(), self.fitted_screen)
+        pygame.display.flip()
+        self.frame_diff.reset()
+
+    def scale(self, dirty_rects):
+        '''
+        Scales the dirty rects of the virtual screen onto the window (or all of it, when the multiplier isn't a
+        whole number) and returns the rects of the window that need to be updated.
+        '''
+        fitted_x_pos, fitted_y_pos = self.fitted_screen.get_abs_offset()
+        fitted_rect = self.fitted_screen.get_rect(topleft=(fitted_x_pos, fitted_y_pos))
+        if self.integer_scale:
+            scale = self.integer_scale
+            for rect in dirty_rects:
+                pygame.transform.scale(
+                    self.virtual_screen.subsurface(rect),
+                    (rect.width*scale, rect.height*scale),
+                    self.fitted_screen.subsurface((rect.x*scale, rect.y*scale, rect.width*scale, rect.height*scale)),
+                )
+        else:
+            pygame.transform.scale(self.virtual_screen, self.fitted_screen.get_size(), self.fitted_screen)
+        x_multiplier = fitted_rect.width*1.0 / self.virtual_width
+        y_multiplier = fitted_rect.height*1.0 / self.virtual_height
+        window_rects = []
+        for rect in dirty_rects:
+            left = fitted_x_pos + int(math.floor(rect.left*x_multiplier)) - 1
+            top = fitted_y_pos + int(math.floor(rect.top*y_multiplier)) - 1
+            right = fitted_x_pos + int(math.ceil(rect.right*x_multiplier)) + 1
+            bottom = fitted_y_pos + int(math.ceil(rect.bottom*y_multiplier)) + 1
+            window_rects.append(pygame.Rect(left, top, right - left, bottom - top).clip(fitted_rect))
+        return window_rects
 
     def draw(self):
         if self._screen_state == 'game':
@@ -932,7 +991,6 @@ class Game(object):
             self.current_cutscene.draw()
         elif self._screen_state == 'credits':
             self.credits.draw()
-        self.scale()
 
     def update(self, dt):
         # handle music
@@ -1321,16 +1379,19 @@ class Game(object):
 
     def run(self):
         self.running = True
-        dt = 0.0
         try:
             while self.running:
-                dt += self.clock.tick(self.fps)/1000.0
-                if dt >= 0.01:
-                    self.handle_input()
-                    self.update(dt)
-                    self.draw()
-                    pygame.display.flip()
-                    dt = 0.0
+                steps = self.frame_clock.tick()
+                self.handle_input()
+                if not self.running: # quit during handle_input
+                    break
+                for _ in range(steps):
+                    self.update(self.frame_clock.step)
+                self.draw()
+                dirty_rects = self.frame_diff.get_dirty_rects(self.virtual_screen)
+                self.frame_clock.frame_drawn(bool(dirty_rects))
+                if dirty_rects:
+                    pygame.display.update(self.scale(dirty_rects))
         except KeyboardInterrupt:
             self.running = False
             pygame.quit()
@@ -6,6 +6,7 @@ import pygame
 from pygame.locals import *
 
 from constants import BLACK, GAME_WIDTH, GAME_HEIGHT, ITEMS, STATS, TACTICS, PLACES, PARTY_STATS
+from sounds import get_sound
 from text import create_prompt, MenuBox, MenuGrid
 
 
@@ -38,7 +39,7 @@ class HelpMenu(object):
     def __init__(self, screen, game):
         self.screen = screen
         self.game = game
-        self.select_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'select.wav'))
+        self.select_sound = get_sound('select')
         self.state = 'main'
         items = [
             'WEAPONS',
@@ -3,6 +3,7 @@
 import json
 import os
 import shutil
+from types import MappingProxyType
 
 import pygame
 
@@ -16,6 +17,16 @@ from constants import ATTACK_POINTS, ARMOR_CLASS, ITEMS, TACTICS
 
 RESOURCES_DIR = 'data'
 
+# Process-wide registry of warlord stats, keyed by warlord name. Each data/stats/<name>.json file is read the
+# first time it is asked for and the frozen result is shared by every caller after that.
+_STATS_REGISTRY = {}
+
+# Per-level lookup tables derived from the stats above, indexed directly by level from 0 to MAX_LEVEL.
+# _LEVEL_TABLES is keyed by warlord name, and _TACTICS_TABLES by intelligence since tactics only depend on that.
+MAX_LEVEL = 90
+_LEVEL_TABLES = {}
+_TACTICS_TABLES = {}
+
 
 def unpretty(string_or_strings):
     if isinstance(string_or_strings, str):
@@ -32,12 +43,12 @@ def _unpretty_string(s):
 
 
 def get_intelligence(warlord):
-    stats = load_stats(warlord)
+    stats = get_stats(warlord)
     return stats['intelligence']
 
 
 def can_level_up(warlord):
-    stats = load_stats(warlord)
+    stats = get_stats(warlord)
     return 'max_soldiers_by_level' in stats and 'max_soldiers' not in stats
 
 
@@ -50,11 +61,14 @@ def get_tactic_for_level(level):
 
 def get_tactics(stats_or_warlord, level, pretty=True):
     if isinstance(stats_or_warlord, str):
-        stats = load_stats(stats_or_warlord)
+        stats = get_stats(stats_or_warlord)
     else:
         stats = stats_or_warlord
     if 'tactics' in stats:
-        tactics = stats['tactics']
+        tactics = list(stats['tactics'])
+    elif 0 <= level <= MAX_LEVEL:
+        tactics, pretty_tactics = _get_tactics_table(stats['intelligence'])[level]
+        return list(pretty_tactics if pretty else tactics)
     else:
         tactics = []
         for slot in range(1,7):
@@ -65,6 +79,23 @@ def get_tactics(stats_or_warlord, level, pretty=True):
         return tactics
 
 
+def _get_tactics_table(intelligence):
+    '''
+    Returns a tuple indexed by level of (tactics, pretty_tactics) pairs for a warlord with this intelligence.
+    '''
+    table = _TACTICS_TABLES.get(intelligence)
+    if table is None:
+        rows = []
+        for level in range(MAX_LEVEL + 1):
+            tactics = tuple(
+                _get_max_tactic(intelligence=intelligence, level=level, slot=slot) for slot in range(1,7)
+            )
+            rows.append((tactics, tuple('{:~<10}'.format(tactic.title().replace(' ', '~')) for tactic in tactics)))
+        table = tuple(rows)
+        _TACTICS_TABLES[intelligence] = table
+    return table
+
+
 def _get_max_tactic(intelligence=0, level=0, slot=0):
     found_tactic = ""
     min_intelligence = 0
@@ -98,18 +129,82 @@ def get_armor_class_by_level(level):
     return ARMOR_CLASS[level]
 
 
+def get_stats(name):
+    '''
+    Returns a read-only view of the stats in data/stats/<name>.json. The file is only read on the first call for
+    each warlord. Use load_stats instead if you need a dict you can modify.
+    '''
+    stats = _STATS_REGISTRY.get(name)
+    if stats is None:
+        with open('data/stats/{}.json'.format(name)) as f:
+            stats = _freeze(json.loads(f.read()))
+        _STATS_REGISTRY[name] = stats
+    return stats
+
+
 def load_stats(name):
-    with open('data/stats/{}.json'.format(name)) as f:
-        json_data = json.loads(f.read())
-    return json_data
+    '''
+    Returns a fresh, mutable copy of the warlord's stats from the registry.
+    '''
+    return _thaw(get_stats(name))
+
+
+def invalidate_stats(name=None):
+    '''
+    Drops cached stats so the next lookup rereads them from disk. Pass a name to drop just one warlord.
+    This is for editing data/stats while the game is running (see Game.set_screen_state for 'title').
+    '''
+    if name is None:
+        _STATS_REGISTRY.clear()
+        _LEVEL_TABLES.clear()
+    else:
+        _STATS_REGISTRY.pop(name, None)
+        _LEVEL_TABLES.pop(name, None)
+
+
+def get_level_table(name):
+    '''
+    Returns the warlord's max soldiers (as an ally and as an enemy) and max tactical points for every level from 0
+    to MAX_LEVEL, so that per-level lookups are just an index into a tuple. Built on first use for each warlord.
+    '''
+    table = _LEVEL_TABLES.get(name)
+    if table is None:
+        stats = get_stats(name)
+        levels = range(MAX_LEVEL + 1)
+        table = MappingProxyType({
+            'soldiers': tuple(_get_max_soldiers(stats, level, True) for level in levels),
+            'enemy_soldiers': tuple(_get_max_soldiers(stats, level, False) for level in levels),
+            'tactical_points': tuple(_get_max_tactical_points(stats, level) for level in levels),
+        })
+        _LEVEL_TABLES[name] = table
+    return table
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
 
 
 def get_max_soldiers(warlord=None, level=None, stats=None, is_ally=True):
     if stats is None:
-        with open('data/stats/{}.json'.format(warlord)) as f:
-            json_data = json.loads(f.read())
-    else:
-        json_data = stats
+        if level is not None and 0 <= level <= MAX_LEVEL:
+            return get_level_table(warlord)['soldiers' if is_ally else 'enemy_soldiers'][level]
+        stats = get_stats(warlord)
+    return _get_max_soldiers(stats, level, is_ally)
+
+
+def _get_max_soldiers(json_data, level, is_ally):
     if is_ally:
         if 'max_soldiers' in json_data:
             soldiers = json_data['max_soldiers']
@@ -138,10 +233,13 @@ def hyphenate(text, chars):
 
 def get_max_tactical_points(warlord=None, level=None, stats=None):
     if stats is None:
-        with open('data/stats/{}.json'.format(warlord)) as f:
-            json_data = json.loads(f.read())
-    else:
-        json_data = stats
+        if level is not None and 0 <= level <= MAX_LEVEL:
+            return get_level_table(warlord)['tactical_points'][level]
+        stats = get_stats(warlord)
+    return _get_max_tactical_points(stats, level)
+
+
+def _get_max_tactical_points(json_data, level):
     if 'tactical_points_by_level' in json_data and level is not None:
         tactical_points = json_data['tactical_points_by_level'][level-1]
     else:
@@ -150,8 +248,7 @@ def get_max_tactical_points(warlord=None, level=None, stats=None):
 
 
 def get_enemy_stats(warlord, level=None):
-    with open('data/stats/{}.json'.format(warlord)) as f:
-        json_data = json.loads(f.read())
+    json_data = get_stats(warlord)
     return {
         'strength': json_data['strength'],
         'defense': json_data['defense'],
@@ -205,6 +302,7 @@ def save_game_state(slot, game_state):
             sort_keys = True,
             indent = 2,
             separators=(',', ': '),
+            default=lambda value: value.to_json(), # for TileBitmaps
         ))
 
 
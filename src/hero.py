@@ -6,6 +6,7 @@ import pygame
 
 from constants import TILE_SIZE
 from helpers import is_half_second
+from sounds import get_sound
 from sprite import Sprite
 
 
@@ -15,22 +16,15 @@ class Hero(Sprite):
     ):
         super(Hero, self).__init__(tmx_data, game, character, position, speed, direction, walking, follower, tiled_map)
         self.cells = cells
-        self.wall_sound = pygame.mixer.Sound('data/audio/wall.wav')
+        self.wall_sound = get_sound('wall')
         self.playing_wall_sound = False
         self.playing_wall_sound_time_elapsed = 0.0
 
     def handle_cell(self):
-        props = self.cells.get(tuple(self.position))
-        if not props:
-            return
-        teleport = props.get('teleport')
-        if teleport:
-            if isinstance(teleport, dict):
-                teleports = [teleport]
-            else:
-                teleports = teleport
-            for tele in teleports:
-                if 'conditions' in tele and not self.game.conditions_are_met(tele['conditions']):
+        teleports = self.tiled_map.teleport_options.get(tuple(self.position))
+        if teleports:
+            for predicate, tele in teleports:
+                if not self.game.conditions_are_met(predicate):
                     continue
                 new_map = tele.get('map')
                 new_direction = tele.get('direction', self.direction)
@@ -38,7 +32,8 @@ class Hero(Sprite):
                     self.game.set_current_map(new_map, [tele['x'], tele['y']], new_direction)
                 else:
                     self.tiled_map.load_company_sprites([tele['x'], tele['y']], new_direction, 'under')
-                break
+                return
+        self.tiled_map.preload_nearby_maps(self.position)
 
     def update(self, dt):
         super(Hero, self).update(dt)
@@ -15,6 +15,7 @@ from helpers import get_map_filename
 from hero import Hero
 from report import Report
 from shop import create_shop
+from sounds import get_sound
 from text import create_prompt, MenuBox, TextBox
 
 
@@ -23,9 +24,9 @@ class MapMenu(object):
         self.screen = screen
         self.main_menu = MenuBox(['TALK', 'CHECK', 'FORMATION', 'GENERAL', 'ITEM'], title='Command')
         self.main_menu.focus()
-        self.select_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'select.wav'))
+        self.select_sound = get_sound('select')
         self.select_sound.play()
-        self.resurrect_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'resurrect.wav'))
+        self.resurrect_sound = get_sound('resurrect')
         self.state = 'main'
         self.prompt = None
         self.map = tiled_map
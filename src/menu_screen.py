@@ -7,6 +7,7 @@ from pygame.locals import *
 
 from constants import BLACK, GAME_WIDTH, HQ_LOCATIONS
 from helpers import create_save_state, erase_save_state, is_half_second, load_save_states, copy_save_state
+from sounds import get_sound
 from text import create_prompt, MenuBox, MenuGrid, TextBox
 
 MAIN_MENU = [
@@ -21,7 +22,7 @@ class MenuScreen(object):
     def __init__(self, screen, game):
         self.screen = screen
         self.game = game
-        self.select_sound = pygame.mixer.Sound('data/audio/select.wav')
+        self.select_sound = get_sound('select')
         self.screen_state = 'unstarted'
         self.state = load_save_states()
         self.start_prompt = None
@@ -287,7 +288,6 @@ class MenuScreen(object):
             time.sleep(.5)
             slot = int(self.start_menu.get_choice()[0])
             self.game.game_state = self.state[slot-1]
-            self.game.unprocessed_beaten_path = [k for k, v in self.game.game_state['beaten_path'].items() if not v]
             self.game.slot = slot
             if self.game.game_state['level'] == 0:
                 self.game.set_screen_state('beginning')
@@ -0,0 +1,73 @@
+# -*- coding: UTF-8 -*-
+
+
+class OccupancyGrid(object):
+    '''
+    Tracks which tiles of a map are taken by which entities: the company sprites (hero, followers and peasants), the
+    ai_sprites and the treasures, each added with its kind ('company', 'ai_sprite' or 'treasure').
+
+    A sprite that starts walking reserves the tile it is walking to, and keeps holding the tile it is leaving until it
+    commits the move when it arrives. So a tile is taken for as long as anybody is on it or on the way to it, and
+    nothing here is keyed by where a sprite happens to be drawn.
+    '''
+
+    def __init__(self):
+        self._tiles = {} # key is a position tuple, value is a dict of the entities holding that tile to their kind
+        self._entities = {} # key is an entity, value is (kind, list of the position tuples it holds)
+
+    def add(self, entity, kind, position):
+        self.remove(entity)
+        self._entities[entity] = (kind, [])
+        self._hold(entity, tuple(position))
+
+    def remove(self, entity):
+        _, positions = self._entities.pop(entity, (None, []))
+        for position in positions:
+            holders = self._tiles[position]
+            del holders[entity]
+            if not holders:
+                del self._tiles[position]
+
+    def place(self, entity, position):
+        '''
+        Moves the entity straight to position, like when it gets teleported, letting go of every other tile it holds.
+        '''
+        if entity not in self._entities: # it has been taken off the map
+            return
+        kind, _ = self._entities[entity]
+        self.add(entity, kind, position)
+
+    def reserve(self, entity, position):
+        '''
+        Holds position for the entity on top of the tile it is on, for when it starts walking there.
+        '''
+        position = tuple(position)
+        if entity in self._entities and position not in self._entities[entity][1]:
+            self._hold(entity, position)
+
+    def commit(self, entity, position):
+        '''
+        Finishes a move: the entity now holds only position.
+        '''
+        position = tuple(position)
+        if entity in self._entities and self._entities[entity][1] != [position]:
+            self.place(entity, position)
+
+    def get(self, position, kinds):
+        '''
+        Returns an entity of one of the kinds that holds position, or None.
+        '''
+        for entity, kind in self._tiles.get(tuple(position), {}).items():
+            if kind in kinds:
+                return entity
+        return None
+
+    def is_taken(self, position, kinds, ignore=None):
+        for entity, kind in self._tiles.get(tuple(position), {}).items():
+            if kind in kinds and entity is not ignore:
+                return True
+        return False
+
+    def _hold(self, entity, position):
+        self._entities[entity][1].append(position)
+        self._tiles.setdefault(position, {})[entity] = self._entities[entity][0]
@@ -35,8 +35,7 @@ class PauseMap(object):
         visible_minitiles = [[0] * 60 for i in range(80)]
         layer = self.tmx_data.get_layer_by_name('blackout')
         tileset = self.tmx_data.tilesets[2]
-        for tile in self.game.game_state['visible_tiles'].keys():
-            x, y = [int(i) for i in tile.split()]
+        for x, y in self.game.game_state['visible_tiles']:
             mini_x, mini_y = self.mini_coordinates((x, y))
             # Here, mini coordinates are 0-indexed.
             mini_x -= 1
@@ -8,12 +8,13 @@ from pygame.locals import *
 from constants import BLACK, GAME_WIDTH
 from devtools import Devtools
 from help_menu import HelpMenu
+from sounds import get_sound
 from text import MenuBox, TextBox, create_prompt
 
 
 class PauseMenu(object):
     def __init__(self, screen, game):
-        self.select_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'select.wav'))
+        self.select_sound = get_sound('select')
         self.screen = screen
         self.game = game
         self.title = TextBox('PAUSE MENU', GAME_WIDTH, 16, adjust='center')
@@ -5,10 +5,10 @@ import os
 
 import pygame
 
+from atlas import get_image
 from constants import BLACK, COPPER, GAME_WIDTH, GAME_HEIGHT
 from helpers import (
-    get_equip_based_stat_value, get_max_soldiers, get_max_tactical_points, get_tactics, hyphenate, load_image,
-    load_stats,
+    get_equip_based_stat_value, get_max_soldiers, get_max_tactical_points, get_stats, get_tactics, hyphenate,
 )
 from text import MenuGrid, TextBox
 
@@ -74,7 +74,7 @@ class Report(object):
             self.stats_provided = True
             self.is_ally = False
         else: # This is an ally report
-            self.stats = load_stats(self.name)
+            self.stats = get_stats(self.name)
             self.stats_provided = False
             self.is_ally = True
             if 'tactical_points_by_level' in self.stats:
@@ -85,7 +85,7 @@ class Report(object):
             portrait_name = 'shiz_headless'
         else:
             portrait_name = self.name
-        self.portrait = load_image(os.path.join('portraits', '{}.png'.format(portrait_name)))
+        self.portrait = get_image(os.path.join('portraits', '{}.png'.format(portrait_name)))
         self.blit_stats()
 
     def blit_stats(self):
@@ -151,7 +151,7 @@ class CompanyReport(object):
                     portrait_name = 'shiz_headless'
                 else:
                     portrait_name = warlord['name']
-                portrait = load_image(os.path.join('portraits', '{}.png'.format(portrait_name)))
+                portrait = get_image(os.path.join('portraits', '{}.png'.format(portrait_name)))
                 self.surface.blit(portrait, (16, 32))
                 self.surface.blit(TextBox('LEADER').surface, (72, 48))
                 self.surface.blit(TextBox(warlord['name'].title()).surface, (72, 64))
@@ -9,6 +9,7 @@ import sys
 
 import pygame
 
+from frame_clock import FPS
 from game import Game
 
 
@@ -23,6 +24,8 @@ class PosAction(argparse.Action):
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('-d', '--devtools', action='store_true', help='enable dev tools in the pause menu')
+    parser.add_argument('--fps', type=int, default=FPS, help='frames drawn (and updates simulated) per second')
+    parser.add_argument('--integer-scale', action='store_true', help='only scale up by whole numbers and letterbox the rest')
     parser.add_argument('--pos', nargs=3, action=PosAction, metavar=('MAPNAME', 'X', 'Y'), help='load a game at a specific position')
     args = parser.parse_args()
     if not hasattr(args, 'map'):
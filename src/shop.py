@@ -11,6 +11,7 @@ from constants import (
 )
 from helpers import get_max_soldiers
 from report import Report
+from sounds import get_sound
 from text import create_prompt, MenuBox, ShopMenu, TextBox
 
 WARLORDS_EXEMPT_FROM_FIRING = {
@@ -43,7 +44,7 @@ class Shop(object):
         self.misc_menu = None # This is a MenuBox whenever it is needed
         self.sleep_music = None # Needs to be the path to the sleep sound byte, which could be None or a save sound byte or whatever
         self.report = None
-        self.select_sound = pygame.mixer.Sound('data/audio/select.wav')
+        self.select_sound = get_sound('select')
         self.heal = False
 
         # The following should be set by the inheriting class's init
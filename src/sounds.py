@@ -0,0 +1,45 @@
+# -*- coding: UTF-8 -*-
+
+import os
+
+import pygame
+
+AUDIO_DIR = os.path.join('data', 'audio')
+
+# key is the sound's name (its filename in data/audio without the .wav), value is the decoded pygame.mixer.Sound
+_SOUNDS = {}
+
+
+def get_sound(name):
+    '''
+    Returns the Sound for data/audio/<name>.wav, decoding it the first time it is asked for. Every caller shares the
+    same Sound, so don't stop it or change its volume; use a Voice to be able to stop just your own playback.
+    '''
+    sound = _SOUNDS.get(name)
+    if sound is None:
+        sound = pygame.mixer.Sound(os.path.join(AUDIO_DIR, '{}.wav'.format(name)))
+        _SOUNDS[name] = sound
+    return sound
+
+
+class Voice(object):
+    '''
+    Plays a shared sound and keeps track of the channel it is playing on, so that stopping it only stops this
+    playback and not the same sound played by somebody else (like the typing sound of another text box). A voice
+    owns at most one playback, so playing it again stops the one before.
+    '''
+
+    def __init__(self, name):
+        self.sound = get_sound(name)
+        self.channel = None
+
+    def play(self, loops=0):
+        self.stop()
+        self.channel = self.sound.play(loops)
+        return self.channel
+
+    def stop(self):
+        # The channel may have finished this sound and moved on to another one by now.
+        if self.channel is not None and self.channel.get_sound() is self.sound:
+            self.channel.stop()
+        self.channel = None
@@ -1,22 +1,51 @@
 # -*- coding: UTF-8 -*-
 
+from collections import OrderedDict
 from math import ceil, floor
 import os
 import random
 
 import pygame
 
+from atlas import get_image
+from conditions import compile_conditions
 from constants import TILE_SIZE
 from helpers import is_half_second
+from tile_grid import get_tile_grid
+
+
+MAX_CACHED_CHARACTERS = 64
+MAX_CATCH_UP_MOVES = 3 # most moves a sleeping ai_sprite makes at once when it wakes up
+OFFSETS = {'n': [0, -1], 's': [0, 1], 'e': [1, 0], 'w': [-1, 0]}
+
+# Converted frames for the most recently used characters, shared by every sprite (and battle rect) that shows them.
+_CHARACTER_IMAGES = OrderedDict()
 
 
 def load_character_images(character):
-    path = 'data/images/sprites'
-    e_stand = pygame.image.load('{}/{}/e/stand.png'.format(path, character)).convert_alpha()
-    e_walk = pygame.image.load('{}/{}/e/walk.png'.format(path, character)).convert_alpha()
-    if os.path.isdir('{}/{}/w'.format(path, character)):
-        w_stand = pygame.image.load('{}/{}/w/stand.png'.format(path, character)).convert_alpha()
-        w_walk = pygame.image.load('{}/{}/w/walk.png'.format(path, character)).convert_alpha()
+    '''
+    Returns the frames for a character, or a variant of one like 'shiz_headless', as a dict keyed by direction and
+    then by 'stand' or 'walk'. The frames come from a cache of the MAX_CACHED_CHARACTERS most recently used
+    characters, so they are shared and must not be modified.
+    '''
+    images = _CHARACTER_IMAGES.get(character)
+    if images is None:
+        images = _load_character_images(character)
+        _CHARACTER_IMAGES[character] = images
+        if len(_CHARACTER_IMAGES) > MAX_CACHED_CHARACTERS:
+            _CHARACTER_IMAGES.popitem(last=False)
+    else:
+        _CHARACTER_IMAGES.move_to_end(character)
+    return images
+
+
+def _load_character_images(character):
+    path = os.path.join('sprites', character)
+    e_stand = get_image(os.path.join(path, 'e', 'stand.png'), alpha=True)
+    e_walk = get_image(os.path.join(path, 'e', 'walk.png'), alpha=True)
+    if os.path.isdir(os.path.join('data', 'images', path, 'w')):
+        w_stand = get_image(os.path.join(path, 'w', 'stand.png'), alpha=True)
+        w_walk = get_image(os.path.join(path, 'w', 'walk.png'), alpha=True)
     else:
         w_stand = pygame.transform.flip(e_stand, True, False)
         w_walk = pygame.transform.flip(e_walk, True, False)
@@ -26,12 +55,12 @@ def load_character_images(character):
             'walk': e_walk,
         },
         'n': {
-            'stand': pygame.image.load('{}/{}/n/stand.png'.format(path, character)).convert_alpha(),
-            'walk': pygame.image.load('{}/{}/n/walk.png'.format(path, character)).convert_alpha(),
+            'stand': get_image(os.path.join(path, 'n', 'stand.png'), alpha=True),
+            'walk': get_image(os.path.join(path, 'n', 'walk.png'), alpha=True),
         },
         's': {
-            'stand': pygame.image.load('{}/{}/s/stand.png'.format(path, character)).convert_alpha(),
-            'walk': pygame.image.load('{}/{}/s/walk.png'.format(path, character)).convert_alpha(),
+            'stand': get_image(os.path.join(path, 's', 'stand.png'), alpha=True),
+            'walk': get_image(os.path.join(path, 's', 'walk.png'), alpha=True),
         },
         'w': {
             'stand': w_stand,
@@ -48,6 +77,7 @@ class Sprite(pygame.sprite.Sprite):
         self.position = list(position)
         self.old_position = self.position
         self.tmx_data = tmx_data
+        self.tile_grid = get_tile_grid(tmx_data)
         self.velocity = self.velocity_from_speed_direction_walking(speed, direction, walking)
         self.game = game
         self.character = character
@@ -103,6 +133,8 @@ class Sprite(pygame.sprite.Sprite):
         self.direction = direction
         self.velocity = self.velocity_from_speed_direction_walking(self.speed, self.direction, ignore_walls=ignore_walls)
         moved = self.velocity != [0,0]
+        if moved and self.tiled_map:
+            self.tiled_map.occupancy.reserve(self, self.get_new_pos_from_direction(direction))
         if self.follower and moved: # the leader is actually starting a move to a new tile
             self.follower.move_to(self.position)
         return moved
@@ -127,24 +159,42 @@ class Sprite(pygame.sprite.Sprite):
         if self.velocity[0] > 0 and floor(self.position[0]) != floor(self.old_position[0]):
             self.position[0] = floor(self.position[0])
             self.velocity[0] = 0
+            self.commit_move()
             self.handle_cell()
         elif self.velocity[0] < 0 and ceil(self.position[0]) != ceil(self.old_position[0]):
             self.position[0] = ceil(self.position[0])
             self.velocity[0] = 0
+            self.commit_move()
             self.handle_cell()
 
         self.position[1] += self.velocity[1] * dt
         if self.velocity[1] > 0 and floor(self.position[1]) != floor(self.old_position[1]):
             self.position[1] = floor(self.position[1])
             self.velocity[1] = 0
+            self.commit_move()
             self.handle_cell()
         elif self.velocity[1] < 0 and ceil(self.position[1]) != ceil(self.old_position[1]):
             self.position[1] = ceil(self.position[1])
             self.velocity[1] = 0
+            self.commit_move()
             self.handle_cell()
 
         self.rect.topleft = [floor(TILE_SIZE*self.position[0]), floor(TILE_SIZE*self.position[1])]
 
+    def get_new_pos_from_direction(self, direction):
+        if direction == 'n':
+            return (self.position[0], self.position[1]-1)
+        elif direction == 's':
+            return (self.position[0], self.position[1]+1)
+        elif direction == 'e':
+            return (self.position[0]+1, self.position[1])
+        elif direction == 'w':
+            return (self.position[0]-1, self.position[1])
+
+    def commit_move(self):
+        if self.tiled_map:
+            self.tiled_map.occupancy.commit(self, self.position)
+
     def handle_cell(self):
         pass # we use this in the class Hero (which inherits from here) to teleport to different maps
 
@@ -153,11 +203,10 @@ class Sprite(pygame.sprite.Sprite):
         y = self.position[1] + offset[1]
         if x < 0 or y < 0 or x >= self.tmx_data.width or y >= self.tmx_data.height:
             return True
-        props = self.tmx_data.get_tile_properties(x, y, 0) or {}
-        is_map_wall = props.get('wall') == 'true'
+        is_map_wall = self.tile_grid.is_wall(x, y)
         is_ai_sprite = False
         if self.tiled_map:
-            is_ai_sprite = True if self.tiled_map.ai_sprites.get((x,y)) else False
+            is_ai_sprite = self.tiled_map.occupancy.is_taken((x, y), ['ai_sprite'], ignore=self)
         is_a_wall = is_map_wall or is_ai_sprite
         if update_hitting_wall:
             self.hitting_wall = is_a_wall
@@ -172,51 +221,75 @@ class AiSprite(Sprite):
         super(AiSprite, self).__init__(tmx_data, game, character, position, speed, direction, walking, follower, tiled_map)
         self.wander = wander
         self.elapsed_time = 0.0
-        if self.tiled_map:
-            self.tiled_map.ai_sprites[tuple(position)] = self
+        self.time_asleep = 0.0
         self.dialog = dialog
         self.walk = walk
+        self.walk_predicate = compile_conditions(walk.get('conditions')) if walk else None
 
     def is_a_wall(self, offset, update_hitting_wall=True):
         if super(AiSprite, self).is_a_wall(offset, update_hitting_wall):
             return True
         x = self.position[0] + offset[0]
         y = self.position[1] + offset[1]
-        if self.tiled_map.hero.position == [x,y]:
-            return True
-        if self.tiled_map.follower_one and self.tiled_map.follower_one.position == [x,y]:
-            return True
-        if self.tiled_map.follower_two and self.tiled_map.follower_two.position == [x,y]:
-            return True
-        return False
+        return self.tiled_map is not None and self.tiled_map.occupancy.is_taken((x, y), ['company'])
 
     def update(self, dt):
+        if self.time_asleep:
+            self.wake_up()
         self.elapsed_time += dt
-        if self.character == 'nehor':
-            cutoff = .02 # nehor moves fast
-        elif self.walk:
-            cutoff = 0 # if self.walk is set, they constantly move (move_maybe() will check velocity in this case)
-        else:
-            cutoff = 1 # everyone else possibly moves every second
+        cutoff = self.get_move_interval()
         if self.elapsed_time > cutoff:
             self.elapsed_time -= cutoff
             self.move_maybe()
         super(AiSprite, self).update(dt)
 
+    def get_move_interval(self):
+        if self.character == 'nehor':
+            return .02 # nehor moves fast
+        elif self.walk:
+            return 0 # if self.walk is set, they constantly move (move_maybe() will check velocity in this case)
+        else:
+            return 1 # everyone else possibly moves every second
+
+    def can_sleep(self):
+        '''
+        Returns if the map may skip updating this sprite while it is off screen. Sprites on a scripted walk never
+        sleep, and neither does anyone in the middle of a step.
+        '''
+        return not self.walk and self.velocity == [0, 0]
+
+    def sleep(self, dt):
+        self.time_asleep += dt
+
+    def wake_up(self):
+        '''
+        Makes up for the time asleep by taking about as many random steps as the sprite would have taken meanwhile
+        (at most MAX_CATCH_UP_MOVES), all at once since it was off screen, so wanderers don't look frozen in place.
+        '''
+        if self.wander and not self.tiled_map.map_menu:
+            chance = 1 if self.character == 'nehor' else 0.33
+            moves = min(MAX_CATCH_UP_MOVES, int(self.time_asleep / self.get_move_interval() * chance))
+            for _ in range(moves):
+                direction = random.choice(['n', 's', 'e', 'w'])
+                if not self.is_a_wall(OFFSETS[direction], update_hitting_wall=False):
+                    self.direction = direction
+                    self.position = list(self.get_new_pos_from_direction(direction))
+                    self.tiled_map.occupancy.place(self, self.position)
+        self.time_asleep = 0.0
+
     def move_maybe(self):
-        moved = None
-        if self.walk and self.game.conditions_are_met(self.walk.get('conditions')) and self.velocity == [0, 0]:
+        if self.walk and self.game.conditions_are_met(self.walk_predicate) and self.velocity == [0, 0]:
             destination = [self.walk['to']['x'], self.walk['to']['y']]
             if self.position == destination:
                 if 'game_state_action' in self.walk:
                     self.game.set_game_state_condition(self.walk['game_state_action'])
                 if 'reset' in self.walk:
                     self.position = [self.walk['reset']['x'], self.walk['reset']['y']]
+                    self.tiled_map.occupancy.place(self, self.position)
                 else:
                     self.walk = None
             else:
-                moved = self.move_to(destination, ignore_walls=True)
-                direction = self.direction
+                self.move_to(destination, ignore_walls=True)
         else:
             if not self.wander:
                 return
@@ -225,21 +298,4 @@ class AiSprite(Sprite):
             # every time we might move the ai_sprite, the probability is 0.33 unless nehor
             if random.random() < 0.33 or self.character == 'nehor':
                 direction = random.choice(['n', 's', 'e', 'w'])
-                moved = self.move(direction)
-
-        if moved:
-            self.tiled_map.ai_sprites[self.get_new_pos_from_direction(direction)] = self
-            try:
-                del self.tiled_map.ai_sprites[tuple(self.position)]
-            except KeyError: # I had an error once where mysteriously the key wasn't there.
-                pass
-
-    def get_new_pos_from_direction(self, direction):
-        if direction == 'n':
-            return (self.position[0], self.position[1]-1)
-        elif direction == 's':
-            return (self.position[0], self.position[1]+1)
-        elif direction == 'e':
-            return (self.position[0]+1, self.position[1])
-        elif direction == 'w':
-            return (self.position[0]-1, self.position[1])
+                self.move(direction)
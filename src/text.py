@@ -1,5 +1,6 @@
 # -*- coding: UTF-8 -*-
 
+from collections import OrderedDict
 from math import ceil
 from datetime import datetime
 import os
@@ -8,90 +9,93 @@ import time
 import pygame
 from pygame.locals import *
 
+from atlas import get_image
 from constants import BLACK, ITEMS, WHITE
-from helpers import is_half_second, load_image
+from helpers import is_half_second
+from sounds import get_sound, Voice
 
-CHARS = {
+# key is the character, value is the glyph's image file under data/images/font
+GLYPH_FILES = {
     # numbers
-    '0': load_image(os.path.join('font', '0.png')),
-    '1': load_image(os.path.join('font', '1.png')),
-    '2': load_image(os.path.join('font', '2.png')),
-    '3': load_image(os.path.join('font', '3.png')),
-    '4': load_image(os.path.join('font', '4.png')),
-    '5': load_image(os.path.join('font', '5.png')),
-    '6': load_image(os.path.join('font', '6.png')),
-    '7': load_image(os.path.join('font', '7.png')),
-    '8': load_image(os.path.join('font', '8.png')),
-    '9': load_image(os.path.join('font', '9.png')),
+    '0': '0.png',
+    '1': '1.png',
+    '2': '2.png',
+    '3': '3.png',
+    '4': '4.png',
+    '5': '5.png',
+    '6': '6.png',
+    '7': '7.png',
+    '8': '8.png',
+    '9': '9.png',
 
     # lower case letters
-    'a': load_image(os.path.join('font', 'a.png')),
-    'b': load_image(os.path.join('font', 'b.png')),
-    'c': load_image(os.path.join('font', 'c.png')),
-    'd': load_image(os.path.join('font', 'd.png')),
-    'e': load_image(os.path.join('font', 'e.png')),
-    'f': load_image(os.path.join('font', 'f.png')),
-    'g': load_image(os.path.join('font', 'g.png')),
-    'h': load_image(os.path.join('font', 'h.png')),
-    'i': load_image(os.path.join('font', 'i.png')),
-    'j': load_image(os.path.join('font', 'j.png')),
-    'k': load_image(os.path.join('font', 'k.png')),
-    'l': load_image(os.path.join('font', 'l.png')),
-    'm': load_image(os.path.join('font', 'm.png')),
-    'n': load_image(os.path.join('font', 'n.png')),
-    'o': load_image(os.path.join('font', 'o.png')),
-    'p': load_image(os.path.join('font', 'p.png')),
-    'q': load_image(os.path.join('font', 'q.png')),
-    'r': load_image(os.path.join('font', 'r.png')),
-    's': load_image(os.path.join('font', 's.png')),
-    't': load_image(os.path.join('font', 't.png')),
-    'u': load_image(os.path.join('font', 'u.png')),
-    'v': load_image(os.path.join('font', 'v.png')),
-    'w': load_image(os.path.join('font', 'w.png')),
-    'x': load_image(os.path.join('font', 'x.png')),
-    'y': load_image(os.path.join('font', 'y.png')),
-    'z': load_image(os.path.join('font', 'z.png')),
+    'a': 'a.png',
+    'b': 'b.png',
+    'c': 'c.png',
+    'd': 'd.png',
+    'e': 'e.png',
+    'f': 'f.png',
+    'g': 'g.png',
+    'h': 'h.png',
+    'i': 'i.png',
+    'j': 'j.png',
+    'k': 'k.png',
+    'l': 'l.png',
+    'm': 'm.png',
+    'n': 'n.png',
+    'o': 'o.png',
+    'p': 'p.png',
+    'q': 'q.png',
+    'r': 'r.png',
+    's': 's.png',
+    't': 't.png',
+    'u': 'u.png',
+    'v': 'v.png',
+    'w': 'w.png',
+    'x': 'x.png',
+    'y': 'y.png',
+    'z': 'z.png',
 
     # uppercase letters
-    'A': load_image(os.path.join('font', 'caps', 'a.png')),
-    'B': load_image(os.path.join('font', 'caps', 'b.png')),
-    'C': load_image(os.path.join('font', 'caps', 'c.png')),
-    'D': load_image(os.path.join('font', 'caps', 'd.png')),
-    'E': load_image(os.path.join('font', 'caps', 'e.png')),
-    'F': load_image(os.path.join('font', 'caps', 'f.png')),
-    'G': load_image(os.path.join('font', 'caps', 'g.png')),
-    'H': load_image(os.path.join('font', 'caps', 'h.png')),
-    'I': load_image(os.path.join('font', 'caps', 'i.png')),
-    'J': load_image(os.path.join('font', 'caps', 'j.png')),
-    'K': load_image(os.path.join('font', 'caps', 'k.png')),
-    'L': load_image(os.path.join('font', 'caps', 'l.png')),
-    'M': load_image(os.path.join('font', 'caps', 'm.png')),
-    'N': load_image(os.path.join('font', 'caps', 'n.png')),
-    'O': load_image(os.path.join('font', 'caps', 'o.png')),
-    'P': load_image(os.path.join('font', 'caps', 'p.png')),
-    'Q': load_image(os.path.join('font', 'caps', 'q.png')),
-    'R': load_image(os.path.join('font', 'caps', 'r.png')),
-    'S': load_image(os.path.join('font', 'caps', 's.png')),
-    'T': load_image(os.path.join('font', 'caps', 't.png')),
-    'U': load_image(os.path.join('font', 'caps', 'u.png')),
-    'V': load_image(os.path.join('font', 'caps', 'v.png')),
-    'W': load_image(os.path.join('font', 'caps', 'w.png')),
-    'X': load_image(os.path.join('font', 'caps', 'x.png')),
-    'Y': load_image(os.path.join('font', 'caps', 'y.png')),
-    'Z': load_image(os.path.join('font', 'caps', 'z.png')),
+    'A': 'caps/a.png',
+    'B': 'caps/b.png',
+    'C': 'caps/c.png',
+    'D': 'caps/d.png',
+    'E': 'caps/e.png',
+    'F': 'caps/f.png',
+    'G': 'caps/g.png',
+    'H': 'caps/h.png',
+    'I': 'caps/i.png',
+    'J': 'caps/j.png',
+    'K': 'caps/k.png',
+    'L': 'caps/l.png',
+    'M': 'caps/m.png',
+    'N': 'caps/n.png',
+    'O': 'caps/o.png',
+    'P': 'caps/p.png',
+    'Q': 'caps/q.png',
+    'R': 'caps/r.png',
+    'S': 'caps/s.png',
+    'T': 'caps/t.png',
+    'U': 'caps/u.png',
+    'V': 'caps/v.png',
+    'W': 'caps/w.png',
+    'X': 'caps/x.png',
+    'Y': 'caps/y.png',
+    'Z': 'caps/z.png',
 
     # as-is ascii punctuation (images look like their ascii characters)
-    ' ': load_image(os.path.join('font', 'space.png')),
-    '.': load_image(os.path.join('font', 'period.png')),
-    ',': load_image(os.path.join('font', 'comma.png')),
-    ':': load_image(os.path.join('font', 'colon.png')),
-    "'": load_image(os.path.join('font', 'apostrophe.png')),
-    '"': load_image(os.path.join('font', 'quote.png')),
-    '?': load_image(os.path.join('font', 'question.png')),
-    '!': load_image(os.path.join('font', 'exclamation.png')),
-    '/': load_image(os.path.join('font', 'slash.png')),
-    '*': load_image(os.path.join('font', 'asterisk.png')),
-    '-': load_image(os.path.join('font', 'mdash.png')), # yes, the game uses mdashes like they were hyphens
+    ' ': 'space.png',
+    '.': 'period.png',
+    ',': 'comma.png',
+    ':': 'colon.png',
+    "'": 'apostrophe.png',
+    '"': 'quote.png',
+    '?': 'question.png',
+    '!': 'exclamation.png',
+    '/': 'slash.png',
+    '*': 'asterisk.png',
+    '-': 'mdash.png', # yes, the game uses mdashes like they were hyphens
     
     # what looks like a hyphen in the game is not used as a hyphen, but it appears as a character you can
     # include in creating a save file. Since what looks like an mdash in the game is used as a hyphen, I'm
@@ -100,26 +104,126 @@ CHARS = {
     # the same. This unicode character is an ndash.
 
     # as-is unicode punctuation (images look like their unicode characters)
-    u'–': load_image(os.path.join('font', 'hyphen.png')), # this unicode is an ndash, U+2013
-    u'©': load_image(os.path.join('font', 'copyright.png')),
-    u'▶': load_image(os.path.join('font', 'arrow.png')),
-    u'▼': load_image(os.path.join('font', 'down_arrow.png')),
-    u'★': load_image(os.path.join('font', 'star.png')),
+    u'–': 'hyphen.png', # this unicode is an ndash, U+2013
+    u'©': 'copyright.png',
+    u'▶': 'arrow.png',
+    u'▼': 'down_arrow.png',
+    u'★': 'star.png',
 
     # characters used for drawing feature switches inline with text ("[]" is an off switch and "<>" is an on switch)
-    '[': load_image(os.path.join('font', 'left_off_switch.png')),
-    ']': load_image(os.path.join('font', 'right_off_switch.png')),
-    '<': load_image(os.path.join('font', 'left_on_switch.png')),
-    '>': load_image(os.path.join('font', 'right_on_switch.png')),
+    '[': 'left_off_switch.png',
+    ']': 'right_off_switch.png',
+    '<': 'left_on_switch.png',
+    '>': 'right_on_switch.png',
     
     # cheap way to force space integrity by making multiple words and spaces look like one word
-    '~': load_image(os.path.join('font', 'space.png')),
+    '~': 'space.png',
     
     # this is a hack to show hyphens without capitalizing the next letter (used in sword name shamshir-e)
-    u'ŕ': load_image(os.path.join('font', 'mdash.png')),
+    u'ŕ': 'mdash.png',
 }
 
 
+class Glyphs(dict):
+    '''
+    The glyph images, keyed by character. Glyphs are loaded (from the font atlas when there is one) the first time
+    they are drawn rather than when this module is imported, since nearly every module imports this one.
+    '''
+
+    def __contains__(self, char):
+        return char in GLYPH_FILES
+
+    def __missing__(self, char):
+        image = get_image(os.path.join('font', *GLYPH_FILES[char].split('/')))
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        self[char] = image
+        return image
+
+
+CHARS = Glyphs()
+
+DIGITS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
+NUMBER_CHARS = DIGITS + [',', '.', '?', '!', ' ', '~', '/']
+MAX_CACHED_GLYPH_RUNS = 256
+
+# Rendered lines for the most recently drawn word sequences, shared by every TextBox.
+_GLYPH_RUNS = OrderedDict()
+
+# Digit glyphs with the dot that marks where a thousands separator would go, keyed by digit.
+_SEPARATED_DIGITS = {}
+
+
+def get_glyph_run(words):
+    '''
+    Returns a surface with the words drawn the way TextBox lays out a line: 8 pixels per glyph, a space between words,
+    and the digits of long numbers grouped in threes. Runs come from a cache of the MAX_CACHED_GLYPH_RUNS most
+    recently used, so they are shared and must not be modified.
+    '''
+    key = tuple(words)
+    run = _GLYPH_RUNS.get(key)
+    if run is None:
+        run = _render_glyph_run(key)
+        _GLYPH_RUNS[key] = run
+        if len(_GLYPH_RUNS) > MAX_CACHED_GLYPH_RUNS:
+            _GLYPH_RUNS.popitem(last=False)
+    else:
+        _GLYPH_RUNS.move_to_end(key)
+    return run
+
+
+def _get_separated_digit(char):
+    if char not in _SEPARATED_DIGITS:
+        char_image = pygame.Surface((8, 8))
+        char_image.blit(CHARS[char], (0, 0))
+        pygame.draw.rect(char_image, WHITE, (7, 7, 1, 1), 1)
+        _SEPARATED_DIGITS[char] = char_image
+    return _SEPARATED_DIGITS[char]
+
+
+def _render_glyph_run(words):
+    run = pygame.Surface((len(u' '.join(words)) * 8, 8))
+    run.fill(BLACK)
+    chars_printed = 0
+    for word in words:
+        # is_number is used for displaying numbers in a more readable format, where every other triplet of
+        # characters is a bit transparent over a black background, making them a bit gray.
+        is_number = True
+        for char in word:
+            if char not in NUMBER_CHARS:
+                is_number = False
+                break
+        if is_number:
+            numbers_left = 0
+            # This is just in case there is a space or punctuation somewhere in the word.
+            for char in word:
+                if char in DIGITS:
+                    numbers_left += 1
+                else:
+                    break
+        for char in word:
+            if char not in CHARS:
+                raise Exception(u'char not in CHARS. char={}, text="{}"'.format(char, u' '.join(words)))
+            if is_number and numbers_left > 3 and char in DIGITS and (numbers_left-1) % 3 == 0:
+                char_image = _get_separated_digit(char)
+                numbers_left -= 1
+            else:
+                char_image = CHARS[char]
+                if is_number and char in DIGITS:
+                    numbers_left -= 1
+            run.blit(char_image, (chars_printed*8, 0))
+            chars_printed += 1
+            if is_number and numbers_left == 0 and chars_printed < len(word):
+                for remaining_char in word[chars_printed:]:
+                    if remaining_char in DIGITS:
+                        numbers_left += 1
+                    else:
+                        break
+        # The space after each word is left black.
+        chars_printed += 1
+    return run
+
+
 class TextBox(object):
     def __init__(
         self, text, width=None, height=None, adjust='left', border=False, double_space=False, appear='instant', fade_speed=1.5,
@@ -162,7 +266,7 @@ class TextBox(object):
             else 1 if appear=='scroll'
             else len(self.lines)
         )
-        self.typing_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'typing.wav'))
+        self.typing_sound = Voice('typing')
         self.needs_update = False if appear=='instant' else True
         self.started = False
 
@@ -170,6 +274,7 @@ class TextBox(object):
         self.chars_to_show = 0
         
         self.lines_to_show = min(self.lines_to_show, self.lines_available)
+        self.drawn = None # what update_surface last drew, so it can draw only what has changed since
         self.update_surface()
         self.silent = silent
 
@@ -196,78 +301,54 @@ class TextBox(object):
             self.words[line] = line.split()
 
     def update_surface(self):
+        '''
+        Draws the visible text onto self.surface. Lines are blitted from their cached glyph runs, and when the text
+        has only grown since the last call (like while it scrolls or fades in), only the newly shown glyphs are
+        blitted onto the surface that is already there.
+        '''
         y_space = 2 if self.double_space else 1
-        surface = pygame.Surface((self.width, self.height))
-        surface.fill(BLACK)
-        for y, line in enumerate(self.lines[self.starting_line:]):
-            chars_printed = 0
-            if self.lines_to_show == y:
-                break
+        lines = []
+        for y, line in enumerate(self.lines[self.starting_line:self.starting_line + self.lines_to_show]):
             x = (1 if self.border else 0) + self.indent + (
                 (self.text_width-len(line))/2 if self.adjust=='center'
                 else self.text_width-len(line) if self.adjust=='right'
                 else 0
             )
             vertical_pos = (y * y_space + (2 if self.border else 0)) * 8
-            for word in self.words[line]:
-                # if word.endswith('1052'):
-                #     import pdb; pdb.set_trace()
-                # is_number is used for displaying numbers in a more readable format, where every other triplet of
-                # characters is a bit transparent over a black background, making them a bit gray.
-                is_number = True
-                for char in word:
-                    if char not in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', ',', '.', '?', '!', ' ', '~', '/']:
-                        is_number = False
-                        break
-                if is_number:
-                    numbers_left = 0
-                    # This is just in case there is a space or punctuation somewhere in the word.
-                    for char in word:
-                        if char in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']:
-                            numbers_left += 1
-                        else:
-                            break
-                for char in word:
-                    if self.appear == 'scroll' and y == self.lines_to_show - 1 and chars_printed == self.chars_to_show:
-                        break
-                    if char not in CHARS:
-                        raise Exception(u'char not in CHARS. char={}, text="{}"'.format(char, self.text))
-                    if (
-                        is_number
-                        and numbers_left > 3
-                        and char in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
-                        and (numbers_left-1) % 3 == 0
-                    ):
-                        char_image = pygame.Surface((8, 8))
-                        char_image.blit(CHARS[char], (0, 0))
-                        pygame.draw.rect(char_image, WHITE, (7, 7, 1, 1), 1)
-                        numbers_left -= 1
-                    else:
-                        char_image = CHARS[char]
-                        if is_number and char in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']:
-                            numbers_left -= 1
-                    surface.blit(char_image, (x*8, vertical_pos))
-                    x += 1
-                    chars_printed += 1
-                    if is_number and numbers_left == 0 and chars_printed < len(word):
-                        for remaining_char in word[chars_printed:]:
-                            if remaining_char in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']:
-                                numbers_left += 1
-                            else:
-                                break
-                if self.appear == 'scroll' and y == self.lines_to_show - 1 and chars_printed == self.chars_to_show:
-                    break
-                surface.blit(CHARS[' '], (x*8, vertical_pos))
-                x += 1
-                chars_printed += 1
+            run = get_glyph_run(self.words[line])
+            num_chars = run.get_width() // 8
+            if self.appear == 'scroll' and y == self.lines_to_show - 1:
+                num_chars = min(num_chars, self.chars_to_show)
+            lines.append((run, x*8, vertical_pos, num_chars))
+        down_arrow_pos = (
+            (self.width/2, vertical_pos + (16 if self.double_space else 8))
+            if self.show_down_arrow() and is_half_second() else None
+        )
+
+        drawn = self.drawn
+        if (
+            drawn is None
+            or drawn['starting_line'] != self.starting_line
+            or drawn['down_arrow_pos'] != down_arrow_pos
+            or len(drawn['num_chars']) > len(lines)
+            or any(num_chars < drawn_chars for (_, _, _, num_chars), drawn_chars in zip(lines, drawn['num_chars']))
+        ):
+            self.surface = pygame.Surface((self.width, self.height))
+            self.surface.fill(BLACK)
+            drawn = {'starting_line': self.starting_line, 'down_arrow_pos': down_arrow_pos, 'num_chars': []}
+            if down_arrow_pos:
+                self.surface.blit(CHARS[u'▼'], down_arrow_pos)
+        for y, (run, x, vertical_pos, num_chars) in enumerate(lines):
+            drawn_chars = drawn['num_chars'][y] if y < len(drawn['num_chars']) else 0
+            if num_chars > drawn_chars:
+                self.surface.blit(run, (x + drawn_chars*8, vertical_pos), (drawn_chars*8, 0, (num_chars-drawn_chars)*8, 8))
+        drawn['num_chars'] = [num_chars for _, _, _, num_chars in lines]
+        self.drawn = drawn
         if self.border:
-            pygame.draw.rect(surface, WHITE, (3, 3, self.width-6, self.height-6), 2)
-        if self.show_down_arrow() and is_half_second():
-            surface.blit(CHARS[u'▼'], (self.width/2, vertical_pos + (16 if self.double_space else 8)))
+            pygame.draw.rect(self.surface, WHITE, (3, 3, self.width-6, self.height-6), 2)
         if self.title:
             for i, char in enumerate(self.title):
-                surface.blit(CHARS[char], (i*8+16, 0))
-        self.surface = surface
+                self.surface.blit(CHARS[char], (i*8+16, 0))
 
     def show_down_arrow(self):
         return self.appear == 'scroll' and not self.has_more_stuff_to_show_now() and self.has_more_stuff_to_show()
@@ -360,7 +441,7 @@ class MenuBox(object):
         self.blink = True
         self.border = border
         self.create_text_box(title, width, height)
-        self.switch_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'switch.wav'))
+        self.switch_sound = get_sound('switch')
 
     def create_text_box(self, title, width, height):
         double_space = True
@@ -477,7 +558,7 @@ class MenuGrid(object):
         self.focused_menu_index = 0
         self.border = border
         self.title = title
-        self.switch_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'switch.wav'))
+        self.switch_sound = get_sound('switch')
         self.surface = None
         self.set_focused_menu(self.focused_menu_index)
         self.update_surface()
@@ -566,7 +647,7 @@ class ShopMenu(object):
         self.blink = True
         self.border = None
         self.create_text_box()
-        self.switch_sound = pygame.mixer.Sound('data/audio/switch.wav')
+        self.switch_sound = get_sound('switch')
 
     def create_text_box(self):
         lines = []
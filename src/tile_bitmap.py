@@ -0,0 +1,74 @@
+# -*- coding: UTF-8 -*-
+
+import base64
+import zlib
+
+from constants import MAP_HEIGHT, MAP_WIDTH
+
+# Like helpers.py, this module should not import any other rotj modules (except constants), so that anything can
+# import it without causing circular imports.
+
+
+class TileBitmap(object):
+    '''
+    A set of overworld tiles, kept as one bit per tile of the MAP_WIDTH x MAP_HEIGHT overworld (15,000 bytes for
+    all 120,000 tiles). The game state keeps the tiles the player has walked on ('beaten_path') and the tiles the
+    pause map shows ('visible_tiles') in these.
+
+    Saved games store a bitmap as a short base64 string of its zlib-compressed bits. Older saves stored each of these
+    as a dict keyed by 'x y' strings, and from_json still reads those.
+    '''
+
+    def __init__(self, bits=None):
+        self.bits = bytearray(bits) if bits is not None else bytearray((MAP_WIDTH * MAP_HEIGHT + 7) // 8)
+
+    @classmethod
+    def from_json(cls, data):
+        if isinstance(data, TileBitmap):
+            return data
+        if isinstance(data, str):
+            return cls(zlib.decompress(base64.b64decode(data)))
+        bitmap = cls()
+        for key in data or {}:
+            bitmap.add([int(i) for i in key.split()])
+        return bitmap
+
+    def to_json(self):
+        return base64.b64encode(zlib.compress(bytes(self.bits), 9)).decode('ascii')
+
+    def __contains__(self, position):
+        index = int(position[1]) * MAP_WIDTH + int(position[0])
+        return self.bits[index >> 3] & (1 << (index & 7)) != 0
+
+    def __iter__(self):
+        '''
+        Yields the (x, y) of every tile in the set, row by row.
+        '''
+        for byte_index, byte in enumerate(self.bits):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        index = byte_index * 8 + bit
+                        yield index % MAP_WIDTH, index // MAP_WIDTH
+
+    def __len__(self):
+        return sum(bin(byte).count('1') for byte in self.bits if byte)
+
+    def add(self, position):
+        '''
+        Adds the tile at position. Returns True if it was not already in the set.
+        '''
+        index = int(position[1]) * MAP_WIDTH + int(position[0])
+        mask = 1 << (index & 7)
+        if self.bits[index >> 3] & mask:
+            return False
+        self.bits[index >> 3] |= mask
+        return True
+
+    def add_rect(self, left, top, right, bottom):
+        '''
+        Adds every tile from (left, top) up to but not including (right, bottom).
+        '''
+        for y in range(top, bottom):
+            for index in range(y * MAP_WIDTH + left, y * MAP_WIDTH + right):
+                self.bits[index >> 3] |= 1 << (index & 7)
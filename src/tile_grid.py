@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+
+from array import array
+from itertools import accumulate
+from operator import add
+import weakref
+
+from constants import DEFAULT_ENCOUNTER_CHANCE
+
+WATER_DISTANCE = 2 # tiles the hero can be from water and still get a water battle
+
+# key is a parsed tmx map, value is its TileGrid. Grids go away with their maps.
+_TILE_GRIDS = weakref.WeakKeyDictionary()
+
+
+def get_tile_grid(tmx_data):
+    '''
+    Returns the TileGrid for a parsed tmx map, building it the first time it is asked for.
+    '''
+    grid = _TILE_GRIDS.get(tmx_data)
+    if grid is None:
+        grid = TileGrid(tmx_data)
+        _TILE_GRIDS[tmx_data] = grid
+    return grid
+
+
+class TileGrid(object):
+    '''
+    The tile properties that get checked as sprites walk around (wall, water, lava and encounter, on the bottom layer),
+    read once out of the tmx data into flat arrays indexed by y * width + x. Water also gets a summed-area table, so
+    checking for water anywhere in a square around a tile costs four reads.
+    '''
+
+    def __init__(self, tmx_data):
+        self.width = tmx_data.width
+        self.height = tmx_data.height
+        gids = [gid for row in tmx_data.layers[0].data for gid in row]
+        walls, water, lava, encounter_chances = {}, {}, {}, {} # key is gid, value is that tile's property
+        for gid in set(gids):
+            props = tmx_data.get_tile_properties_by_gid(gid) or {}
+            walls[gid] = props.get('wall') == 'true'
+            water[gid] = props.get('water') == 'true'
+            lava[gid] = props.get('lava') == 'true'
+            encounter_chances[gid] = float(props.get('encounter', DEFAULT_ENCOUNTER_CHANCE))
+        self.walls = bytearray(map(walls.__getitem__, gids))
+        self.water = bytearray(map(water.__getitem__, gids))
+        self.lava = bytearray(map(lava.__getitem__, gids))
+        self.encounter_chances = array('d', map(encounter_chances.__getitem__, gids))
+
+        # water_sums[(y+1) * (width+1) + (x+1)] is the number of water tiles in the rectangle from (0, 0) to (x, y).
+        self.water_sums = array('i', [0]) * (self.width + 1)
+        previous_row = self.water_sums[:]
+        for y in range(self.height):
+            row = array('i', [0])
+            row.extend(accumulate(self.water[y * self.width:(y+1) * self.width]))
+            previous_row = array('i', map(add, previous_row, row))
+            self.water_sums.extend(previous_row)
+
+    def is_wall(self, x, y):
+        return self.walls[int(y) * self.width + int(x)] == 1
+
+    def is_lava(self, x, y):
+        return self.lava[int(y) * self.width + int(x)] == 1
+
+    def get_encounter_chance(self, x, y):
+        return self.encounter_chances[int(y) * self.width + int(x)]
+
+    def is_near_water(self, x, y, distance=WATER_DISTANCE):
+        '''
+        Returns if there is water within distance tiles of (x, y), counting diagonally. Tiles off the map aren't water.
+        '''
+        left = max(int(x) - distance, 0)
+        top = max(int(y) - distance, 0)
+        right = min(int(x) + distance + 1, self.width)
+        bottom = min(int(y) + distance + 1, self.height)
+        if left >= right or top >= bottom:
+            return False
+        row_width = self.width + 1
+        sums = self.water_sums
+        return (
+            sums[bottom * row_width + right] - sums[top * row_width + right]
+            - sums[bottom * row_width + left] + sums[top * row_width + left]
+        ) > 0
@@ -1,18 +1,22 @@
 # -*- coding: UTF-8 -*-
 
+from collections import OrderedDict
+import copy
 import json
 import math
 import os
 import random
+import threading
 
 import pygame
 from pygame.locals import *
 import pyscroll
 from pytmx.util_pygame import load_pygame
 
+from conditions import compile_conditions
 from constants import (
-    DEFAULT_ENCOUNTER_CHANCE, FACELESS_ENEMIES, MAX_NUM, ITEMS, MAPS_WITH_RANDOM_ENCOUNTERS, NAMED_TELEPORTS,
-    REUSABLE_MAP_NAMES, RED, GAME_WIDTH, GAME_HEIGHT, CHAPTER11_CITIES,
+    FACELESS_ENEMIES, MAX_NUM, ITEMS, MAPS_WITH_RANDOM_ENCOUNTERS, NAMED_TELEPORTS,
+    REUSABLE_MAP_NAMES, RED, GAME_WIDTH, GAME_HEIGHT, CHAPTER11_CITIES, TILE_SIZE,
 )
 from helpers import (
     get_enemy_stats,
@@ -27,10 +31,13 @@ from helpers import (
 )
 from hero import Hero
 from map_menu import MapMenu
+from occupancy import OccupancyGrid
 from report import CompanyReport, Report
 from shop_mat import ShopMat
-from sprite import AiSprite, Sprite
+from sounds import get_sound
+from sprite import AiSprite, MAX_CATCH_UP_MOVES, Sprite
 from text import create_prompt, MenuBox
+from tile_grid import get_tile_grid
 from treasure import Treasure
 
 MAX_NO_FOOD_DELTA = 0.06
@@ -86,6 +93,159 @@ RELOAD_CONDITIONS = [
     'ammah_and_manti_join',
     'lachoneus_joins',
 ]
+MAX_CACHED_MAP_BYTES = 32 * 1024 * 1024 # rough estimate of the memory the cached tmx maps take up
+MAX_CACHED_MAP_JSON = 32 # number of json files
+MAX_POOLED_RENDERERS = 8
+PRELOAD_DISTANCE = 4 # tiles from a teleport at which the map it leads to starts loading in the background
+# Tiles outside the screen in which ai_sprites keep getting updated. A sleeper wakes up as soon as it is in this
+# margin, and it's more than MAX_CATCH_UP_MOVES tiles wide so that the steps it catches up on stay off screen.
+AWAKE_MARGIN = MAX_CATCH_UP_MOVES + 1
+
+# Parsed tmx maps for the most recently loaded map files. Key is the tmx filename, value is (tmx_data, size in bytes).
+_TMX_MAPS = OrderedDict()
+
+# Parsed cell and encounter json for the most recently loaded maps. Key is the filename, value is the json data, or
+# None if there is no such file.
+_MAP_JSON = OrderedDict()
+
+# Renderers for the most recently shown maps. Key is (tmx filename, view size), value is the renderer.
+_RENDERERS = OrderedDict()
+
+# The caches above get filled from the preloading thread too. _CACHE_LOCK guards the dicts themselves, and a file's
+# lock is held while it is being parsed, so that the game waits for a preload in progress instead of parsing twice.
+_CACHE_LOCK = threading.Lock()
+_FILE_LOCKS = {}
+_PRELOADING = set() # names of the maps being preloaded
+
+
+def get_tmx_filename(map_name):
+    tmx_map_name = map_name
+    for reusable_name in REUSABLE_MAP_NAMES:
+        if map_name.endswith(reusable_name):
+            tmx_map_name = reusable_name
+            break
+    return get_map_filename('{}.tmx'.format(tmx_map_name))
+
+
+def load_tmx(map_filename):
+    '''
+    Returns the parsed map (with its tile images) for a tmx file. Maps come from a cache of the most recently loaded
+    ones that fit in MAX_CACHED_MAP_BYTES, so going back to a map, like the overworld after leaving a city, doesn't
+    parse it again. Cached maps are shared, so they must not be modified.
+    '''
+    with _get_file_lock(map_filename):
+        with _CACHE_LOCK:
+            if map_filename in _TMX_MAPS:
+                _TMX_MAPS.move_to_end(map_filename)
+                return _TMX_MAPS[map_filename][0]
+        tmx_data = load_pygame(map_filename)
+        get_tile_grid(tmx_data) # so the preloader builds it too
+        with _CACHE_LOCK:
+            _TMX_MAPS[map_filename] = (tmx_data, _estimate_tmx_bytes(tmx_data))
+            # Always keep the map that was just loaded, even if it is bigger than the budget by itself.
+            while len(_TMX_MAPS) > 1 and sum(size for _, size in _TMX_MAPS.values()) > MAX_CACHED_MAP_BYTES:
+                _TMX_MAPS.popitem(last=False)
+    return tmx_data
+
+
+def load_map_json(filename):
+    '''
+    Returns the parsed json of a map's cells or encounter regions, or None if the file doesn't exist. Like load_tmx,
+    the data is cached and shared, so it must not be modified.
+    '''
+    with _get_file_lock(filename):
+        with _CACHE_LOCK:
+            if filename in _MAP_JSON:
+                _MAP_JSON.move_to_end(filename)
+                return _MAP_JSON[filename]
+        try:
+            with open(filename) as f:
+                json_data = json.loads(f.read())
+        except IOError:
+            json_data = None
+        with _CACHE_LOCK:
+            _MAP_JSON[filename] = json_data
+            if len(_MAP_JSON) > MAX_CACHED_MAP_JSON:
+                _MAP_JSON.popitem(last=False)
+    return json_data
+
+
+def clear_map_caches():
+    '''
+    Forgets every cached map, so they get loaded from their files again (for picking up edits made with Tiled while
+    the game is running).
+    '''
+    with _CACHE_LOCK:
+        _TMX_MAPS.clear()
+        _MAP_JSON.clear()
+        _RENDERERS.clear()
+
+
+def preload_map(map_name):
+    '''
+    Starts loading a map's tmx and json files on a background thread, so they are already cached when the party gets
+    there. Does nothing if they are cached already or are being preloaded.
+    '''
+    filenames = _get_map_filenames(map_name)
+    with _CACHE_LOCK:
+        if map_name in _PRELOADING or (filenames[0] in _TMX_MAPS and all(f in _MAP_JSON for f in filenames[1:])):
+            return
+        _PRELOADING.add(map_name)
+    thread = threading.Thread(target=_preload_map, args=(map_name,))
+    thread.daemon = True
+    thread.start()
+
+
+def _preload_map(map_name):
+    tmx_filename, json_filename, encounter_filename = _get_map_filenames(map_name)
+    try:
+        load_tmx(tmx_filename)
+        load_map_json(json_filename)
+        load_map_json(encounter_filename)
+    finally:
+        with _CACHE_LOCK:
+            _PRELOADING.discard(map_name)
+
+
+def _get_map_filenames(map_name):
+    return (
+        get_tmx_filename(map_name),
+        get_map_filename('{}.json'.format(map_name)),
+        get_map_filename('{}_encounters.json'.format(map_name)),
+    )
+
+
+def _get_file_lock(filename):
+    with _CACHE_LOCK:
+        return _FILE_LOCKS.setdefault(filename, threading.Lock())
+
+
+def _estimate_tmx_bytes(tmx_data):
+    images = {id(image): image for image in tmx_data.images if image is not None}
+    image_bytes = sum(image.get_bytesize() * image.get_width() * image.get_height() for image in images.values())
+    # Each layer keeps a list of rows of tile gids, which costs about a pointer per tile.
+    return image_bytes + 8 * tmx_data.width * tmx_data.height * len(tmx_data.layers)
+
+
+def get_renderer(map_filename, tmx_data, size):
+    '''
+    Returns a pyscroll renderer for the map, reusing the one from the last time the map was shown if it is still in
+    the pool. A reused renderer still has the tiles it last drew in its buffer, so it only redraws if it gets centered
+    somewhere else. Two maps can share a renderer at the same time (like when sleeping at an inn rebuilds the map),
+    since each one centers it right before drawing. Give each map its own PyscrollGroup for its sprites.
+    '''
+    key = (map_filename, tuple(size))
+    renderer = _RENDERERS.get(key)
+    if renderer is not None and renderer.data.tmx is tmx_data:
+        _RENDERERS.move_to_end(key)
+        return renderer
+    renderer = pyscroll.BufferedRenderer(pyscroll.data.TiledMapData(tmx_data), size)
+    renderer.zoom = 1
+    _RENDERERS[key] = renderer
+    _RENDERERS.move_to_end(key)
+    if len(_RENDERERS) > MAX_POOLED_RENDERERS:
+        _RENDERERS.popitem(last=False)
+    return renderer
 
 
 class Map(object):
@@ -101,21 +261,16 @@ class Map(object):
         self.company_report = None
         self.name = map_name
         self.game = game
-        self.ai_sprites = {} # key is position tuple, value is ai_sprite at that position currently
-        tmx_map_name = map_name
-        for reusable_name in REUSABLE_MAP_NAMES:
-            if map_name.endswith(reusable_name):
-                tmx_map_name = reusable_name
-                break
-        map_filename = get_map_filename('{}.tmx'.format(tmx_map_name))
-        self.json_filename = get_map_filename('{}.json'.format(map_name))
-        self.encounter_filename = get_map_filename('{}_encounters.json'.format(map_name))
+        self.occupancy = OccupancyGrid() # which tiles the company, ai_sprites and treasures are on
+        self.ai_sprites_by_cell = {} # key is the position tuple of the cell that spawned the ai_sprite
+        self.ai_sprite_choices = {} # key is the same as above, value is the ai_sprite data the sprite was made from
+        self.treasures = {}
+        map_filename, self.json_filename, self.encounter_filename = _get_map_filenames(map_name)
         self.screen = screen
-        self.tmx_data = load_pygame(map_filename)
+        self.tmx_data = load_tmx(map_filename)
+        self.tile_grid = get_tile_grid(self.tmx_data)
         self.load_cells_and_encounter_regions()
-        map_data = pyscroll.data.TiledMapData(self.tmx_data)
-        self.map_layer = pyscroll.BufferedRenderer(map_data, self.screen.get_size())
-        self.map_layer.zoom = 1
+        self.map_layer = get_renderer(map_filename, self.tmx_data, self.screen.get_size())
         self.group = pyscroll.group.PyscrollGroup(map_layer=self.map_layer)
         self.opening_dialog = create_prompt(opening_dialog) if opening_dialog is not None else None
         self.load_shop_mats()
@@ -128,33 +283,84 @@ class Map(object):
         self.load_company_sprites(hero_position, direction, followers)
         self.map_menu = None
         self.random_encounter = False
-        self.lava_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'lava.wav'))
-        self.explosion_sound = pygame.mixer.Sound(os.path.join('data', 'audio', 'explosion.wav'))
+        self.lava_sound = get_sound('lava')
+        self.explosion_sound = get_sound('explosion')
 
     def set_game_state_condition(self, condition):
         return self.game.set_game_state_condition(condition)
 
     def load_cells_and_encounter_regions(self):
-        with open(self.json_filename) as f:
-            json_data = json.loads(f.read())
-        try:
-            with open(self.encounter_filename) as f:
-                encounter_data = json.loads(f.read())
-        except IOError:
-            encounter_data = []
+        json_data = load_map_json(self.json_filename)
+        if json_data is None:
+            raise IOError('No map json at {}'.format(self.json_filename))
+        encounter_data = load_map_json(self.encounter_filename) or []
         self.cells = {(cell['x'], cell['y']): cell for cell in json_data}
         self.encounter_regions = {(region['x'], region['y']): region for region in encounter_data}
+        self.compile_cell_conditions()
+
+    def compile_cell_conditions(self):
+        '''
+        Compiles the condition specs of every ai_sprite, treasure, teleport and battle in the map's cells into
+        predicates, and indexes which cells depend on which conditions.
+        '''
+        self.battle_options = {} # key is cell position, value is a list of (predicate, battle data)
+        self.ai_sprite_options = {} # key is cell position, value is a list of (predicate, ai_sprite data)
+        self.treasure_options = {} # key is cell position, value is (predicate, treasure data)
+        self.teleport_options = {} # key is cell position, value is a list of (predicate, teleport data)
+        self.condition_dependents = {} # key is a condition name, value is a set of ('ai_sprite'|'treasure', position)
+        self.state_dependents = set() # same as above, but for cells that use "state:" conditions
+        for position, cell in self.cells.items():
+            ai_sprite_data = cell.get('ai_sprite')
+            if ai_sprite_data:
+                if isinstance(ai_sprite_data, dict):
+                    ai_sprite_data = [ai_sprite_data]
+                options = [(compile_conditions(data.get('conditions')), data) for data in ai_sprite_data]
+                self.ai_sprite_options[position] = options
+                self.add_condition_dependent(('ai_sprite', position), [predicate for predicate, _ in options])
+            treasure_data = cell.get('treasure')
+            if treasure_data:
+                predicate = compile_conditions(treasure_data.get('conditions'))
+                self.treasure_options[position] = (predicate, treasure_data)
+                self.add_condition_dependent(
+                    ('treasure', position), [predicate, compile_conditions(treasure_data['name'])],
+                )
+            teleport = cell.get('teleport')
+            if teleport:
+                teleports = [teleport] if isinstance(teleport, dict) else teleport
+                self.teleport_options[position] = [(compile_conditions(tele.get('conditions')), tele) for tele in teleports]
+            battles = cell.get('battles')
+            if isinstance(battles, list):
+                self.battle_options[position] = [(compile_conditions(data.get('conditions')), data) for data in battles]
+
+    def preload_nearby_maps(self, position):
+        '''
+        Preloads the maps that open teleports within PRELOAD_DISTANCE tiles of position lead to.
+        '''
+        for (x, y), teleports in self.teleport_options.items():
+            if abs(x - position[0]) > PRELOAD_DISTANCE or abs(y - position[1]) > PRELOAD_DISTANCE:
+                continue
+            for predicate, tele in teleports:
+                if self.game.conditions_are_met(predicate):
+                    if tele.get('map'):
+                        preload_map(tele['map'])
+                    break
+
+    def add_condition_dependent(self, dependent, predicates):
+        for predicate in predicates:
+            if predicate.uses_state:
+                self.state_dependents.add(dependent)
+            for name in predicate.names:
+                self.condition_dependents.setdefault(name, set()).add(dependent)
 
     def handle_game_state_condition(self, condition):
         if condition not in RELOAD_CONDITIONS:
             return
-        for sprite in self.group.sprites():
-            self.group.remove(sprite)
-        self.ai_sprites = {}
-        self.load_shop_mats()
-        self.load_treasures()
-        self.load_ai_sprites()
-        self.load_company_sprites(self.hero.position, self.hero.direction, 'inplace')
+        for kind, position in self.condition_dependents.get(condition, set()) | self.state_dependents:
+            if kind == 'ai_sprite':
+                self.load_ai_sprite(position)
+            else:
+                self.load_treasure(position)
+        self.reconcile_company_sprites()
 
     def try_toggle_equip_on_item(self, user, item_index):
         self.game.try_toggle_equip_on_item(user, item_index)
@@ -243,38 +449,76 @@ class Map(object):
         return dialog
 
     def load_ai_sprites(self):
-        for cell in self.cells.values():
-            ai_sprite_data = cell.get('ai_sprite')
-            if not ai_sprite_data:
-                continue
-            if isinstance(ai_sprite_data, dict):
-                ai_sprite_data = [ai_sprite_data]
-            for potential_sprite in ai_sprite_data:
-                if self.game.conditions_are_met(potential_sprite.get('conditions')):
-                    ai_sprite = AiSprite(
-                        tmx_data=self.tmx_data, game=self.game, character=potential_sprite['name'],
-                        position=[cell['x'], cell['y']], direction=potential_sprite['direction'],
-                        wander=potential_sprite['wander'], tiled_map=self, dialog=potential_sprite['dialog'],
-                        walk=potential_sprite.get('walk'),
-                    )
-                    self.group.add(ai_sprite)
-                    break # Just load the first matching sprite in the list
+        for position in self.ai_sprite_options:
+            self.load_ai_sprite(position)
+
+    def load_ai_sprite(self, cell_position):
+        '''
+        Makes sure the cell's ai_sprite is the first one in its list whose conditions are met. An ai_sprite that is
+        already loaded for the cell and still matches is left alone, wherever it has wandered to.
+        '''
+        choice = None
+        for predicate, potential_sprite in self.ai_sprite_options[cell_position]:
+            if self.game.conditions_are_met(predicate):
+                choice = potential_sprite
+                break # Just load the first matching sprite in the list
+        old_sprite = self.ai_sprites_by_cell.get(cell_position)
+        if old_sprite and self.ai_sprite_choices[cell_position] is choice:
+            return
+        if old_sprite:
+            self.remove_ai_sprite(cell_position)
+        if choice:
+            ai_sprite = AiSprite(
+                tmx_data=self.tmx_data, game=self.game, character=choice['name'],
+                position=list(cell_position), direction=choice['direction'],
+                wander=choice['wander'], tiled_map=self, dialog=choice['dialog'],
+                walk=choice.get('walk'),
+            )
+            self.group.add(ai_sprite)
+            self.occupancy.add(ai_sprite, 'ai_sprite', cell_position)
+            self.ai_sprites_by_cell[cell_position] = ai_sprite
+            self.ai_sprite_choices[cell_position] = choice
+
+    def remove_ai_sprite(self, cell_position):
+        old_sprite = self.ai_sprites_by_cell.pop(cell_position)
+        del self.ai_sprite_choices[cell_position]
+        self.group.remove(old_sprite)
+        self.occupancy.remove(old_sprite)
 
     def load_treasures(self):
-        self.treasures = {}
-        for cell in self.cells.values():
-            treasure_data = cell.get('treasure')
-            if treasure_data:
-                if not self.game.conditions_are_met(treasure_data.get('conditions')):
-                    continue
-                if self.game.conditions_are_met(treasure_data['name']):
-                    opened = True
-                else:
-                    opened = False
-                pos = [cell['x'], cell['y']]
-                treasure = Treasure(opened=opened, invisible=treasure_data.get('invisible'), position=pos)
-                self.group.add(treasure)
-                self.treasures[tuple(pos)] = treasure
+        for position in self.treasure_options:
+            self.load_treasure(position)
+
+    def load_treasure(self, position):
+        '''
+        Adds, removes or opens the treasure in the cell to match the game state. A treasure that is already in the
+        right state is left alone.
+        '''
+        predicate, treasure_data = self.treasure_options[position]
+        old_treasure = self.treasures.get(position)
+        if not self.game.conditions_are_met(predicate):
+            if old_treasure:
+                self.remove_treasure(position)
+            return
+        if self.game.conditions_are_met(treasure_data['name']):
+            opened = True
+        else:
+            opened = False
+        if old_treasure:
+            if opened and not old_treasure.opened:
+                old_treasure.open()
+            if opened == old_treasure.opened:
+                return
+            self.remove_treasure(position)
+        treasure = Treasure(opened=opened, invisible=treasure_data.get('invisible'), position=list(position))
+        self.group.add(treasure)
+        self.occupancy.add(treasure, 'treasure', position)
+        self.treasures[position] = treasure
+
+    def remove_treasure(self, position):
+        treasure = self.treasures.pop(position)
+        self.group.remove(treasure)
+        self.occupancy.remove(treasure)
 
     def load_shop_mats(self):
         for cell in self.cells.values():
@@ -307,16 +551,19 @@ class Map(object):
         elif direction == 'w':
             return [pos[0]-1, pos[1]]
 
-    def load_company_sprites(self, hero_position, direction, followers):
-        if self.follower_one:
-            self.group.remove(self.follower_one)
-        if self.follower_two:
-            self.group.remove(self.follower_two)
-        if self.hero:
-            self.group.remove(self.hero)
-        if self.peasants:
-            for peasant in self.peasants:
-                self.group.remove(peasant)
+    def reconcile_company_sprites(self):
+        '''
+        Reloads the company sprites in place, but only if the warlords (or peasants) that should be shown changed.
+        '''
+        current = [self.hero.name if self.hero else None]
+        current += [sprite.name if sprite else None for sprite in (self.follower_one, self.follower_two)]
+        company_sprites = self.get_company_sprite_names()
+        expected = company_sprites + [None] * (3 - len(company_sprites))
+        if current == expected and len(self.peasants) == self.get_num_peasants():
+            return
+        self.load_company_sprites(self.hero.position, self.hero.direction, 'inplace')
+
+    def get_num_peasants(self):
         peasants = 0
         if self.game.conditions_are_met('battle08') and not self.game.conditions_are_met('entered_jershon'):
             # tack on a lamanite follower peasant for each conquered place in chapter 3
@@ -330,6 +577,15 @@ class Map(object):
                 peasants += 1
             if self.game.conditions_are_met('battle17'):
                 peasants += 1
+        return peasants
+
+    def load_company_sprites(self, hero_position, direction, followers):
+        for sprite in [self.follower_one, self.follower_two, self.hero] + self.peasants:
+            if sprite:
+                self.group.remove(sprite)
+                self.occupancy.remove(sprite)
+        self.peasants = []
+        peasants = self.get_num_peasants()
         company_sprites = self.get_company_sprite_names()
         if followers == 'inplace':
             follower_one_pos = (
@@ -358,14 +614,14 @@ class Map(object):
                 follower=self.peasants[0] if self.peasants else None, tiled_map=self,
             )
             self.peasants.insert(0, peasant_sprite)
-            self.group.add(peasant_sprite)
+            self.add_company_sprite(peasant_sprite)
             peasants -= 1
         if len(company_sprites) == 3:
             self.follower_two = Sprite(
                 self.tmx_data, self.game, company_sprites[2], follower_two_pos, direction=follower_two_dir,
                 tiled_map=self, follower=self.peasants[0] if self.peasants else None,
             )
-            self.group.add(self.follower_two)
+            self.add_company_sprite(self.follower_two)
         else:
             self.follower_two = None
         if len(company_sprites) >= 2:
@@ -373,14 +629,18 @@ class Map(object):
                 self.tmx_data, self.game, company_sprites[1], follower_one_pos, direction=follower_one_dir,
                 follower=self.follower_two or (self.peasants[0] if self.peasants else None), tiled_map=self,
             )
-            self.group.add(self.follower_one)
+            self.add_company_sprite(self.follower_one)
         else:
             self.follower_one = None
         self.hero = Hero(
             self.tmx_data, self.game, company_sprites[0], hero_position[:], cells=self.cells, direction=direction,
             follower=self.follower_one or (self.peasants[0] if self.peasants else None), tiled_map=self,
         )
-        self.group.add(self.hero)
+        self.add_company_sprite(self.hero)
+
+    def add_company_sprite(self, sprite):
+        self.group.add(sprite)
+        self.occupancy.add(sprite, 'company', sprite.position)
 
     def get_company_sprite_names(self):
         '''
@@ -423,7 +683,7 @@ class Map(object):
                 self.game.set_current_map(
                     self.name, self.hero.position, "s", dialog=dialog, continue_current_music=True, play_walk_sound=False,
                 )
-        self.group.update(dt)
+        self.update_sprites(dt)
         if self.map_menu:
             self.map_menu.update(dt)
         if self.opening_dialog:
@@ -448,15 +708,27 @@ class Map(object):
             self.exploding = True
             self.ready_explosion = False
 
+    def update_sprites(self, dt):
+        '''
+        Updates the sprites, except that ai_sprites which can sleep are only updated within AWAKE_MARGIN tiles of the
+        screen. Further away they sleep, and catch up when they come back into range.
+        '''
+        awake_area = self.get_awake_area()
+        for sprite in self.group.sprites():
+            if isinstance(sprite, AiSprite) and sprite.can_sleep() and not awake_area.colliderect(sprite.rect):
+                sprite.sleep(dt)
+            else:
+                sprite.update(dt)
+
+    def get_awake_area(self):
+        # This is where draw() points the camera (pyscroll keeps it from going past the edges of the map).
+        view = pygame.Rect((0, 0), self.screen.get_size())
+        view.center = self.hero.rect.center
+        view.clamp_ip(self.map_layer.map_rect)
+        return view.inflate(2 * AWAKE_MARGIN * TILE_SIZE, 2 * AWAKE_MARGIN * TILE_SIZE)
+
     def is_near_water(self):
-        x = int(self.hero.position[0])
-        y = int(self.hero.position[1])
-        for _x in [x-2, x-1, x, x+1, x+2]:
-            for _y in [y-2, y-1, y, y+1, y+2]:
-                props = self.tmx_data.get_tile_properties(_x, _y, 0) or {}
-                if props.get('water') == 'true':
-                    return True
-        return False
+        return self.tile_grid.is_near_water(self.hero.position[0], self.hero.position[1])
 
     def move_hero(self, direction):
         next_pos = self.get_pos_in_front(self.hero.position, direction)
@@ -466,11 +738,14 @@ class Map(object):
             if battles == 'chapter11_battles':
                 chapter11_city = CHAPTER11_CITIES['{} {}'.format(*[int(x) for x in next_pos])]
                 if self.game.conditions_are_met('battle_at_{}'.format(chapter11_city)):
-                    battles = []
+                    battle_options = []
                 else:
                     battles = load_json_file_if_exists(os.path.join('data', 'maps', 'chapter11_battles.json'))
-            for battle_data in battles:
-                if 'conditions' in battle_data and not self.game.conditions_are_met(battle_data['conditions']):
+                    battle_options = [(compile_conditions(data.get('conditions')), data) for data in battles]
+            else:
+                battle_options = self.battle_options[tuple(next_pos)]
+            for predicate, battle_data in battle_options:
+                if not self.game.conditions_are_met(predicate):
                     continue
                 if self.game.conditions_are_met(battle_data['name']):
                     continue
@@ -486,9 +761,7 @@ class Map(object):
                 self.steps_for_tactical_points -= 5
                 self.game.increment_tactical_points()
             self.no_food_left = self.game.decrement_food()
-            props = self.tmx_data.get_tile_properties(next_pos[0], next_pos[1], 0) or {}
-            lava = props.get('lava') == 'true'
-            if lava:
+            if self.tile_grid.is_lava(next_pos[0], next_pos[1]):
                 # piggy back on no_food_left for drawing red blinking screen
                 self.no_food_left = True
                 self.game.walk_in_lava()
@@ -513,22 +786,24 @@ class Map(object):
         battle_type = battle_data.get('battle_type', 'story')
         enemies = []
         for enemy in battle_data['enemies']:
+            # battle_data comes from the shared map json cache, so it must not be modified.
+            name = enemy['name']
             if (
-                enemy['name'] == 'shiz'
+                name == 'shiz'
                 and (self.game.is_in_company('shiz') or self.game.is_in_reserve('shiz'))
             ):
-                enemy['name'] = 'whiz'
+                name = 'whiz'
             if 'stats' in enemy:
-                stats = enemy['stats']
+                stats = copy.deepcopy(enemy['stats'])
             else:
-                stats = load_stats(enemy['name'])
-                stats['soldiers'] = get_max_soldiers(enemy['name'], enemy['level'], is_ally=False)
-                stats['tactical_points'] = get_max_tactical_points(enemy['name'], enemy['level'])
+                stats = load_stats(name)
+                stats['soldiers'] = get_max_soldiers(name, enemy['level'], is_ally=False)
+                stats['tactical_points'] = get_max_tactical_points(name, enemy['level'])
                 stats['attack_points'] = get_attack_points_by_level(enemy['level'])
                 stats['armor_class'] = get_armor_class_by_level(enemy['level'])
-                stats['tactics'] = get_tactics(enemy['name'], enemy['level'], pretty=False)
+                stats['tactics'] = get_tactics(name, enemy['level'], pretty=False)
             enemies.append({
-                'name': enemy['name'],
+                'name': name,
                 'stats': stats,
                 'reinforcements': enemy.get('reinforcements', False),
             })
@@ -546,8 +821,7 @@ class Map(object):
         if self.game.devtools['No encounters'] or self.game.cloak_steps_remaining:
             return False
         (x,y) = self.get_pos_in_front(self.hero.position, self.hero.direction)
-        props = self.tmx_data.get_tile_properties(x, y, 0) or {}
-        encounter_chance = float(props.get('encounter', DEFAULT_ENCOUNTER_CHANCE))
+        encounter_chance = self.tile_grid.get_encounter_chance(x, y)
         myrand = random.random()
         return myrand < encounter_chance
 
@@ -582,7 +856,7 @@ class Map(object):
                 stats = get_enemy_stats(name, region['stats'][name]['level'])
                 stats['capture'] = region['stats'][name].get('capture')
             else:
-                stats = region['stats'][name]
+                stats = copy.deepcopy(region['stats'][name]) # the region comes from the shared map json cache
             enemies.append({'name': name, 'stats': stats})
         return enemies
 
@@ -652,7 +926,7 @@ class Map(object):
 
     def get_dialog(self):
         pos = self.get_pos_in_front(self.hero.position, self.hero.direction)
-        ai_sprite = self.ai_sprites.get(tuple(pos))
+        ai_sprite = self.occupancy.get(pos, ['ai_sprite'])
         if ai_sprite:
             ai_sprite.direction = self.get_opposite_direction(self.hero.direction)
             return self.game.get_dialog_for_condition(ai_sprite.dialog)
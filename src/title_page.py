@@ -6,6 +6,7 @@ import time
 import pygame
 from pygame.locals import *
 
+from atlas import get_image
 from constants import GAME_WIDTH
 from helpers import is_half_second, load_image
 from text import TextBox
@@ -24,7 +25,7 @@ class TitlePage(object):
             'shiz', 'helaman', 'lachoneus',
         ]
         self.portraits = {
-            warlord: load_image(os.path.join('portraits', '{}.png'.format(warlord)))
+            warlord: get_image(os.path.join('portraits', '{}.png'.format(warlord)))
             for warlord in self.warlords
         }
         self.biographies = {
@@ -17,9 +17,11 @@ class Treasure(pygame.sprite.Sprite):
         else:
             self.image = load_image('invisible_treasure.png')
         self.invisible = invisible
+        self.opened = opened
         self.rect = self.image.get_rect()
         self.rect.topleft = [floor(TILE_SIZE*self.position[0]), floor(TILE_SIZE*self.position[1])]
 
     def open(self):
+        self.opened = True
         if not self.invisible:
             self.image = load_image('opened_treasure.png')
@@ -1,5 +1,6 @@
 #!/bin/bash
 
+python src/atlas.py
 pyinstaller src/rotj.py -y
 cp -r data dist/rotj/
 rm dist/rotj/data/state/*.json
\ No newline at end of file